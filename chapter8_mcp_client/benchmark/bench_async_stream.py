@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: does the event loop keep running while a long completion streams?
+
+A background ticker coroutine wakes up every TICK_INTERVAL seconds while the
+agent consumes a fake 2,000 chunk completion, once through the blocking
+get_completion_stream generator and once through get_completion_stream_async.
+"""
+import asyncio
+import os
+import sys
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_BASE_URL", "http://127.0.0.1:1/v1")
+os.environ.setdefault("OPENAI_MODEL", "benchmark-model")
+
+from openai.types.chat import ChatCompletionChunk
+from core.api_client import APIClient
+
+CHUNK_COUNT = 2000
+CHUNK_DELAY = 0.001
+TICK_INTERVAL = 0.005
+
+
+def make_chunk(content, finish_reason=None):
+    return ChatCompletionChunk.model_validate({
+        "id": "bench",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "benchmark-model",
+        "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": finish_reason}],
+    })
+
+
+def blocking_stream(**kwargs):
+    for _ in range(CHUNK_COUNT):
+        time.sleep(CHUNK_DELAY)
+        yield make_chunk("tok ")
+
+
+class AsyncStream:
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for _ in range(CHUNK_COUNT):
+            await asyncio.sleep(CHUNK_DELAY)
+            yield make_chunk("tok ")
+        yield make_chunk("", "stop")
+
+
+async def async_stream(**kwargs):
+    return AsyncStream()
+
+
+async def ticker(stop: asyncio.Event, ticks: list):
+    while not stop.is_set():
+        ticks.append(time.perf_counter())
+        await asyncio.sleep(TICK_INTERVAL)
+
+
+async def consume_blocking(client):
+    for _ in client.get_completion_stream({"messages": []}):
+        pass
+
+
+async def consume_async(client):
+    async for _ in client.get_completion_stream_async({"messages": []}):
+        pass
+
+
+async def run_case(name, consumer, client):
+    stop = asyncio.Event()
+    ticks = []
+    ticker_task = asyncio.create_task(ticker(stop, ticks))
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await consumer(client)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker_task
+
+    gaps = [b - a for a, b in zip(ticks, ticks[1:])] or [elapsed]
+    expected_ticks = int(elapsed / TICK_INTERVAL)
+    print(f"{name:<28} stream {elapsed * 1000:8.1f} ms | ticks {len(ticks):5d} / ~{expected_ticks:<5d}"
+          f" | max loop stall {max(gaps) * 1000:8.1f} ms")
+
+
+async def main():
+    client = APIClient()
+    client.client.chat.completions.create = blocking_stream
+    client.async_client.chat.completions.create = async_stream
+
+    print(f"Streaming {CHUNK_COUNT} chunks, {CHUNK_DELAY * 1000:.1f} ms apart, ticker every {TICK_INTERVAL * 1000:.0f} ms\n")
+    await run_case("get_completion_stream", consume_blocking, client)
+    await run_case("get_completion_stream_async", consume_async, client)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Benchmark: prompt cache savings of the breakpoint strategies on a replayed session.
+
+A cassette (by default the converted demo/super_mario/generate.log) is replayed
+through the real Conversation with a small context window, so the history gets
+cropped by compression along the way. The message lists sent to the model are
+captured, and then each strategy marks them and a simulated provider cache
+prices them with Anthropic's rules:
+- a prefix is written at every breakpoint (at 1.25x the input price) and must be
+  at least 1024 tokens long
+- a breakpoint reads the longest written prefix ending at it or up to 20
+  messages before it (at 0.1x)
+
+A synthetic session whose turns each call 24 tools at once is priced the same
+way. There a turn adds more messages than the provider looks back over.
+
+Strategies: no marks, one mark on the last message (the old behaviour) and the
+CachePlanner. Token counts come from the local estimator.
+
+Usage: python bench_cache_breakpoints.py [cassette.jsonl] [--max-tokens 8] [--fanout-max-tokens 64] [--price 3.0]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+from rich.console import Console
+from core.api_client import APIClient
+from core.cassette import Cassette
+from core.conversation import Conversation
+from core.history.cache_planner import CachePlanner
+from core.history.history_manager import HistoryManager
+from core.history.message_store import with_cache_mark
+from core.history.token_estimator import TokenEstimator
+from core.telemetry import Telemetry
+from log_to_cassette import convert
+from tools.tool_manager import ToolManager
+from ui.ui_manager import UIManager
+
+DEMO_LOG = os.path.join(current_dir, "../../demo/super_mario/generate.log")
+LOOKBACK = 20
+MIN_CACHEABLE_TOKENS = 1024
+WRITE_PRICE, READ_PRICE = 1.25, 0.1
+
+
+def reset_singletons():
+    for cls in (Conversation, APIClient, HistoryManager, ToolManager, Telemetry, Cassette):
+        cls._instance = None
+        cls._initialized = False
+
+
+async def capture_requests(home, cassette, max_tokens):
+    """Replay the cassette, returning the tool schemas and every message list sent"""
+    reset_singletons()
+    with open(os.path.join(home, ".quickstar", "mcp.json"), "w") as f:
+        json.dump({"mcpServers": {}}, f)
+    os.environ.update(
+        HOME=home, OPENAI_API_KEY="replay", OPENAI_BASE_URL="http://127.0.0.1:9/v1", OPENAI_MODEL="replay",
+        BACKGROUND_SUMMARY="false", MODEL_MAX_TOKENS=str(max_tokens),
+        CASSETTE_MODE="replay", CASSETTE_PATH=cassette, CASSETTE_TIMING="zero"
+    )
+
+    ui = UIManager()
+    ui._console = ui.display_manager._console = Console(file=io.StringIO(), width=120, force_terminal=True)
+
+    conv = Conversation()
+    history_manager = conv._history_manager
+    requests = []
+
+    def capture():
+        # keep the stored message objects, the strategies compare them by identity
+        requests.append(list(history_manager.get_current_messages()))
+        return requests[-1]
+
+    history_manager.get_messages_with_cache_marks = capture
+
+    # the recorded usage belongs to the recorded history, report the replayed one instead
+    update_token_usage = history_manager.update_token_usage
+    estimator = TokenEstimator()
+
+    def replayed_usage(token_usage):
+        prompt_tokens = tools_tokens + sum(estimator.count_message(m) for m in history_manager.get_current_messages())
+        token_usage.prompt_tokens = int(prompt_tokens)
+        token_usage.total_tokens = token_usage.prompt_tokens + token_usage.completion_tokens
+        update_token_usage(token_usage)
+
+    history_manager.update_token_usage = replayed_usage
+    tools = await conv._tool_manager.get_tools_description()
+    tools_tokens = estimator.count_text(json.dumps(tools))
+    await conv.start_conversation()
+    return tools, requests, history_manager.compression_stats.hard_limit_turns
+
+
+def fanout_requests(max_tokens, turns=30, calls_per_turn=24):
+    """
+    Synthetic session of turns that each call many tools at once (reading a
+    directory of files), so a turn adds more messages than the provider looks back over
+    """
+    reset_singletons()
+    os.environ.update(BACKGROUND_SUMMARY="false", MODEL_MAX_TOKENS=str(max_tokens))
+    history_manager = HistoryManager()
+    estimator = TokenEstimator()
+    history_manager.add_message({"role": "system", "content": [{"type": "text", "text": "You are a coding agent. " * 400}]})
+    history_manager.add_message({"role": "user", "content": [{"type": "text", "text": "Review every module"}]})
+
+    requests = []
+    for turn in range(turns):
+        history_manager.auto_messages_compression()
+        messages = list(history_manager.get_current_messages())
+        requests.append(messages)
+        usage = SimpleNamespace(prompt_tokens=int(sum(estimator.count_message(m) for m in messages)),
+                                completion_tokens=100, total_tokens=0)
+        history_manager.update_token_usage(usage)
+
+        calls = [{"id": f"call_{turn}_{i}", "type": "function",
+                  "function": {"name": "read_file", "arguments": json.dumps({"path": f"src/module_{turn}_{i}.py"})}}
+                 for i in range(calls_per_turn)]
+        history_manager.add_message({"role": "assistant", "content": f"Reading batch {turn}.", "tool_calls": calls})
+        for call in calls:
+            history_manager.add_message({"role": "tool", "tool_call_id": call["id"],
+                                         "content": [{"type": "text", "text": f"# {call['id']}\n" + "x = 1\n" * 120}]})
+    reset_singletons()
+    return requests
+
+
+class SimulatedCache:
+    """Prices requests like a provider with explicit prompt caching would"""
+
+    def __init__(self, tools):
+        self._estimator = TokenEstimator()
+        self._tools_tokens = self._estimator.count_text(json.dumps(tools))
+        self._written = set()
+        self._keys = {}
+        self.prompt = self.cached = self.written = 0
+
+    def _message_key(self, message):
+        key = self._keys.get(id(message))
+        if key is None or key[0] is not message:
+            key = (message, json.dumps(message, sort_keys=True, default=str), self._estimator.count_message(message))
+            self._keys[id(message)] = key
+        return key
+
+    def send(self, messages, marks):
+        prefix_keys, prefix_tokens = [], []
+        chain, tokens = None, self._tools_tokens
+        for message in messages:
+            _, text, count = self._message_key(message)
+            chain = hash((chain, text))
+            tokens += count
+            prefix_keys.append(chain)
+            prefix_tokens.append(tokens)
+
+        hit = 0
+        for mark in marks:
+            for i in range(mark, max(mark - LOOKBACK, -1), -1):
+                if prefix_keys[i] in self._written:
+                    hit = max(hit, prefix_tokens[i])
+                    break
+        written = 0
+        for mark in marks:
+            if prefix_tokens[mark] >= MIN_CACHEABLE_TOKENS:
+                self._written.add(prefix_keys[mark])
+                written = max(written, prefix_tokens[mark] - hit)
+
+        self.prompt += tokens
+        self.cached += hit
+        self.written += written
+
+    @property
+    def cost_units(self):
+        return self.prompt - self.cached - self.written + WRITE_PRICE * self.written + READ_PRICE * self.cached
+
+
+def mark_positions(marked):
+    return [
+        i for i, message in enumerate(marked)
+        if isinstance(message.get("content"), list) and message["content"] and "cache_control" in message["content"][-1]
+    ]
+
+
+def run_strategy(tools, requests, strategy):
+    cache = SimulatedCache(tools)
+    planner = CachePlanner(is_anchor=HistoryManager._is_history_rewrite)
+    for messages in requests:
+        if strategy == "none":
+            marks = []
+        elif strategy == "last message":
+            marks = mark_positions(with_cache_mark(messages))
+        else:
+            marks = planner.plan(messages)
+        cache.send(messages, marks)
+    return cache
+
+
+def report(title, tools, requests, price):
+    print(f"\n{title}: {len(requests)} requests")
+    print(f"{'strategy':>14} | {'prompt':>9} | {'cached':>9} | {'written':>9} | {'hit rate':>8} | {'input cost':>10} | {'saved':>6}")
+    baseline = None
+    for strategy in ("none", "last message", "planner"):
+        cache = run_strategy(tools, requests, strategy)
+        cost = cache.cost_units * price / 1e6
+        baseline = cost if baseline is None else baseline
+        print(f"{strategy:>14} | {cache.prompt:>9.0f} | {cache.cached:>9.0f} | {cache.written:>9.0f} | "
+              f"{100 * cache.cached / cache.prompt:>7.1f}% | {cost:>9.4f}$ | {100 * (1 - cost / baseline):>5.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare prompt cache breakpoint strategies on a replayed session")
+    parser.add_argument("cassette", nargs="?", help="cassette to replay, default: the converted super_mario demo log")
+    parser.add_argument("--max-tokens", type=int, default=8, help="context window in k tokens, small enough to compress")
+    parser.add_argument("--fanout-max-tokens", type=int, default=64, help="context window of the synthetic fan-out session")
+    parser.add_argument("--price", type=float, default=3.0, help="input price in $ per million tokens")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        os.makedirs(os.path.join(home, ".quickstar"))
+        cassette = args.cassette
+        if cassette is None:
+            cassette = os.path.join(home, "super_mario.jsonl")
+            convert(DEMO_LOG, cassette)
+        with contextlib.redirect_stdout(io.StringIO()):
+            tools, requests, compressions = asyncio.run(capture_requests(home, os.path.abspath(cassette), args.max_tokens))
+            fanout = fanout_requests(args.fanout_max_tokens)
+    reset_singletons()
+
+    report(f"replayed session ({compressions} hard compressions)", tools, requests, args.price)
+    report("fan-out session (24 tool calls per turn)", tools, fanout, args.price)
+
+
+if __name__ == "__main__":
+    main()
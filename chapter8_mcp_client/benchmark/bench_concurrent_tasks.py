@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark: wall-clock time of N research sub-agents launched from one assistant
+message, run concurrently versus one after another (what a task tool that is
+not concurrency safe does, as when sub-agents shared one history stack).
+
+Every model turn takes --turn-latency seconds. A researcher writes its todos,
+runs --tool-turns shell-like tool rounds of --tool-latency seconds, then
+answers. The lead fans out to all researchers in one turn and summarizes their
+findings in the next.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageFunctionToolCall
+from openai.types.chat.chat_completion_message_function_tool_call import Function
+
+import core.conversation as conversation_module
+from core.cassette import Cassette
+from core.conversation import Conversation
+from core.history.history_manager import HistoryManager
+from core.telemetry import Telemetry
+from tools.base_tool import BaseTool
+from tools.output_spill import OutputSpillStore
+from tools.task import Task
+from tools.todo_write import TodoWrite
+from tools.tool_manager import ToolManager
+from tools.tool_selector import ToolSelector
+
+LEAD_PROMPT = "Survey the code base"
+
+
+class SilentUIManager:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class SearchTool(BaseTool):
+    latency = 0.0
+
+    @staticmethod
+    def get_tool_name():
+        return "search"
+
+    async def act(self, query=""):
+        await asyncio.sleep(self.latency)
+        return f"3 matches for {query}"
+
+    def json_schema(self):
+        return {"type": "function", "function": {"name": "search", "description": "Search", "parameters": {"type": "object", "properties": {}}}}
+
+    def get_status(self):
+        return ""
+
+
+def text_of(message):
+    content = message["content"]
+    return content if isinstance(content, str) else "".join(block.get("text", "") for block in content)
+
+
+def call(index, name, arguments):
+    return ChatCompletionMessageFunctionToolCall(
+        id=f"call_{name}_{index}", type="function", function=Function(name=name, arguments=json.dumps(arguments)),
+    )
+
+
+class ResearchAPIClient:
+    total_cost = 0
+
+    def __init__(self, agents, turn_latency, tool_turns):
+        self.agents = agents
+        self.turn_latency = turn_latency
+        self.tool_turns = tool_turns
+        self.requests = 0
+
+    async def get_completion_stream_async(self, request, timings=None, **scheduling):
+        self.requests += 1
+        messages = request["messages"]
+        prompt = text_of(messages[1])
+        rounds = sum(1 for m in messages if m["role"] == "assistant")
+        await asyncio.sleep(self.turn_latency)
+
+        content, tool_calls = "", None
+        if prompt == LEAD_PROMPT:
+            if rounds == 0:
+                tool_calls = [
+                    call(i, "task", {"description": f"area {i}", "prompt": f"Research area {i}", "subagent_type": "general-purpose"})
+                    for i in range(self.agents)
+                ]
+            else:
+                content = "Summary of all areas."
+        elif rounds == 0:
+            tool_calls = [call(0, "todo_write", {"todos": [{"id": "1", "content": prompt, "status": "in_progress"}]})]
+        elif rounds <= self.tool_turns:
+            tool_calls = [call(rounds, "search", {"query": f"{prompt} {rounds}"})]
+        else:
+            content = f"Findings of {prompt}."
+        yield ChatCompletionMessage(role="assistant", content=content, tool_calls=tool_calls)
+
+
+def build_conversation(api_client):
+    async def registered():
+        pass
+
+    HistoryManager._instance = None
+    HistoryManager._initialized = False
+    tool_manager = object.__new__(ToolManager)
+    tool_manager.tools = {}
+    tool_manager._manifest = None
+    tool_manager._subset_manifests = {}
+    tool_manager._selector = ToolSelector()
+    tool_manager.register_mcp_task = asyncio.ensure_future(registered())
+    for tool in (SearchTool(), TodoWrite(), Task()):
+        tool._ui_manager = SilentUIManager()
+        tool_manager._register_tool(tool.get_tool_name(), tool)
+    ToolManager._instance, ToolManager._initialized = tool_manager, True
+
+    conv = object.__new__(Conversation)
+    conv._initialized = True
+    conv._api_client = api_client
+    conv._tool_manager = tool_manager
+    conv._ui_manager = SilentUIManager()
+    conv._history_manager = HistoryManager()
+    conv._tool_semaphore = asyncio.Semaphore(int(os.getenv("TOOL_CONCURRENCY", 4)))
+    conv._output_spill = OutputSpillStore()
+    conv._cassette = Cassette()
+    conv._telemetry = Telemetry()
+    conv.todos = []
+    return conv
+
+
+async def run_lead(args, agents, concurrent):
+    Task.is_concurrency_safe = staticmethod(lambda: concurrent)
+    api_client = ResearchAPIClient(agents, args.turn_latency, args.tool_turns)
+    conv = build_conversation(api_client)
+    start = time.perf_counter()
+    await conv.start_task("You lead the research.", LEAD_PROMPT)
+    return time.perf_counter() - start, api_client.requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--turn-latency", type=float, default=0.5)
+    parser.add_argument("--tool-turns", type=int, default=2)
+    parser.add_argument("--tool-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    SearchTool.latency = args.tool_latency
+    conversation_module.get_reminder = lambda: "<reminder></reminder>"
+
+    print(f"TOOL_CONCURRENCY={os.getenv('TOOL_CONCURRENCY', 4)}, {args.turn_latency}s per model turn, "
+          f"{args.tool_turns} tool rounds of {args.tool_latency}s per researcher")
+    print(f"{'agents':>6} | {'requests':>8} | {'sequential':>10} {'concurrent':>10} | {'speed-up':>8}")
+    for agents in args.agents:
+        sequential, requests = asyncio.run(run_lead(args, agents, concurrent=False))
+        concurrent, _ = asyncio.run(run_lead(args, agents, concurrent=True))
+        print(f"{agents:>6} | {requests:>8} | {sequential:>9.2f}s {concurrent:>9.2f}s | {sequential / concurrent:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
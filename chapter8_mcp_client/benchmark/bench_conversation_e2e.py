@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: drive Conversation end to end against the bundled mock OpenAI server.
+
+Every scenario runs one task through the real APIClient (HTTP + SSE), history
+manager, tool manager (cmd_runner in the persistent shell) and UI (writing into
+an in-memory terminal). The scripted model time (time to first token plus
+tokens / token rate) is known, so whatever is left of the wall time is client
+overhead. Per-turn timings come from the telemetry events.
+
+Usage: python bench_conversation_e2e.py [scenario ...]   (default: all)
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+from rich.console import Console
+from core.api_client import APIClient
+from core.conversation import Conversation
+from core.history.history_manager import HistoryManager
+from core.telemetry import Telemetry, percentile
+from mock_openai import MockOpenAIServer, ScriptedResponse
+from tools.tool_manager import ToolManager
+from ui.ui_manager import UIManager
+
+
+def tool_round(index, content, **timing):
+    return ScriptedResponse(
+        content=content,
+        tool_calls=[{"name": "cmd_runner", "arguments": {"command": f"echo round {index}", "need_user_approve": False}}],
+        **timing
+    )
+
+
+def scenario(rounds, content, final, **timing):
+    return [tool_round(i, content, **timing) for i in range(rounds)] + [ScriptedResponse(content=final, **timing)]
+
+
+PARAGRAPH = "The quick brown fox jumps over the lazy dog, then checks the build output. "
+SCENARIOS = {
+    # no model latency at all, wall time is pure client overhead
+    "tool-loop-instant": scenario(50, PARAGRAPH, "Done."),
+    # a plausible hosted model: 200 ms to first token, 150 tokens/s
+    "tool-loop-realistic": scenario(10, PARAGRAPH * 3, "Done.", ttft=0.2, tokens_per_second=150),
+    # one long Markdown answer, mostly rendering work
+    "long-answer": [ScriptedResponse(content=("## Section\n\n" + PARAGRAPH * 8 + "\n\n```python\nprint('hi')\n```\n\n") * 40)],
+}
+
+
+def scripted_model_time(responses):
+    total = 0.0
+    for response in responses:
+        total += response.ttft
+        if response.tokens_per_second:
+            tokens = len(response.content) / response.chars_per_token
+            tokens += sum(len(json.dumps(c["arguments"])) for c in response.tool_calls) / response.chars_per_token
+            total += tokens / response.tokens_per_second
+    return total
+
+
+def reset_singletons():
+    for cls in (Conversation, APIClient, HistoryManager, ToolManager, Telemetry):
+        cls._instance = None
+        cls._initialized = False
+
+
+async def run_task(server, home, telemetry_log):
+    reset_singletons()
+    with open(os.path.join(home, ".quickstar", "mcp.json"), "w") as f:
+        json.dump({"mcpServers": {}}, f)
+    os.environ.update(
+        HOME=home, OPENAI_API_KEY="mock", OPENAI_BASE_URL=server.base_url,
+        OPENAI_MODEL="mock-model", TELEMETRY_LOG=telemetry_log
+    )
+
+    ui = UIManager()
+    terminal = Console(file=io.StringIO(), width=120, height=50, force_terminal=True)
+    ui._console = ui.display_manager._console = terminal
+
+    conv = Conversation()
+    await conv._tool_manager.get_tools_description()   # tool registration is not part of a turn
+    start = time.perf_counter()
+    await conv.start_task("You are a helpful assistant.", "Run the checks")
+    return time.perf_counter() - start
+
+
+def run_scenario(name, responses):
+    with tempfile.TemporaryDirectory() as home, MockOpenAIServer(responses) as server:
+        os.makedirs(os.path.join(home, ".quickstar"))
+        telemetry_log = os.path.join(home, "telemetry.jsonl")
+        # plain print()s from the UI go to the in-memory terminal as well
+        with contextlib.redirect_stdout(io.StringIO()):
+            wall = asyncio.run(run_task(server, home, telemetry_log))
+        with open(telemetry_log, encoding="utf-8") as f:
+            turns = [json.loads(line) for line in f]
+    reset_singletons()
+
+    model = scripted_model_time(responses)
+    overhead = (wall - model) / len(turns)
+    ttft = [t["ttft_ms"] for t in turns if t["ttft_ms"] is not None]
+    tools = [t["tool_wall_ms"] for t in turns if t["tool_calls"]]
+    bookkeeping = [t["history_ms"] + t["request_build_ms"] for t in turns]
+    print(f"{name:>20} | {len(turns):>5} | {wall:>7.2f} s | {model:>7.2f} s | {overhead * 1000:>8.1f} ms | "
+          f"{percentile(ttft, 0.5):>7.1f} ms | {(percentile(tools, 0.5) or 0):>7.1f} ms | "
+          f"{percentile(bookkeeping, 0.5):>6.2f} ms")
+
+
+def main():
+    names = sys.argv[1:] or list(SCENARIOS)
+    print(f"{'scenario':>20} | {'turns':>5} | {'wall':>9} | {'model':>9} | {'overhead/turn':>11} | "
+          f"{'ttft p50':>10} | {'tool p50':>10} | {'bookkeeping p50':>9}")
+    for name in names:
+        run_scenario(name, SCENARIOS[name])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-turn history overhead of the old deepcopy approach versus the
+copy-on-write message store, at 100, 1,000 and 10,000 messages.
+
+One "turn" is what Conversation does before every model request: read the
+current messages and add the cache_control mark to the last one.
+"""
+import copy
+import os
+import sys
+import time
+import tracemalloc
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+from core.history.history_manager import HistoryManager, Role
+from core.history.message_store import thaw, with_cache_mark
+
+SIZES = [100, 1000, 10000]
+TEXT = "lorem ipsum dolor sit amet " * 40   # ~1 KB per message
+TOOL_OUTPUT = "x" * 64 * 1024              # every 50th message is a 64 KB tool output
+
+
+def build_history(size):
+    HistoryManager._instance = None
+    HistoryManager._initialized = False
+    manager = HistoryManager()
+    manager.add_message({"role": Role.SYSTEM, "content": [{"type": "text", "text": TEXT}]})
+    roles = [Role.USER, Role.ASSISTANT, Role.TOOL]
+    for i in range(1, size):
+        text = TOOL_OUTPUT if i % 50 == 0 else TEXT
+        manager.add_message({"role": roles[i % 3], "content": [{"type": "text", "text": text}]})
+    return manager
+
+
+def deepcopy_turn(plain_messages):
+    messages = copy.deepcopy(plain_messages)
+    if messages and "content" in messages[-1] and messages[-1]["content"]:
+        messages[-1]["content"][-1]["cache_control"] = {"type": "ephemeral"}
+    return messages
+
+
+def copy_on_write_turn(manager):
+    return with_cache_mark(manager.get_current_messages())
+
+
+def measure(turn, history, size):
+    repeat = max(3, 3000 // size)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        turn(history)
+    per_turn = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    turn(history)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_turn, peak
+
+
+def main():
+    print(f"{'messages':>9} | {'deepcopy':>12} {'peak':>10} | {'copy-on-write':>13} {'peak':>10} | speedup")
+    for size in SIZES:
+        manager = build_history(size)
+        # the old HistoryManager stored plain, mutable dicts
+        plain_messages = [thaw(message) for message in manager.messages_history[-1]]
+        old_time, old_peak = measure(deepcopy_turn, plain_messages, size)
+        new_time, new_peak = measure(copy_on_write_turn, manager, size)
+        print(f"{size:>9} | {old_time * 1000:>9.3f} ms {old_peak / 1024:>7.0f} KB | "
+              f"{new_time * 1000:>10.3f} ms {new_peak / 1024:>7.1f} KB | {old_time / new_time:>6.0f}x")
+
+
+if __name__ == "__main__":
+    main()
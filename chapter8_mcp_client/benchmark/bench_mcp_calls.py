@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tool calls to 3 MCP servers under load, with some calls hanging.
+
+Every server is src/mcp_servers/mock_server.py with its sleep tool. Each call
+sleeps a random 10-200ms on the server, one in --hung-every sleeps far longer
+than the call timeout. "serial" runs one call per server at a time, as a
+single-flight client would, "multiplexed" up to --max-concurrency at once on
+the same session. Reported: wall time, throughput, and per server the latency
+histogram and the timeout count. A hung call costs its timeout either way,
+serialized it also holds up every call queued behind it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+import core
+from tools.mcp_client.client import MCPClient
+
+MOCK_SERVER = os.path.join(current_dir, "../src/mcp_servers/mock_server.py")
+SERVERS = ["github", "slack", "jira"]
+
+
+def write_config(timeout, max_concurrency):
+    config = {"mcpServers": {
+        name: {"type": "stdio", "command": sys.executable,
+               "args": [MOCK_SERVER, "--name", name, "--tools", "1", "--sleep-tool"],
+               "timeout": timeout, "maxConcurrency": max_concurrency}
+        for name in SERVERS
+    }}
+    path = os.path.join(tempfile.mkdtemp(), "mcp.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    return path
+
+
+async def run(config, calls, hung_every, seed):
+    client = MCPClient(config)
+    # listed in the catalog by an earlier run the servers start lazily, not within the timing
+    await asyncio.gather(*(connection.ensure_started() for connection in client.connections.values()))
+    rng = random.Random(seed)
+    jobs = []
+    for index in range(calls):
+        server = SERVERS[index % len(SERVERS)]
+        seconds = 3600 if hung_every and index % hung_every == hung_every - 1 else rng.uniform(0.01, 0.2)
+        jobs.append(client.connections[server].call_tool(f"{server}_sleep", {"seconds": seconds}))
+
+    start = time.perf_counter()
+    await asyncio.gather(*jobs, return_exceptions=True)
+    wall = time.perf_counter() - start
+    await client.close()
+    return wall, client.call_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=60)
+    parser.add_argument("--hung-every", type=int, default=20, help="every n-th call hangs, 0 for none")
+    parser.add_argument("--timeout", type=float, default=1.0)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ["MCP_CATALOG"] = os.path.join(tempfile.mkdtemp(), "mcp_catalog.json")
+    print(f"{args.calls} calls to {len(SERVERS)} servers, 10-200ms each, every {args.hung_every}th hangs, "
+          f"timeout {args.timeout:g}s")
+    for mode, concurrency in (("serial", 1), ("multiplexed", args.max_concurrency)):
+        config = write_config(args.timeout, concurrency)
+        wall, stats = asyncio.run(run(config, args.calls, args.hung_every, args.seed))
+        print(f"\n{mode} (max {concurrency} per server): {wall:.2f}s, {args.calls / wall:.1f} calls/s")
+        for name, server_stats in stats.items():
+            print(f"  {name:>7}: {server_stats.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark: --agents agents using --servers MCP servers, spawned over stdio or
+shared over streamable HTTP.
+
+Each agent is an MCPClient of its own, as each CLI process would be. Over stdio
+every agent spawns its own copy of every server, agents x servers processes.
+Over HTTP every server runs once, src/mcp_servers/mock_server.py with
+--transport streamable-http, and the agents' sessions share it. Reported: the
+time to open a session, the latency of an echo call, one agent at a time and
+all agents at once, and the resident memory of the server processes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+import core
+from core.telemetry import percentile
+from tools.mcp_client.catalog import ToolCatalog
+from tools.mcp_client.client import MCPClient
+from bench_mcp_lazy import children_rss
+
+MOCK_SERVER = os.path.join(current_dir, "../src/mcp_servers/mock_server.py")
+SERVERS = ["github", "slack", "jira", "notion", "sentry"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_http_servers(names):
+    """One HTTP server per name, returns the processes and their URLs"""
+    processes, urls = [], {}
+    for name in names:
+        port = free_port()
+        processes.append(subprocess.Popen(
+            [sys.executable, MOCK_SERVER, "--name", name, "--transport", "streamable-http", "--port", str(port)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+        urls[name] = f"http://127.0.0.1:{port}/mcp"
+    for url in urls.values():
+        port = int(url.split(":")[2].split("/")[0])
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+    return processes, urls
+
+
+def write_config(names, urls=None):
+    if urls is None:
+        servers = {name: {"type": "stdio", "command": sys.executable, "args": [MOCK_SERVER, "--name", name]} for name in names}
+    else:
+        servers = {name: {"type": "http", "url": urls[name]} for name in names}
+    path = os.path.join(tempfile.mkdtemp(), "mcp.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"mcpServers": servers}, f)
+    return path
+
+
+async def run(config, names, agents, calls):
+    clients = [MCPClient(config, ToolCatalog(os.path.join(tempfile.mkdtemp(), "catalog.json"))) for _ in range(agents)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client.connect_to_server() for client in clients))
+    startup = time.perf_counter() - start
+    session_times = [connection.startup_time for client in clients for connection in client.connections.values()]
+    rss, processes = children_rss()
+
+    async def call(client, index):
+        name = names[index % len(names)]
+        started = time.perf_counter()
+        await client.connections[name].call_tool(f"{name}_0", {"text": "hello"})
+        return time.perf_counter() - started
+
+    # one agent at a time, then all agents at once
+    sequential = [await call(clients[i % agents], i) for i in range(calls)]
+    start = time.perf_counter()
+    concurrent = await asyncio.gather(*(call(client, i) for client in clients for i in range(calls // agents)))
+    concurrent_wall = time.perf_counter() - start
+    await asyncio.gather(*(client.close() for client in clients))
+    return startup, session_times, sequential, concurrent, concurrent_wall, rss, processes
+
+
+def report(mode, startup, session_times, sequential, concurrent, concurrent_wall, rss, processes):
+    ms = lambda seconds: f"{seconds * 1000:.1f}ms"
+    print(f"{mode:>6} | {startup:>6.2f}s {ms(percentile(session_times, 0.5)):>9} | "
+          f"{ms(percentile(sequential, 0.5)):>8} {ms(percentile(sequential, 0.95)):>8} | "
+          f"{ms(percentile(concurrent, 0.5)):>8} {ms(percentile(concurrent, 0.95)):>8} {len(concurrent) / concurrent_wall:>7.0f}/s | "
+          f"{processes:>5} {rss / 2 ** 20:>7.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=4)
+    parser.add_argument("--servers", type=int, default=3)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+    names = SERVERS[:args.servers]
+
+    print(f"{args.agents} agents x {len(names)} servers, {args.calls} echo calls")
+    print(f"{'':>6} | {'startup':>7} {'session':>9} | {'sequential p50/p95':>17} | "
+          f"{'concurrent p50/p95, throughput':>27} | {'servers':>7} {'RSS':>7}")
+    report("stdio", *asyncio.run(run(write_config(names), names, args.agents, args.calls)))
+
+    processes, urls = start_http_servers(names)
+    try:
+        report("http", *asyncio.run(run(write_config(names, urls), names, args.agents, args.calls)))
+    finally:
+        for process in processes:
+            process.kill()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: startup time and resident memory of 10 MCP servers, started
+eagerly or on demand.
+
+Every server is src/mcp_servers/mock_server.py with 4 to 12 tools, taking
+--startup-delay seconds on top of its interpreter start. "eager" is a first
+run, no tool catalog yet: every server is started to list its tools. "lazy" is
+every later run: the tools come from the catalog and no server runs until one
+of its tools is called, which the benchmark does for one server.
+
+Memory is the resident set of the server processes, children of this one.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+import core
+from tools.tool_manager import ToolManager
+
+MOCK_SERVER = os.path.join(current_dir, "../src/mcp_servers/mock_server.py")
+SERVERS = ["github", "slack", "filesystem", "postgres", "browser", "calendar", "jira", "notion", "sentry", "weather"]
+
+
+def write_config(startup_delay):
+    config = {"mcpServers": {
+        name: {"type": "stdio", "command": sys.executable,
+               "args": [MOCK_SERVER, "--name", name, "--tools", str(4 + i % 9), "--startup-delay", str(startup_delay)]}
+        for i, name in enumerate(SERVERS)
+    }}
+    path = os.path.join(tempfile.mkdtemp(), "mcp.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    return path
+
+
+def children_rss():
+    """Resident bytes and count of this process's child processes"""
+    total, count = 0, 0
+    page = os.sysconf("SC_PAGE_SIZE")
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            if ppid != os.getpid():
+                continue
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * page
+            count += 1
+        except (OSError, ValueError, IndexError):
+            continue
+    return total, count
+
+
+async def run():
+    ToolManager._instance = None
+    ToolManager._initialized = False
+    start = time.perf_counter()
+    manager = ToolManager()
+    await manager.register_mcp_task
+    startup = time.perf_counter() - start
+    tools = sum(1 for name in manager.tools if name.split("_")[0] in SERVERS)
+    idle_rss = children_rss()
+
+    call_start = time.perf_counter()
+    await manager.run_tool("github_0", text="hello")
+    first_call = time.perf_counter() - call_start
+    called_rss = children_rss()
+    await manager._mcp_client.close()
+    return startup, tools, idle_rss, first_call, called_rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--startup-delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    os.environ["MCP_CONFIG"] = write_config(args.startup_delay)
+    os.environ["MCP_CATALOG"] = os.path.join(tempfile.mkdtemp(), "mcp_catalog.json")
+    print(f"{len(SERVERS)} servers, interpreter start + {args.startup_delay:.1f}s each")
+    print(f"{'mode':>5} | {'tools':>5} {'startup':>8} | {'servers':>7} {'RSS':>8} | {'1st call':>8} | {'servers':>7} {'RSS':>8}")
+    for mode in ("eager", "lazy"):
+        startup, tools, (idle_bytes, idle_count), first_call, (called_bytes, called_count) = asyncio.run(run())
+        print(f"{mode:>5} | {tools:>5} {startup:>7.2f}s | {idle_count:>7} {idle_bytes / 2 ** 20:>6.1f}MB | "
+              f"{first_call:>7.2f}s | {called_count:>7} {called_bytes / 2 ** 20:>6.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time until the first request can be sent, with 1, 5 and 20 MCP
+servers in the config.
+
+Every server is src/mcp_servers/mock_server.py taking --startup-delay seconds
+before it answers (a package download, an auth round trip...) on top of its
+interpreter start. "sequential" is the MCPClient as it was: connect and
+initialize one server after the other, the first request waits for all of them.
+"parallel" is the ToolManager as it is: servers start side by side and the
+first request waits for them until MCP_STARTUP_WAIT at most.
+
+With --hung, one more server never answers its initialize. The sequential
+client waits for it forever, so only the parallel one is run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import AsyncExitStack
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+import core
+from tools.mcp_client.server_config import MCPConfig
+from tools.tool_manager import ToolManager
+
+MOCK_SERVER = os.path.join(current_dir, "../src/mcp_servers/mock_server.py")
+
+
+def write_config(servers, startup_delay, hung):
+    config = {"mcpServers": {
+        f"server{i}": {"type": "stdio", "command": sys.executable,
+                       "args": [MOCK_SERVER, "--name", f"server{i}", "--tools", "3", "--startup-delay", str(startup_delay)]}
+        for i in range(servers)
+    }}
+    if hung:
+        config["mcpServers"]["hung"] = {"type": "stdio", "command": sys.executable, "args": [MOCK_SERVER, "--hang"]}
+    path = os.path.join(tempfile.mkdtemp(), "mcp.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    return path
+
+
+async def sequential(path):
+    """The former MCPClient.connect_to_server, then the tools of every session"""
+    start = time.perf_counter()
+    config = MCPConfig(path)
+    tools = 0
+    async with AsyncExitStack() as stack:
+        for name in config.list_servers():
+            server = config.get_server(name)
+            params = StdioServerParameters(command=server.command, args=server.args, env=None)
+            read, write = await stack.enter_async_context(stdio_client(params))
+            session = await stack.enter_async_context(ClientSession(read, write))
+            await session.initialize()
+            tools += len((await session.list_tools()).tools)
+        elapsed = time.perf_counter() - start
+    return elapsed, elapsed, tools
+
+
+async def parallel(path):
+    ToolManager._instance = None
+    ToolManager._initialized = False
+    os.environ["MCP_CONFIG"] = path
+    start = time.perf_counter()
+    manager = ToolManager()
+    manifest = await manager.get_tool_manifest()
+    first_request = time.perf_counter() - start
+    tools = len([name for name in manifest.names if name.startswith("server")])
+    await manager.register_mcp_task
+    all_tools = time.perf_counter() - start
+    await manager._mcp_client.close()
+    return first_request, all_tools, tools
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servers", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--startup-delay", type=float, default=1.0)
+    parser.add_argument("--hung", action="store_true")
+    args = parser.parse_args()
+
+    print(f"each server: interpreter start + {args.startup_delay:.1f}s, MCP_STARTUP_WAIT={os.getenv('MCP_STARTUP_WAIT', '3')}s"
+          + (", plus one hung server" if args.hung else ""))
+    print(f"{'servers':>7} | {'mode':>10} | {'first request':>13} {'tools in it':>11} | {'all tools':>9}")
+    for servers in args.servers:
+        path = write_config(servers, args.startup_delay, args.hung)
+        for mode, run in (("sequential", sequential), ("parallel", parallel)):
+            if args.hung and mode == "sequential":
+                print(f"{servers:>7} | {mode:>10} | {'never':>13} {'-':>11} | {'never':>9}")
+                continue
+            first_request, all_tools, tools = asyncio.run(run(path))
+            print(f"{servers:>7} | {mode:>10} | {first_request:>12.2f}s {tools:>11} | {all_tools:>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
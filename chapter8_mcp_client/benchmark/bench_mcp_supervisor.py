@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tool calls to an MCP server that crashes every --crash-every seconds.
+
+4 workers keep calling the server's idempotent sleep tool (50ms) for
+--duration seconds while the server is told to exit now and then. Without a
+supervisor the first crash fails every later call. Supervised, the server is
+restarted, the calls cut off by the crash are sent again, and the run reports
+how many calls failed, how long the server was down per crash, and the
+server's health.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+import core
+from tools.mcp_client.client import MCPClient
+
+MOCK_SERVER = os.path.join(current_dir, "../src/mcp_servers/mock_server.py")
+
+
+def write_config():
+    config = {"mcpServers": {"notes": {
+        "type": "stdio", "command": sys.executable,
+        "args": [MOCK_SERVER, "--name", "notes", "--sleep-tool", "--crash-tool"],
+    }}}
+    path = os.path.join(tempfile.mkdtemp(), "mcp.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    return path
+
+
+async def run(duration, crash_every, workers):
+    client = MCPClient(write_config())
+    await client.connect_to_server()
+    notes = client.connections["notes"]
+    deadline = time.monotonic() + duration
+    failed = []
+
+    async def worker():
+        while time.monotonic() < deadline:
+            try:
+                await notes.call_tool("notes_sleep", {"seconds": 0.05})
+            except Exception as e:
+                failed.append(e)
+                await asyncio.sleep(0.05)
+
+    async def crasher():
+        while time.monotonic() + crash_every < deadline:
+            await asyncio.sleep(crash_every)
+            try:
+                await notes.call_tool("notes_crash", {"delay": 0})
+            except Exception:
+                pass
+
+    start = time.monotonic()
+    await asyncio.gather(crasher(), *(worker() for _ in range(workers)))
+    wall = time.monotonic() - start
+    health = notes.health()
+    summary = notes.stats.summary()
+    await client.close()
+    return wall, failed, health, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--crash-every", type=float, default=4)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    os.environ["MCP_CATALOG"] = os.path.join(tempfile.mkdtemp(), "mcp_catalog.json")
+    wall, failed, health, summary = asyncio.run(run(args.duration, args.crash_every, args.workers))
+    down = wall - health["uptime"]
+    print(f"{wall:.1f}s, a crash every {args.crash_every:g}s, {args.workers} workers")
+    print(f"calls: {summary}")
+    print(f"failed calls: {len(failed)}, retried after a crash: {health['retried']}")
+    print(f"crashes: {health['lost']}, restarts: {health['restarts']}, "
+          f"down {down:.1f}s ({down / max(health['lost'], 1):.2f}s per crash), "
+          f"available {health['uptime'] / wall:.1%}")
+    for error in {str(e) for e in failed}:
+        print(f"  {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: a main agent and several sub-agents sharing one rate limited
+provider, with and without the APIClient's request scheduler.
+
+The mock server allows --rpm requests per minute with a burst of --burst
+requests and answers 429 with retry-after beyond that. The main agent sends a
+request, "runs tools" for --tool-time, and sends the next one. Each sub-agent
+sends its requests back to back.
+
+"sdk" is the client as it was: every agent calls the OpenAI SDK directly,
+which retries a 429 on its own (twice) after the retry-after. "scheduler" goes
+through APIClient.get_completion_stream_async: one token bucket for all agents,
+fed by the x-ratelimit-* headers, the main agent first.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+from openai import AsyncOpenAI
+
+from core.api_client import APIClient
+from core.telemetry import percentile
+from mock_openai import MockOpenAIServer, ScriptedResponse
+
+
+def request():
+    return {"messages": [{"role": "user", "content": "Next step please"}]}
+
+
+async def sdk_call(client, priority):
+    stream = await client.chat.completions.create(model="mock-model", stream=True, **request())
+    async for _ in stream:
+        pass
+
+
+async def scheduler_call(client, priority):
+    async for _ in client.get_completion_stream_async(request(), priority=priority):
+        pass
+
+
+async def agent(call, client, priority, requests, pause, latencies, failures):
+    for _ in range(requests):
+        start = time.perf_counter()
+        try:
+            await call(client, priority)
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            failures.append(priority)
+        await asyncio.sleep(pause)
+
+
+async def run(args, mode, base_url):
+    if mode == "sdk":
+        client, call = AsyncOpenAI(api_key="mock", base_url=base_url), sdk_call
+    else:
+        APIClient._instance = None
+        APIClient._initialized = False
+        os.environ.update(OPENAI_API_KEY="mock", OPENAI_BASE_URL=base_url, OPENAI_MODEL="mock-model")
+        client, call = APIClient(), scheduler_call
+
+    main_latencies, sub_latencies, failures = [], [], []
+    start = time.perf_counter()
+    await asyncio.gather(
+        agent(call, client, 0, args.main_requests, args.tool_time, main_latencies, failures),
+        *(agent(call, client, 1, args.sub_requests, 0, sub_latencies, failures) for _ in range(args.sub_agents)),
+    )
+    return time.perf_counter() - start, main_latencies, sub_latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rpm", type=int, default=600)
+    parser.add_argument("--burst", type=int, default=5)
+    parser.add_argument("--sub-agents", type=int, default=6)
+    parser.add_argument("--sub-requests", type=int, default=12)
+    parser.add_argument("--main-requests", type=int, default=10)
+    parser.add_argument("--tool-time", type=float, default=0.3)
+    args = parser.parse_args()
+
+    total = args.main_requests + args.sub_agents * args.sub_requests
+    print(f"{total} requests, {args.rpm} requests/min with a burst of {args.burst}, "
+          f"1 main agent + {args.sub_agents} sub-agents")
+    print(f"{'mode':>9} | {'wall':>6} | {'429s':>5} {'failed':>6} | {'main p50':>8} {'main p95':>8} | {'sub p50':>7} {'sub p95':>7}")
+    for mode in ("sdk", "scheduler"):
+        responses = [ScriptedResponse(content="Done with this step.", ttft=0.02)]
+        with MockOpenAIServer(responses, loop=True, requests_per_minute=args.rpm, burst=args.burst / args.rpm) as server:
+            wall, main_latencies, sub_latencies, failures = asyncio.run(run(args, mode, server.base_url))
+        print(f"{mode:>9} | {wall:>5.1f}s | {server.rate_limited:>5} {len(failures):>6} | "
+              f"{percentile(main_latencies, 0.5) or 0:>7.2f}s {percentile(main_latencies, 0.95) or 0:>7.2f}s | "
+              f"{percentile(sub_latencies, 0.5) or 0:>6.2f}s {percentile(sub_latencies, 0.95) or 0:>6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
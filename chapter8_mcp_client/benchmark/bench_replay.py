@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark: replay a recorded session through the real Conversation.
+
+The cassette stands in for the model, the tools and the keyboard, so the same
+session can be run before and after a change. History, tool dispatch and
+rendering are the code under test. Per-turn client overhead is the turn's wall
+time minus the time spent waiting for the model (time to first token plus
+generation) and the tools.
+
+With no cassette given, demo/super_mario/generate.log is converted first (see
+log_to_cassette.py). Record a real session with CASSETTE_MODE=record and
+CASSETTE_PATH=session.jsonl to replay it here instead.
+
+Usage: python bench_replay.py [cassette.jsonl] [--timing zero|original]
+                              [--telemetry out.jsonl] [--baseline old.jsonl]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+from rich.console import Console
+from core.api_client import APIClient
+from core.cassette import Cassette
+from core.conversation import Conversation
+from core.history.history_manager import HistoryManager
+from core.telemetry import Telemetry, percentile
+from log_to_cassette import convert
+from tools.tool_manager import ToolManager
+from ui.ui_manager import UIManager
+
+DEMO_LOG = os.path.join(current_dir, "../../demo/super_mario/generate.log")
+
+
+def reset_singletons():
+    for cls in (Conversation, APIClient, HistoryManager, ToolManager, Telemetry, Cassette):
+        cls._instance = None
+        cls._initialized = False
+
+
+async def replay(home, cassette, timing, telemetry_log):
+    reset_singletons()
+    with open(os.path.join(home, ".quickstar", "mcp.json"), "w") as f:
+        json.dump({"mcpServers": {}}, f)
+    os.environ.update(
+        HOME=home, OPENAI_API_KEY="replay", OPENAI_BASE_URL="http://127.0.0.1:9/v1", OPENAI_MODEL="replay",
+        BACKGROUND_SUMMARY="false",
+        CASSETTE_MODE="replay", CASSETTE_PATH=cassette, CASSETTE_TIMING=timing, TELEMETRY_LOG=telemetry_log
+    )
+
+    ui = UIManager()
+    terminal = Console(file=io.StringIO(), width=120, height=50, force_terminal=True)
+    ui._console = ui.display_manager._console = terminal
+
+    conv = Conversation()
+    await conv._tool_manager.get_tools_description()
+    await conv.start_conversation()
+
+
+def overhead_ms(turn):
+    waited = (turn["ttft_ms"] or 0) + (turn["generation_ms"] or 0) + (turn["tool_wall_ms"] or 0)
+    return turn["total_ms"] - waited
+
+
+def load_turns(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session and report client overhead per turn")
+    parser.add_argument("cassette", nargs="?", help="cassette to replay, default: the converted super_mario demo log")
+    parser.add_argument("--timing", choices=("zero", "original"), default="zero")
+    parser.add_argument("--telemetry", help="keep the telemetry events of this run here")
+    parser.add_argument("--baseline", help="telemetry events of an earlier run to compare with, turn by turn")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        os.makedirs(os.path.join(home, ".quickstar"))
+        cassette = args.cassette
+        if cassette is None:
+            cassette = os.path.join(home, "super_mario.jsonl")
+            convert(DEMO_LOG, cassette)
+        telemetry_log = os.path.abspath(args.telemetry) if args.telemetry else os.path.join(home, "telemetry.jsonl")
+        if os.path.exists(telemetry_log):
+            os.remove(telemetry_log)
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(replay(home, os.path.abspath(cassette), args.timing, telemetry_log))
+        turns = load_turns(telemetry_log)
+    reset_singletons()
+
+    baseline = load_turns(args.baseline) if args.baseline else []
+    header = f"{'turn':>4} | {'messages':>8} | {'total':>9} | {'model':>9} | {'tools':>9} | {'overhead':>9}"
+    print(header + (f" | {'baseline':>9} | {'delta':>9}" if baseline else ""))
+    for index, turn in enumerate(turns):
+        model = (turn["ttft_ms"] or 0) + (turn["generation_ms"] or 0)
+        line = (f"{index + 1:>4} | {turn['messages']:>8} | {turn['total_ms']:>6.1f} ms | {model:>6.1f} ms | "
+                f"{turn['tool_wall_ms']:>6.1f} ms | {overhead_ms(turn):>6.1f} ms")
+        if index < len(baseline):
+            before = overhead_ms(baseline[index])
+            line += f" | {before:>6.1f} ms | {overhead_ms(turn) - before:>+6.1f} ms"
+        print(line)
+
+    overheads = [overhead_ms(turn) for turn in turns]
+    print(f"\n{len(turns)} turns, overhead p50 {percentile(overheads, 0.5):.1f} ms, "
+          f"p90 {percentile(overheads, 0.9):.1f} ms, total {sum(overheads):.1f} ms")
+    if baseline:
+        before = [overhead_ms(turn) for turn in baseline]
+        print(f"baseline: {len(baseline)} turns, overhead p50 {percentile(before, 0.5):.1f} ms, total {sum(before):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Benchmark: 500 sequential small cmd_runner commands in persistent-shell mode
+versus spawning a new shell per call.
+"""
+import asyncio
+import os
+import sys
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+import core.conversation  # core and tools import each other, load core first like main.py
+from tools.cmd_runner import CmdRunner
+
+COMMANDS = 500
+COMMAND = "echo hello"
+
+
+class QuietUIManager:
+    def print_tool_output(self, line, is_stderr=False):
+        pass
+
+
+async def run_persistent(runner):
+    for _ in range(COMMANDS):
+        await runner.act(command=COMMAND)
+
+
+async def run_spawn(runner):
+    for _ in range(COMMANDS):
+        await runner._run_in_new_process(COMMAND, 30)
+
+
+async def main():
+    runner = CmdRunner()
+    runner._ui_manager = QuietUIManager()
+    if runner._shell_session is None:
+        print("persistent shell not available (needs bash on a POSIX system)")
+        return
+
+    results = {}
+    for name, run in (("spawn per call", run_spawn), ("persistent shell", run_persistent)):
+        start = time.perf_counter()
+        await run(runner)
+        results[name] = time.perf_counter() - start
+        print(f"{name:<17} {results[name]:7.2f} s total | {results[name] / COMMANDS * 1000:6.2f} ms per command")
+    await runner._shell_session.close()
+    print(f"\nspeedup: {results['spawn per call'] / results['persistent shell']:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
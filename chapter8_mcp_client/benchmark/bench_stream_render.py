@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark: replay the 70 KB demo/super_mario/generate.log response through the
+old full-buffer Markdown renderer and the incremental block renderer.
+
+Both run through a real rich Live display writing into an in-memory terminal,
+so the numbers include the Live refresh thread as well as per-chunk parsing.
+
+Usage: python bench_stream_render.py [chunk_size]   (default 64 chars, ~16 tokens;
+smaller chunks make the full-buffer run take minutes)
+"""
+import io
+import os
+import sys
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+from rich.console import Console
+from rich.markdown import Markdown
+from ui.display_manager import DisplayManager
+
+LOG_PATH = os.path.join(current_dir, '../../demo/super_mario/generate.log')
+CHUNK_SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+
+
+class FullBufferDisplayManager(DisplayManager):
+    """The previous renderer: reparse the whole buffer on every chunk"""
+
+    def print_streaming_content(self, chunk: str) -> None:
+        self._stream_buffer += chunk
+        if self._live:
+            self._live.update(Markdown(self._stream_buffer))
+
+
+def replay(display_class, text):
+    console = Console(file=io.StringIO(), width=120, height=50, force_terminal=True)
+    display = display_class(console)
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    display.start_stream_display()
+    worst_chunk = 0.0
+    for i in range(0, len(text), CHUNK_SIZE):
+        chunk_start = time.perf_counter()
+        display.print_streaming_content(text[i:i + CHUNK_SIZE])
+        worst_chunk = max(worst_chunk, time.perf_counter() - chunk_start)
+    display.stop_stream_display()
+    return time.perf_counter() - start, time.process_time() - cpu_start, worst_chunk
+
+
+def main():
+    with open(LOG_PATH, encoding="utf-8") as f:
+        text = f.read()
+
+    chunks = (len(text) + CHUNK_SIZE - 1) // CHUNK_SIZE
+    print(f"Replaying {len(text) / 1024:.1f} KB as {chunks} chunks of {CHUNK_SIZE} chars\n")
+    results = {}
+    for name, display_class in (("full buffer", FullBufferDisplayManager), ("incremental", DisplayManager)):
+        wall, cpu, worst = replay(display_class, text)
+        results[name] = wall
+        print(f"{name:<12} wall {wall:8.2f} s | cpu {cpu:8.2f} s | slowest chunk {worst * 1000:8.1f} ms")
+    print(f"\nspeedup: {results['full buffer'] / results['incremental']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: long answers whose stream drops midway, answered by a full
+non-streaming request (as the Conversation did) or resumed from the partial
+answer (APIClient with its RetryPolicy).
+
+The mock server streams --tokens tokens at --tps tokens/s and cuts the
+connection at a random point of every first attempt. A resumed request ends
+with the partial answer as an assistant prefill, and the mock continues the
+answer from there. Reported: generated tokens (the partial ones included),
+and the time until the answer is complete.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+from openai import AsyncOpenAI
+
+from core.api_client import APIClient
+from core.telemetry import percentile
+from mock_openai import MockOpenAIServer, ScriptedResponse
+
+CHARS_PER_TOKEN = 4
+
+
+class DroppingModel:
+    """Answers one long text, drops the first attempt of every stream, counts generated characters"""
+
+    def __init__(self, answer, tps, seed):
+        self.answer = answer
+        self.tps = tps
+        self.random = random.Random(seed)
+        self.generated = 0
+
+    def __call__(self, body):
+        last = body["messages"][-1]
+        if last["role"] == "assistant":
+            content = self.answer[len(last["content"]):]
+        else:
+            content = self.answer
+        drop_after = None
+        if body.get("stream") and last["role"] != "assistant":
+            drop_after = self.random.randrange(len(content) // 10, len(content) * 9 // 10)
+        self.generated += drop_after or len(content)
+        return ScriptedResponse(content=content, tokens_per_second=self.tps, drop_after=drop_after,
+                                chars_per_token=CHARS_PER_TOKEN)
+
+
+def request():
+    return {"messages": [{"role": "user", "content": "Write the design document"}]}
+
+
+async def fallback_call(client):
+    """The stream as the SDK gives it, a failed stream answered by one non-streaming request"""
+    try:
+        stream = await client.chat.completions.create(model="mock-model", stream=True, **request())
+        async for _ in stream:
+            pass
+    except Exception:
+        await client.chat.completions.create(model="mock-model", **request())
+
+
+async def resume_call(client):
+    async for _ in client.get_completion_stream_async(request()):
+        pass
+
+
+async def run(mode, base_url, answers):
+    if mode == "fallback":
+        client, call = AsyncOpenAI(api_key="mock", base_url=base_url, max_retries=0), fallback_call
+    else:
+        APIClient._instance = None
+        APIClient._initialized = False
+        os.environ.update(OPENAI_API_KEY="mock", OPENAI_BASE_URL=base_url, OPENAI_MODEL="mock-model")
+        client, call = APIClient(), resume_call
+        client.retry_policy.base_delay = 0.05
+
+    latencies = []
+    for _ in range(answers):
+        start = time.perf_counter()
+        await call(client)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answers", type=int, default=10)
+    parser.add_argument("--tokens", type=int, default=400)
+    parser.add_argument("--tps", type=float, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    answer = "".join(f"word{i % 10} " for i in range(args.tokens * CHARS_PER_TOKEN // 6))[:args.tokens * CHARS_PER_TOKEN]
+    print(f"{args.answers} answers of {args.tokens} tokens at {args.tps:.0f} tok/s, every stream dropped once")
+    print(f"{'mode':>8} | {'generated':>9} {'per answer':>10} | {'p50':>6} {'p95':>6}")
+    for mode in ("fallback", "resume"):
+        model = DroppingModel(answer, args.tps, args.seed)
+        with MockOpenAIServer(model) as server:
+            latencies = asyncio.run(run(mode, server.base_url, args.answers))
+        tokens = model.generated // CHARS_PER_TOKEN
+        print(f"{mode:>8} | {tokens:>9} {tokens / args.answers:>10.0f} | "
+              f"{percentile(latencies, 0.5):>5.2f}s {percentile(latencies, 0.95):>5.2f}s")
+
+
+if __name__ == "__main__":
+    main()
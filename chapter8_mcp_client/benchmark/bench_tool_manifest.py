@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-turn cost of the tool schemas, rebuilt from every tool's
+json_schema() versus taken from the compiled ToolManifest.
+
+The built-in tools are registered together with 0, 20 and 100 MCP tools of a
+typical size. "schemas" is what get_tools_description costs. "+ encode" adds
+the JSON encoding the OpenAI client does for every request, which the manifest
+can't skip but whose input no longer has to be rebuilt.
+"""
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+from core.history.message_store import FrozenDict  # noqa: F401  (core before tools, see tool_manager)
+from tools.cmd_runner import CmdRunner
+from tools.mcp_tool import McpTool
+from tools.read_tool_output import ReadToolOutput
+from tools.smart_context_cropper import SmartContextCropper
+from tools.task import Task
+from tools.todo_write import TodoWrite
+from tools.tool_manifest import ToolManifest
+
+MCP_TOOL_COUNTS = [0, 20, 100]
+TURNS = 2000
+
+
+def build_tools(mcp_tools):
+    tools = {tool.get_tool_name(): tool for tool in (SmartContextCropper(), ReadToolOutput(), TodoWrite(), Task(), CmdRunner())}
+    for i in range(mcp_tools):
+        schema = {
+            "properties": {f"arg_{j}": {"type": "string", "description": "An argument of the tool " * 3} for j in range(4)},
+            "required": ["arg_0"],
+        }
+        tool = SimpleNamespace(name=f"mcp_tool_{i}", description="Does one thing of an MCP server. " * 12, inputSchema=schema)
+        tools[tool.name] = McpTool(tool, session=None)
+    return tools
+
+
+def rebuild_turn(tools):
+    return [tool.json_schema() for tool in tools.values()]
+
+
+def manifest_turn(manifest):
+    return list(manifest.schemas)
+
+
+def measure(turn, arg, encode):
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        tools = turn(arg)
+        if encode:
+            json.dumps(tools)
+    return (time.perf_counter() - start) / TURNS
+
+
+def main():
+    print(f"{'tools':>5} | {'size':>9} | {'rebuild':>10} {'manifest':>10} | "
+          f"{'rebuild + encode':>16} {'manifest + encode':>17}")
+    for count in MCP_TOOL_COUNTS:
+        tools = build_tools(count)
+        manifest = ToolManifest.compile(tools)
+        times = [
+            measure(rebuild_turn, tools, False), measure(manifest_turn, manifest, False),
+            measure(rebuild_turn, tools, True), measure(manifest_turn, manifest, True),
+        ]
+        print(f"{len(tools):>5} | {len(manifest.serialized) / 1024:>6.1f} KB | "
+              f"{times[0] * 1e6:>7.1f} µs {times[1] * 1e6:>7.1f} µs | "
+              f"{times[2] * 1e6:>13.1f} µs {times[3] * 1e6:>14.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
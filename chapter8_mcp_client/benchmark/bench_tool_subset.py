@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: prompt tokens of the tool schemas per request, every tool versus the
+relevant subset.
+
+The built-in tools are registered together with 20, 60 and 150 MCP tools of a
+typical size, spread over a few services. A short session of user inputs is
+played against each; "sent" is the mean number of tools in a request, "saved"
+the mean schema tokens left out of it, and "select" the time the subset takes.
+"""
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../src'))
+
+from core.history.message_store import freeze
+from tools.cmd_runner import CmdRunner
+from tools.read_tool_output import ReadToolOutput
+from tools.smart_context_cropper import SmartContextCropper
+from tools.task import Task
+from tools.todo_write import TodoWrite
+from tools.tool_manager import ToolManager
+from tools.tool_search import ToolSearch
+from tools.tool_selector import ToolSelector
+
+MCP_TOOL_COUNTS = [20, 60, 150]
+SERVICES = ["github", "gitlab", "postgres", "mysql", "browser", "slack", "jira", "notion", "sentry", "stripe"]
+ACTIONS = ["create", "list", "get", "update", "delete", "search", "export", "import", "archive", "comment",
+           "assign", "watch", "sync", "preview", "publish"]
+OBJECTS = ["item", "record", "issue", "page", "event"]
+SESSION = [
+    "Create a GitHub issue for the failing login test",
+    "List the open Sentry events from last night",
+    "Search the Notion page about the release process",
+    "Export the Postgres record of user 42",
+]
+
+
+class FakeSession:
+    def __init__(self, count):
+        self.count = count
+
+    async def list_tools(self):
+        tools = []
+        for i in range(self.count):
+            service, action = SERVICES[i % len(SERVICES)], ACTIONS[i // len(SERVICES) % len(ACTIONS)]
+            thing = OBJECTS[i // (len(SERVICES) * len(ACTIONS)) % len(OBJECTS)]
+            schema = {
+                "properties": {f"arg_{j}": {"type": "string", "description": "An argument of the tool " * 3} for j in range(4)},
+                "required": ["arg_0"],
+            }
+            tools.append(SimpleNamespace(
+                name=f"{service}_{action}_{thing}_{i}",
+                description=f"{action.capitalize()} a {thing} in {service.capitalize()}. " + "Does one thing of an MCP server. " * 10,
+                inputSchema=schema,
+            ))
+        return SimpleNamespace(tools=tools)
+
+
+def build_tool_manager():
+    async def registered():
+        pass
+
+    manager = object.__new__(ToolManager)
+    manager.tools = {}
+    manager._manifest = None
+    manager._subset_manifests = {}
+    manager._selector = ToolSelector()
+    manager.register_mcp_task = asyncio.ensure_future(registered())
+    for tool in (SmartContextCropper(), ToolSearch(), ReadToolOutput(), TodoWrite(), Task(), CmdRunner()):
+        manager._register_tool(tool.get_tool_name(), tool)
+    return manager
+
+
+async def play(count):
+    manager = build_tool_manager()
+    await manager._list_mcp_tools(FakeSession(count))
+    messages = [freeze({"role": "system", "content": [{"type": "text", "text": "System"}]})]
+    sent, saved, elapsed = [], [], 0.0
+    for user_input in SESSION:
+        messages.append(freeze({"role": "user", "content": [{"type": "text", "text": user_input}]}))
+        # a few model turns per user input, the subset is computed for each
+        for _ in range(3):
+            start = time.perf_counter()
+            manifest = await manager.get_tool_manifest(messages)
+            elapsed += time.perf_counter() - start
+            sent.append(len(manifest))
+            saved.append(manager.full_manifest.tokens - manifest.tokens)
+    full = manager.full_manifest
+    return len(full), full.tokens, sum(sent) / len(sent), sum(saved) / len(saved), elapsed / len(sent)
+
+
+def main():
+    print(f"{'tools':>5} | {'all tokens':>10} | {'sent':>5} {'saved':>8} {'saved %':>8} | {'select':>9}")
+    for count in MCP_TOOL_COUNTS:
+        total, tokens, sent, saved, elapsed = asyncio.run(play(count))
+        print(f"{total:>5} | {tokens:>10} | {sent:>5.1f} {saved:>8.0f} {saved / tokens:>7.1%} | "
+              f"{elapsed * 1e6:>6.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
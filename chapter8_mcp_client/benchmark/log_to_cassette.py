@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Turn a console transcript (like demo/super_mario/generate.log) into a cassette
+that core.cassette can replay.
+
+The transcript has no timings and no raw chunks, so each assistant turn is
+streamed again as synthetic chunks of 4 characters. The first chunk comes after
+`ttft` seconds and the rest at `tokens_per_second`. Tool call ids are generated.
+Tool results are taken as printed, so results the UI cut short stay short.
+Prompt tokens come from the printed context window percentage of a
+`context_tokens` window (200k, the MODEL_MAX_TOKENS default).
+
+Usage: python log_to_cassette.py generate.log session.jsonl [--ttft 0.5] [--tokens-per-second 60] [--context-tokens 204800]
+"""
+import argparse
+import ast
+import json
+import re
+import time
+
+CHARS_PER_CHUNK = 4
+PREPARING = re.compile(r"^Preparing to call tool: (\w+), args: (.*)$")
+CALLED = "Successfully called tool: "
+STATUS = re.compile(r"^\(context window: ([\d.]+)%, total cost: ([\d.]+)\$(?:, cache hit: [^)]*)?\)$")
+
+
+def parse_log(path):
+    """Inputs and assistant turns of a transcript, in order"""
+    events = []
+    turn = None
+    tool_result = None
+
+    def close_turn():
+        nonlocal turn, tool_result
+        if turn is not None:
+            turn["content"] = "\n".join(turn["content"]).strip()
+            events.append(turn)
+        turn = tool_result = None
+
+    with open(path, encoding="utf-8") as f:
+        for raw in f:
+            line = raw.rstrip()
+            if line.startswith("Enter: "):
+                close_turn()
+                events.append({"type": "input", "text": line[len("Enter: "):]})
+            elif line.startswith("🤖"):
+                close_turn()
+                turn = {"type": "turn", "content": [], "tool_calls": [], "context": None, "cost": None}
+            elif turn is None:
+                continue
+            elif STATUS.match(line):
+                context, cost = STATUS.match(line).groups()
+                turn["context"], turn["cost"] = float(context) / 100, float(cost)
+                close_turn()
+            elif PREPARING.match(line):
+                name, args = PREPARING.match(line).groups()
+                turn["tool_calls"].append({"name": name, "arguments": ast.literal_eval(args), "result": None})
+                tool_result = None
+            elif line.startswith(CALLED):
+                call = next(c for c in turn["tool_calls"] if c["result"] is None)
+                prefix = f"{CALLED}{call['name']}, args: {call['arguments']!r}, result: "
+                call["result"] = [line[len(prefix):] if line.startswith(prefix) else line.split(", result: ", 1)[-1]]
+                tool_result = call["result"]
+            elif tool_result is not None:
+                tool_result.append(line)
+            elif not turn["tool_calls"]:
+                # assistant text; anything between Preparing and Successfully is live tool output
+                turn["content"].append(line)
+    close_turn()
+
+    for event in events:
+        for call in event.get("tool_calls", []):
+            call["result"] = "\n".join(call["result"] or []).strip()
+    return events
+
+
+def stream_chunks(index, turn, ttft, tokens_per_second, context_tokens, previous_cost):
+    """Synthetic [offset, chunk] pairs for one assistant turn"""
+    interval = 1 / tokens_per_second if tokens_per_second else 0
+    offset = ttft
+    chunks = []
+
+    def add(delta=None, finish_reason=None, usage=None):
+        nonlocal offset
+        chunk = {
+            "id": f"chatcmpl-replay-{index}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": "replay",
+            "choices": [] if usage else [{"index": 0, "delta": delta or {}, "finish_reason": finish_reason}],
+        }
+        if usage:
+            chunk["usage"] = usage
+        chunks.append([round(offset, 6), chunk])
+
+    add({"role": "assistant", "content": ""})
+    generated = 0
+    for start in range(0, len(turn["content"]), CHARS_PER_CHUNK):
+        offset += interval
+        add({"content": turn["content"][start:start + CHARS_PER_CHUNK]})
+        generated += 1
+    for call_index, call in enumerate(turn["tool_calls"]):
+        add({"tool_calls": [{
+            "index": call_index,
+            "id": call["id"],
+            "type": "function",
+            "function": {"name": call["name"], "arguments": ""},
+        }]})
+        arguments = json.dumps(call["arguments"], ensure_ascii=False)
+        for start in range(0, len(arguments), CHARS_PER_CHUNK):
+            offset += interval
+            add({"tool_calls": [{"index": call_index, "function": {"arguments": arguments[start:start + CHARS_PER_CHUNK]}}]})
+            generated += 1
+    add({}, "tool_calls" if turn["tool_calls"] else "stop")
+
+    cost = turn["cost"] - previous_cost if turn["cost"] is not None else 0
+    # the printed percentage is measured after the turn, so it includes the completion
+    prompt_tokens = max(int((turn["context"] or 0) * context_tokens) - generated, 0)
+    add(usage={
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": generated,
+        "total_tokens": prompt_tokens + generated,
+        "cost": round(max(cost, 0), 6),
+    })
+    return chunks
+
+
+def convert(log_path, cassette_path, ttft=0.5, tokens_per_second=60.0, context_tokens=200 * 1024):
+    """Write the cassette, returns the number of model turns"""
+    events = parse_log(log_path)
+    records = []
+    previous_cost = 0.0
+    turns = 0
+    for event in events:
+        if event["type"] == "input":
+            records.append(event)
+            continue
+        turns += 1
+        for call_index, call in enumerate(event["tool_calls"]):
+            call["id"] = f"call_replay_{turns}_{call_index}"
+        records.append({
+            "type": "stream",
+            "request": None,
+            "chunks": stream_chunks(turns, event, ttft, tokens_per_second, context_tokens, previous_cost),
+        })
+        for call in event["tool_calls"]:
+            records.append({
+                "type": "tool",
+                "call_id": call["id"],
+                "name": call["name"],
+                "arguments": call["arguments"],
+                "result": call["result"],
+            })
+        if event["cost"] is not None:
+            previous_cost = event["cost"]
+
+    with open(cassette_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a console transcript into a replayable cassette")
+    parser.add_argument("log")
+    parser.add_argument("cassette")
+    parser.add_argument("--ttft", type=float, default=0.5, help="seconds to the first chunk of every turn")
+    parser.add_argument("--tokens-per-second", type=float, default=60.0)
+    parser.add_argument("--context-tokens", type=int, default=200 * 1024, help="context window the percentages refer to")
+    args = parser.parse_args()
+    turns = convert(args.log, args.cassette, args.ttft, args.tokens_per_second, args.context_tokens)
+    print(f"Wrote {turns} model turns to {args.cassette}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Report: how close the local token estimate came to the prompt_tokens the API
+reported, over recorded sessions.
+
+Record sessions by running the client with TOKEN_CALIBRATION_LOG=<file>.jsonl,
+then pass one or more of those files:
+
+    python benchmark/token_calibration_report.py sessions/*.jsonl
+
+"Anchored" estimates build on the usage of the previous request in the same
+session, "cold" ones are the first request of a session, where the estimate
+has no reported count to start from (tool schemas and framing are missing).
+"""
+import json
+import sys
+
+
+def load(paths):
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(label, records):
+    if not records:
+        print(f"{label:>8} | no requests")
+        return
+    errors = [(r["estimated"] - r["actual"]) / r["actual"] for r in records if r["actual"]]
+    absolute = [abs(e) for e in errors]
+    print(f"{label:>8} | {len(records):>8} | {100 * sum(errors) / len(errors):>+8.2f}% | "
+          f"{100 * percentile(absolute, 0.5):>7.2f}% | {100 * percentile(absolute, 0.9):>7.2f}% | "
+          f"{100 * max(absolute):>7.2f}%")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    records = load(sys.argv[1:])
+    print(f"{'':>8} | {'requests':>8} | {'bias':>9} | {'p50 err':>8} | {'p90 err':>8} | {'max err':>8}")
+    summarize("anchored", [r for r in records if r.get("anchored")])
+    summarize("cold", [r for r in records if not r.get("anchored")])
+    if records:
+        print(f"\nfinal calibration scale: {records[-1]['scale']}")
+
+
+if __name__ == "__main__":
+    main()
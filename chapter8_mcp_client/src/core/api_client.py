@@ -1,10 +1,17 @@
-from openai import OpenAI
-from typing import Dict, Any, Optional, Generator, Tuple
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, OpenAI, RateLimitError
+from typing import Dict, Any, AsyncIterator, Optional, Generator, Tuple, Union
+import asyncio
 import json
 import os
+import time
 from dotenv import load_dotenv
 from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageFunctionToolCall
 from openai.types.chat.chat_completion_message_function_tool_call import Function
+from core.cassette import Cassette
+from core.history.token_estimator import TokenEstimator
+from core.rate_limiter import RateLimitExceeded, RequestScheduler
+from core.retry_policy import RetryPolicy, StreamInterrupted
+from core.telemetry import StreamTimings
 
 
 # Load environment variables
@@ -47,6 +54,18 @@ class APIClient:
                 api_key=self.api_key,
                 base_url=self.base_url
             )
+            self.scheduler = RequestScheduler()
+            self.retry_policy = RetryPolicy()
+            # every attempt goes through the scheduler, so the SDK doesn't retry on its own,
+            # and every response's rate limit headers reach it
+            self.async_client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                max_retries=0,
+                http_client=DefaultAsyncHttpxClient(event_hooks={"response": [self._observe_rate_limits]})
+            )
+            self._token_estimator = TokenEstimator()
+            self._cassette = Cassette()
             self._initialized = True
     
     def get_completion(self, request_params: Dict[str, Any]) -> Tuple[Any, Any]:
@@ -72,13 +91,45 @@ class APIClient:
             return message, token_usage
         except Exception as e:
             raise Exception(f"API request failed: {str(e)}")
-    
-    def get_completion_stream(self, request_params: Dict[str, Any]) -> Generator[str, None, None]:
+
+    async def get_completion_async(self, request_params: Dict[str, Any], priority: int = RequestScheduler.BACKGROUND) -> Tuple[Any, Any]:
+        """
+        Send non-streaming chat completion request through the async client
+
+        Args:
+            request_params: Request parameters dictionary, a model in it overrides OPENAI_MODEL
+            priority: Scheduling priority, lower goes first
+
+        Returns:
+            Tuple[message, token_usage]: Return AI assistant reply message object and token usage
+        """
+        request_params.setdefault("model", self.model)
+        try:
+            if self._cassette.replaying:
+                response = await self._cassette.replay_completion(request_params)
+            else:
+                started = time.perf_counter()
+                response, admission, _ = await self._create(request_params, priority, self._estimate_tokens(request_params))
+                self.scheduler.settle(admission, getattr(response.usage, "total_tokens", None))
+                if self._cassette.recording:
+                    self._cassette.record_completion(request_params, response, time.perf_counter() - started)
+            token_usage = response.usage
+            cost = getattr(token_usage, 'model_extra', {})
+            if isinstance(cost, dict):
+                self._total_cost += cost.get("cost", 0)
+            return response.choices[0].message, token_usage
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            raise Exception(f"API request failed: {str(e)}")
+
+    def get_completion_stream(self, request_params: Dict[str, Any], timings: Optional[StreamTimings] = None) -> Generator[str, None, None]:
         """
         Send streaming chat completion request and return generator, including token usage
         
         Args:
             request_params: Request parameters dictionary, including model, messages, etc.
+            timings: Optional collector for time to first token and inter-chunk gaps
             
         Yields:
             Gradually return AI assistant reply content chunks, finally return complete message object and token usage
@@ -88,85 +139,307 @@ class APIClient:
         request_params["stream_options"] = {"include_usage": True}
         
         try:
+            if timings is not None:
+                timings.start()
             stream = self.client.chat.completions.create(**request_params)
-            
-            full_content = ""
-            tool_calls = []
-            current_tool_call = None
-            token_usage = None
-            
+            accumulator = _StreamAccumulator()
+
             for chunk in stream:
-                # Handle token usage information
-                if hasattr(chunk, 'usage') and chunk.usage:
-                    token_usage = chunk.usage
-                    cost = getattr(token_usage, 'model_extra', {})                                                                                  
-                    if isinstance(cost, dict):                                                                                                      
-                        self._total_cost += cost.get("cost", 0)   
-                    continue
-                
-                if chunk.choices[0].delta.content:
-                    content_chunk = chunk.choices[0].delta.content
-                    full_content += content_chunk
+                if timings is not None:
+                    timings.on_chunk(self._has_token(chunk))
+                content_chunk = self._process_stream_chunk(accumulator, chunk)
+                if content_chunk:
                     yield content_chunk
-                
-                # Handle tool calls
-                if hasattr(chunk.choices[0].delta, 'tool_calls') and chunk.choices[0].delta.tool_calls:
-                    for tool_call_delta in chunk.choices[0].delta.tool_calls:
-                        if tool_call_delta.index is not None:
-                            # Ensure enough tool_calls slots
-                            while len(tool_calls) <= tool_call_delta.index:
-                                tool_calls.append({
-                                    'id': None,
-                                    'type': 'function',
-                                    'function': {'name': None, 'arguments': ''}
-                                })
-                            
-                            current_tool_call = tool_calls[tool_call_delta.index]
-                            
-                            if tool_call_delta.id:
-                                current_tool_call['id'] = tool_call_delta.id
-                            
-                            if tool_call_delta.function:
-                                if tool_call_delta.function.name:
-                                    current_tool_call['function']['name'] = tool_call_delta.function.name
-                                if tool_call_delta.function.arguments:
-                                    current_tool_call['function']['arguments'] += tool_call_delta.function.arguments
-            
-            
-            # Convert tool_calls to OpenAI standard format
-            formatted_tool_calls = None
-            if tool_calls and any(tc['id'] for tc in tool_calls):
-                formatted_tool_calls = []
-                for tc in tool_calls:
-                    if tc['id'] and tc['function']['name']:
-                        formatted_tool_calls.append(
-                            ChatCompletionMessageFunctionToolCall(
-                                id=tc['id'],
-                                function=Function(
-                                    name=tc['function']['name'],
-                                    arguments=tc['function']['arguments']
-                                ),
-                                type='function'
-                            )
-                        )
-            
-            # Return standard ChatCompletionMessage object
-            message = ChatCompletionMessage(
-                content=full_content,
-                role="assistant",
-                tool_calls=formatted_tool_calls,
-                refusal=None,
-                annotations=None,
-                audio=None,
-                function_call=None,
-                reasoning=None
-            )
 
-            # Add usage information to the message for tracking
-            if token_usage:
-                message.usage = token_usage
-            
-            yield message
+            if timings is not None:
+                timings.finish()
+            yield accumulator.build_message()
             
         except Exception as e:
             raise Exception(f"Streaming API request failed: {str(e)}")
+
+    async def get_completion_stream_async(
+        self,
+        request_params: Dict[str, Any],
+        timings: Optional[StreamTimings] = None,
+        priority: int = RequestScheduler.MAIN,
+        estimated_tokens: Optional[int] = None
+    ) -> AsyncIterator[Union[str, ChatCompletionMessage]]:
+        """
+        Send streaming chat completion request through the async client, so the event loop
+        keeps serving other coroutines while tokens arrive
+
+        Args:
+            request_params: Request parameters dictionary, including model, messages, etc.
+            timings: Optional collector for time to first token and inter-chunk gaps
+            priority: Scheduling priority, lower goes first (the main conversation is 0)
+            estimated_tokens: Prompt size for the tokens per minute limit, estimated from
+                the messages if not given
+
+        Yields:
+            Gradually return AI assistant reply content chunks, finally return complete message object and token usage.
+            A stream cut off midway is continued (see RetryPolicy), its content chunks are never repeated.
+        """
+        request_params["model"] = self.model
+        request_params["stream"] = True
+        request_params["stream_options"] = {"include_usage": True}
+
+        try:
+            if self._cassette.replaying and timings is not None:
+                timings.start()
+            if estimated_tokens is None and not self._cassette.replaying:
+                estimated_tokens = self._estimate_tokens(request_params)
+            accumulator = _StreamAccumulator()
+            params, attempt = request_params, 0
+
+            while True:
+                admission = None
+                if self._cassette.replaying:
+                    stream = self._cassette.replay_stream(params)
+                else:
+                    started = time.perf_counter()
+                    stream, admission, attempt = await self._create(params, priority, estimated_tokens, timings, attempt)
+                    if self._cassette.recording:
+                        stream = self._cassette.record_stream(params, stream, started)
+                content_start = len(accumulator.full_content)
+
+                try:
+                    async for chunk in stream:
+                        if timings is not None:
+                            timings.on_chunk(self._has_token(chunk))
+                        content_chunk = self._process_stream_chunk(accumulator, chunk)
+                        if content_chunk:
+                            yield content_chunk
+                    # a proxy or the server can close the response cleanly midway
+                    if accumulator.finish_reason is None:
+                        raise StreamInterrupted("the stream ended without a finish reason")
+                except Exception as e:
+                    # the failed attempt used tokens too, before its tool calls are dropped
+                    self._settle(admission, accumulator, content_start)
+                    # only the usage chunk was missing, the answer itself is complete
+                    if accumulator.finish_reason is not None:
+                        break
+                    stats = self.retry_policy.stats
+                    if not self.retry_policy.is_retryable(e) or attempt >= self.retry_policy.max_retries:
+                        stats.failed_requests += 1
+                        raise
+                    attempt += 1
+                    stats.retries += 1
+                    stats.interrupted_streams += 1
+                    if timings is not None:
+                        timings.retries += 1
+                    params = self._resume_request(request_params, accumulator)
+                    await asyncio.sleep(self.retry_policy.backoff(attempt))
+                    continue
+
+                self._settle(admission, accumulator, content_start)
+                break
+
+            if accumulator.resumed:
+                self.retry_policy.stats.recovered_streams += 1
+            if timings is not None:
+                timings.finish()
+            yield accumulator.build_message()
+
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            raise Exception(f"Streaming API request failed: {str(e)}")
+
+    async def _create(
+        self,
+        request_params: Dict[str, Any],
+        priority: int,
+        tokens: int,
+        timings: Optional[StreamTimings] = None,
+        attempt: int = 0
+    ):
+        """
+        Send a request once the scheduler admits it, return the response, the admission
+        and the number of retries used so far (starting from `attempt`).
+
+        A 429 holds back every request until its retry-after, then this one is retried.
+        Other retryable errors are retried after the policy's backoff, fatal ones raised
+        right away. Every attempt is admitted by the scheduler again.
+        """
+        while True:
+            admission = await self.scheduler.acquire(tokens, priority)
+            if timings is not None:
+                timings.record_admission(admission)
+                timings.start()
+            try:
+                response = await self.async_client.chat.completions.create(**request_params)
+                return response, admission, attempt
+            except Exception as e:
+                # a rejected request doesn't count against the tokens per minute
+                self.scheduler.settle(admission, 0)
+                rate_limited = isinstance(e, RateLimitError)
+                delay = self.scheduler.rate_limited(e.response.headers) if rate_limited else None
+                if not self.retry_policy.is_retryable(e) or attempt >= self.retry_policy.max_retries:
+                    self.retry_policy.stats.failed_requests += 1
+                    if rate_limited:
+                        raise RateLimitExceeded(
+                            f"Rate limited by the provider {attempt + 1} times, last retry-after {delay:.1f}s: {e}"
+                        ) from e
+                    raise
+            attempt += 1
+            self.retry_policy.stats.retries += 1
+            if timings is not None:
+                timings.retries += 1
+            if not rate_limited:
+                # after a 429 the scheduler itself waits for the retry-after
+                await asyncio.sleep(self.retry_policy.backoff(attempt))
+
+    def _settle(self, admission, accumulator: "_StreamAccumulator", content_start: int) -> None:
+        """
+        Correct the admission of one attempt with the tokens it used: the reported usage,
+        or for a stream that ended without it, the estimate and the text generated
+        """
+        if admission is None:
+            return
+        used = getattr(accumulator.token_usage, "total_tokens", None)
+        if used is None:
+            generated = accumulator.full_content[content_start:] + accumulator.tool_call_text()
+            used = admission.tokens + round(self._token_estimator.count_text(generated))
+        self.scheduler.settle(admission, used)
+
+    def _resume_request(self, request_params: Dict[str, Any], accumulator: "_StreamAccumulator") -> Dict[str, Any]:
+        """
+        The request continuing an interrupted stream: the content received so far is sent
+        back as an assistant prefill, partial tool calls are dropped and regenerated.
+        """
+        stats = self.retry_policy.stats
+        stats.wasted_tokens += round(self._token_estimator.count_text(accumulator.drop_tool_calls()))
+        salvaged = accumulator.full_content[accumulator.resumed_at:]
+        stats.salvaged_tokens += round(self._token_estimator.count_text(salvaged))
+        accumulator.resumed_at = len(accumulator.full_content)
+        accumulator.resumed = True
+        if not accumulator.full_content:
+            return request_params
+        prefill = {"role": "assistant", "content": accumulator.full_content}
+        return {**request_params, "messages": [*request_params["messages"], prefill]}
+
+    async def _observe_rate_limits(self, response) -> None:
+        self.scheduler.observe(response.headers)
+
+    def _estimate_tokens(self, request_params: Dict[str, Any]) -> int:
+        """Prompt tokens of a request, plus its completion allowance if it sets one"""
+        prompt = sum(self._token_estimator.count_message(message) for message in request_params.get("messages", ()))
+        return round(self._token_estimator.scale * prompt) + int(request_params.get("max_tokens") or 0)
+
+    @staticmethod
+    def _has_token(chunk) -> bool:
+        """Whether a stream chunk carries generated content or tool call arguments"""
+        if not getattr(chunk, 'choices', None):
+            return False
+        delta = chunk.choices[0].delta
+        return bool(delta.content or getattr(delta, 'tool_calls', None))
+
+    def _process_stream_chunk(self, accumulator: "_StreamAccumulator", chunk) -> Optional[str]:
+        """Feed one stream chunk into the accumulator, return its content delta if any"""
+        # Handle token usage information
+        if hasattr(chunk, 'usage') and chunk.usage:
+            accumulator.token_usage = chunk.usage
+            cost = getattr(chunk.usage, 'model_extra', {})
+            if isinstance(cost, dict):
+                self._total_cost += cost.get("cost", 0)
+            return None
+
+        if not chunk.choices:
+            return None
+
+        if chunk.choices[0].finish_reason:
+            accumulator.finish_reason = chunk.choices[0].finish_reason
+        delta = chunk.choices[0].delta
+        content_chunk = delta.content
+        if content_chunk:
+            accumulator.full_content += content_chunk
+
+        # Handle tool calls
+        if hasattr(delta, 'tool_calls') and delta.tool_calls:
+            accumulator.add_tool_call_deltas(delta.tool_calls)
+
+        return content_chunk
+
+
+class _StreamAccumulator:
+    """Collects streamed deltas into the final assistant message"""
+
+    def __init__(self):
+        self.full_content = ""
+        self.tool_calls = []
+        self.token_usage = None
+        self.finish_reason = None
+        # whether an interrupted stream was continued, and up to where the content was kept
+        self.resumed = False
+        self.resumed_at = 0
+
+    def tool_call_text(self) -> str:
+        """The names and arguments of the tool calls streamed so far"""
+        return "".join((tc['function']['name'] or "") + tc['function']['arguments'] for tc in self.tool_calls)
+
+    def drop_tool_calls(self) -> str:
+        """Forget the tool calls streamed so far, return their text"""
+        text = self.tool_call_text()
+        self.tool_calls = []
+        return text
+
+    def add_tool_call_deltas(self, tool_call_deltas) -> None:
+        for tool_call_delta in tool_call_deltas:
+            if tool_call_delta.index is None:
+                continue
+
+            # Ensure enough tool_calls slots
+            while len(self.tool_calls) <= tool_call_delta.index:
+                self.tool_calls.append({
+                    'id': None,
+                    'type': 'function',
+                    'function': {'name': None, 'arguments': ''}
+                })
+
+            current_tool_call = self.tool_calls[tool_call_delta.index]
+
+            if tool_call_delta.id:
+                current_tool_call['id'] = tool_call_delta.id
+
+            if tool_call_delta.function:
+                if tool_call_delta.function.name:
+                    current_tool_call['function']['name'] = tool_call_delta.function.name
+                if tool_call_delta.function.arguments:
+                    current_tool_call['function']['arguments'] += tool_call_delta.function.arguments
+
+    def build_message(self) -> ChatCompletionMessage:
+        # Convert tool_calls to OpenAI standard format
+        formatted_tool_calls = None
+        if self.tool_calls and any(tc['id'] for tc in self.tool_calls):
+            formatted_tool_calls = []
+            for tc in self.tool_calls:
+                if tc['id'] and tc['function']['name']:
+                    formatted_tool_calls.append(
+                        ChatCompletionMessageFunctionToolCall(
+                            id=tc['id'],
+                            function=Function(
+                                name=tc['function']['name'],
+                                arguments=tc['function']['arguments']
+                            ),
+                            type='function'
+                        )
+                    )
+
+        # Return standard ChatCompletionMessage object
+        message = ChatCompletionMessage(
+            content=self.full_content,
+            role="assistant",
+            tool_calls=formatted_tool_calls,
+            refusal=None,
+            annotations=None,
+            audio=None,
+            function_call=None,
+            reasoning=None
+        )
+
+        # Add usage information to the message for tracking
+        if self.token_usage:
+            message.usage = self.token_usage
+
+        return message
@@ -0,0 +1,194 @@
+"""
+Record and replay of model sessions.
+
+CASSETTE_MODE=record appends to CASSETTE_PATH, one JSON line per event:
+- every model request with its streamed chunks and their arrival times
+- every non-streamed completion (history summaries)
+- every tool result
+- every user input
+
+CASSETTE_MODE=replay serves the recorded events back instead of the network,
+the tools and the keyboard. Model code above APIClient (history, tool
+dispatch, UI) runs for real. With CASSETTE_TIMING=original the chunks arrive
+at their recorded offsets. With CASSETTE_TIMING=zero they are replayed as
+fast as possible.
+
+Sub-agents running side by side record their model turns interleaved. A replayed
+request is served the next stream recorded for the same agent, told apart by
+its system prompt and first user message.
+
+A stream that broke off is recorded as interrupted and replayed up to where it
+broke, then raises StreamInterrupted, so the APIClient resumes it as it did live.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional
+from dotenv import load_dotenv
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from core.retry_policy import StreamInterrupted
+
+# Load environment variables
+load_dotenv()
+
+
+class CassetteError(Exception):
+    """The replayed session asked for something the cassette doesn't hold"""
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    return str(value)
+
+
+def _agent_of(request: Dict[str, Any]) -> str:
+    """The system prompt and first user message of a request, which tell agents apart"""
+    texts = []
+    for message in request.get("messages", [])[:2]:
+        content = message.get("content") if isinstance(message, dict) else getattr(message, "content", None)
+        if isinstance(content, (list, tuple)):
+            content = "".join(block.get("text", "") for block in content if isinstance(block, dict))
+        texts.append(content if isinstance(content, str) else "")
+    return "\n".join(texts)
+
+
+class Cassette:
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not self._initialized:
+            self.mode = os.getenv("CASSETTE_MODE", "off").lower()
+            self.path = os.getenv("CASSETTE_PATH")
+            self.timing = os.getenv("CASSETTE_TIMING", "original").lower()
+            if self.mode in ("record", "replay") and not self.path:
+                raise ValueError(f"CASSETTE_MODE={self.mode} needs CASSETTE_PATH")
+            self._streams = deque()
+            self._completions = deque()
+            self._tools = {}
+            self._tools_in_order = deque()
+            self._inputs = deque()
+            if self.mode == "replay":
+                self._load()
+            self._initialized = True
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    # model
+
+    async def record_stream(self, request: Dict[str, Any], stream, started: float) -> AsyncIterator[ChatCompletionChunk]:
+        """Pass a stream through, recording every chunk with its offset from `started`"""
+        chunks = []
+        interrupted = False
+        try:
+            async for chunk in stream:
+                chunks.append([round(time.perf_counter() - started, 6), chunk.to_dict()])
+                yield chunk
+        except Exception:
+            interrupted = True
+            raise
+        finally:
+            record = {"type": "stream", "request": request, "chunks": chunks}
+            if interrupted:
+                record["interrupted"] = True
+            self._write(record)
+
+    async def replay_stream(self, request: Dict[str, Any]) -> AsyncIterator[ChatCompletionChunk]:
+        """Serve the next recorded stream of the agent sending the request"""
+        if not self._streams:
+            raise CassetteError("cassette has no more model responses")
+        record = self._next_stream(_agent_of(request))
+        started = time.perf_counter()
+        for offset, data in record["chunks"]:
+            delay = offset - (time.perf_counter() - started)
+            if self.timing == "original" and delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                # still let other coroutines (background summaries, UI) run between chunks
+                await asyncio.sleep(0)
+            yield ChatCompletionChunk.model_validate(data)
+        if record.get("interrupted"):
+            raise StreamInterrupted("the recorded stream was interrupted here")
+
+    def record_completion(self, request: Dict[str, Any], response: ChatCompletion, duration: float) -> None:
+        self._write({"type": "completion", "request": request, "duration": round(duration, 6), "response": response.to_dict()})
+
+    async def replay_completion(self, request: Dict[str, Any]) -> ChatCompletion:
+        if not self._completions:
+            raise CassetteError("cassette has no more non-streamed completions")
+        record = self._completions.popleft()
+        if self.timing == "original":
+            await asyncio.sleep(record.get("duration", 0))
+        return ChatCompletion.model_validate(record["response"])
+
+    def _next_stream(self, agent: str) -> Dict[str, Any]:
+        for i, record in enumerate(self._streams):
+            if record["agent"] == agent:
+                del self._streams[i]
+                return record
+        return self._streams.popleft()
+
+    # tools
+
+    def record_tool(self, call_id: str, name: str, arguments: Dict[str, Any], result: str) -> None:
+        self._write({"type": "tool", "call_id": call_id, "name": name, "arguments": arguments, "result": result})
+
+    def replay_tool(self, call_id: str, name: str) -> str:
+        """Recorded result of a tool call, matched by call id, else by order"""
+        record = self._tools.pop(call_id, None)
+        if record is None:
+            while self._tools_in_order and self._tools_in_order[0]["call_id"] not in self._tools:
+                self._tools_in_order.popleft()
+            if not self._tools_in_order:
+                raise CassetteError(f"cassette has no result for tool call {name} ({call_id})")
+            record = self._tools.pop(self._tools_in_order.popleft()["call_id"])
+        if record["name"] != name:
+            raise CassetteError(f"cassette recorded tool {record['name']} for call {call_id}, replay called {name}")
+        return record["result"]
+
+    # user input
+
+    def record_input(self, text: str) -> None:
+        self._write({"type": "input", "text": text})
+
+    def replay_input(self) -> Optional[str]:
+        """The next recorded user input, None once the recorded session is over"""
+        return self._inputs.popleft()["text"] if self._inputs else None
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=_jsonable) + "\n")
+
+    def _load(self) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                kind = record["type"]
+                if kind == "stream":
+                    record["agent"] = _agent_of(record["request"])
+                    self._streams.append(record)
+                elif kind == "completion":
+                    self._completions.append(record)
+                elif kind == "tool":
+                    self._tools[record["call_id"]] = record
+                    self._tools_in_order.append(record)
+                elif kind == "input":
+                    self._inputs.append(record)
@@ -2,16 +2,30 @@
 Conversation management with refactored UI components and history manager integration.
 """
 
+import asyncio
+import contextvars
 import json
-import sys
+import os
 import traceback
+from typing import Optional
+from dotenv import load_dotenv
 from core.api_client import APIClient
+from core.cassette import Cassette
 from core.prompt.prompt_manager import PromptManager
 from core.prompt.reminder import get_reminder
+from core.telemetry import Telemetry
+from tools.output_spill import OutputSpillStore
+from tools.read_tool_output import ReadToolOutput
 from tools.tool_manager import ToolManager
 from ui.ui_manager import UIManager
 from .history.history_manager import HistoryManager
 
+# Load environment variables
+load_dotenv()
+
+# the conversation whose agent loop runs in the current asyncio task, see Conversation.current
+_current_conversation = contextvars.ContextVar("current_conversation", default=None)
+
 
 class Conversation:
     """
@@ -27,7 +41,16 @@ class Conversation:
     _ui_manager = None
     _history_manager = None
     _prompt_manager = None
+    _tool_semaphore = None
+    _output_spill = None
+    _telemetry = None
+    _cassette = None
+    _approval_lock = None
+    shell_session = None
     _task_depth = 0  # Counter for nested task depth (0 = main conversation)
+    _task_label = ""
+    todos = None
+    loaded_tools = None
 
     def __new__(cls):
         """Singleton pattern implementation."""
@@ -43,8 +66,41 @@ class Conversation:
             self._ui_manager = UIManager()
             self._history_manager = HistoryManager()
             self._prompt_manager = PromptManager()
+            self._tool_semaphore = asyncio.Semaphore(int(os.getenv("TOOL_CONCURRENCY", 4)))
+            self._output_spill = OutputSpillStore()
+            self._telemetry = Telemetry()
+            self._cassette = Cassette()
+            self.todos = []
+            self.loaded_tools = set()
             self._initialized = True
 
+    @classmethod
+    def current(cls) -> "Conversation":
+        """
+        The conversation a tool is called from: the sub-agent's own conversation inside
+        a task, the main conversation otherwise.
+        """
+        return _current_conversation.get() or cls()
+
+    @classmethod
+    def running(cls) -> Optional["Conversation"]:
+        """The conversation whose agent loop runs in this context, None outside of one."""
+        return _current_conversation.get()
+
+    @property
+    def approval_lock(self) -> asyncio.Lock:
+        """
+        Held while an approval prompt is open. Shared by the conversation and its
+        sub-agents, they all prompt on the one terminal.
+        """
+        if self._approval_lock is None:
+            self._approval_lock = asyncio.Lock()
+        return self._approval_lock
+
+    @property
+    def history_manager(self) -> HistoryManager:
+        return self._history_manager
+
     @property
     def messages(self):
         """Get current messages from history manager."""
@@ -66,7 +122,9 @@ class Conversation:
         }
         self.add_message(system_message)
         
-        user_input = await self._ui_manager.get_user_input()
+        user_input = await self._get_user_input()
+        if user_input is None:
+            return
         user_message = {
             "role": "user", 
             "content": [
@@ -76,23 +134,28 @@ class Conversation:
         self.add_message(user_message)
 
         try:
-            await self._recursive_message_handling()
+            await self._run_agent_loop()
         except Exception as e:
             self._ui_manager.print_error(f"System error occurred: {e}")
             traceback.print_exc()
 
-    async def start_task(self, task_system_prompt: str, user_input: str) -> str:
-        """Start a new task conversation."""
+    async def start_task(self, task_system_prompt: str, user_input: str, description: str = "") -> str:
+        """
+        Run a sub-agent to completion and return its final answer.
+
+        The sub-agent works in a conversation of its own, so several tasks of one
+        assistant message run side by side. A sub-agent that fails ends with an error
+        as its answer, the parent and the other tasks carry on.
+        """
+        task = self._new_task_conversation(description)
         # Initialize with system message
-        self._task_depth += 1  # Increment depth for nested task tracking
-        self._history_manager.start_new_chat()
         system_message = {
             "role": "system", 
             "content": [
                 {"type": "text", "text": task_system_prompt}
             ]
         }
-        self.add_message(system_message)
+        task.add_message(system_message)
         
         user_message = {
             "role": "user", 
@@ -100,39 +163,132 @@ class Conversation:
                 {"type": "text", "text": user_input}
             ]
         }
-        self.add_message(user_message)
+        task.add_message(user_message)
 
         try:
-            await self._recursive_message_handling()
+            await task._run_agent_loop()
         except Exception as e:
             self._ui_manager.print_error(f"System error occurred during running task: {e}")
             traceback.print_exc()
-            self._task_depth -= 1  # Decrement on error to maintain correct depth
-            sys.exit(1)
-        self._task_depth -= 1  # Decrement depth when task completes
-        return self._history_manager.finish_chat_get_response()
+            return f"Error: the task failed with {type(e).__name__}: {e}"
+        finally:
+            # the sub-agent's cwd and variables end with it
+            if task.shell_session is not None:
+                await task.shell_session.close()
+        return task.messages[-1]["content"]
+
+    def _new_task_conversation(self, description: str = "") -> "Conversation":
+        """
+        A conversation for a sub-agent: its own history, todos, loaded tools and tool
+        semaphore, one task level deeper, sharing the model client, the tools, the UI
+        and telemetry.
+        """
+        task = object.__new__(Conversation)
+        task._initialized = True
+        task._tool_manager = self._tool_manager
+        task._api_client = self._api_client
+        task._ui_manager = self._ui_manager
+        task._prompt_manager = self._prompt_manager
+        task._output_spill = self._output_spill
+        task._telemetry = self._telemetry
+        task._cassette = self._cassette
+        task._approval_lock = self.approval_lock
+        task._history_manager = HistoryManager.for_task()
+        # the parent holds one of its own permits while the task runs
+        task._tool_semaphore = asyncio.Semaphore(int(os.getenv("TOOL_CONCURRENCY", 4)))
+        task._task_depth = self._task_depth + 1
+        task._task_label = description
+        task.todos = []
+        task.loaded_tools = set()
+        return task
         
 
-    async def _recursive_message_handling(self):
+    async def _run_agent_loop(self):
+        """
+        The main conversation loop: one model turn per iteration, until the model answers
+        without tool calls (in a task) or a turn fails. A fresh iteration per turn, rather
+        than a call per turn, lets each turn's request and stream state be freed as it ends.
+        """
+        # tools called from this loop act on this conversation (see current), a sub-agent
+        # running in a tool call task of its parent sets it for that task only
+        token = _current_conversation.set(self)
+        try:
+            while True:
+                called_tools = await self._run_turn()
+                if called_tools is None:
+                    return
+                if called_tools:
+                    continue
+
+                # No tool calls, wait for user input
+                if self._task_depth > 0:  # In a nested task, return to parent
+                    return
+                user_input = await self._get_user_input()
+                if user_input is None:  # a replayed session is over
+                    return
+                user_message = {
+                    "role": "user", 
+                    "content": [
+                        {"type": "text", "text": user_input}
+                    ]
+                }
+                self.add_message(user_message)
+        finally:
+            _current_conversation.reset(token)
+
+    async def _run_turn(self):
         """
-        Recursively handle messages with streaming support and token usage tracking.
-        This is the main conversation loop.
+        Send one request with streaming support and token usage tracking, and run the
+        tool calls of the response.
+
+        Returns:
+            True if the model called tools, False if it answered, None if the turn failed
         """
+        turn = self._telemetry.start_turn(self._task_depth)
+        try:
+            return await self._run_measured_turn(turn)
+        except BaseException as e:
+            turn.record_error(e)
+            raise
+        finally:
+            # failed and cancelled turns are reported too, with their status
+            self._telemetry.finish_turn(turn)
 
+    async def _run_measured_turn(self, turn):
+        """The steps of _run_turn, timed into its TurnMetrics."""
         # Check for auto compression
-        self._history_manager.auto_messages_compression()
+        with turn.measure("history"):
+            self._history_manager.auto_messages_compression()
 
-        request = {
-            "messages": self._get_messages_with_cache_mark(),
-            "tools": await self._tool_manager.get_tools_description(),
-        }
+        with turn.measure("request_build"):
+            manifest = await self._tool_manager.get_tool_manifest(
+                self._history_manager.get_current_messages(), self.loaded_tools or ()
+            )
+            full_manifest = self._tool_manager.full_manifest
+            turn.record_tools(len(manifest), len(full_manifest), full_manifest.tokens - manifest.tokens)
+            request = {
+                "messages": self._get_messages_with_cache_mark(manifest.hash),
+                "tools": list(manifest.schemas),
+            }
+        turn.record_request(request)
         
+        # sub-agents may stream side by side while only one live display can be active,
+        # their responses are printed once complete
+        live = self._task_depth == 0
+
         # Start assistant response
-        self._ui_manager.print_simple_message("", "🤖")
+        if live:
+            self._ui_manager.print_simple_message("", "🤖")
         
         # Use streaming API for response
         try:
-            stream_generator = self._api_client.get_completion_stream(request)
+            # the main conversation is served first, sub-agents by depth
+            stream_generator = self._api_client.get_completion_stream_async(
+                request,
+                timings=turn.stream,
+                priority=self._task_depth,
+                estimated_tokens=self._history_manager.current_context_tokens or None
+            )
             
             # Validate stream generator
             if stream_generator is None:
@@ -142,21 +298,21 @@ class Conversation:
             full_content = ""
             token_usage = None
             
-            # Ensure stream_generator is iterable
-            try:
-                iterator = iter(stream_generator)
-            except TypeError:
-                raise Exception(f"Stream generator is not iterable. Type: {type(stream_generator)}")
+            # Ensure stream_generator is async iterable
+            if not hasattr(stream_generator, '__aiter__'):
+                raise Exception(f"Stream generator is not async iterable. Type: {type(stream_generator)}")
             
             # Start streaming display
-            self._ui_manager.start_stream_display()
+            if live:
+                self._ui_manager.start_stream_display()
             
-            # Process streaming response
-            for chunk in iterator:
+            # Process streaming response without blocking the event loop
+            async for chunk in stream_generator:
                 if isinstance(chunk, str):
                     # This is content chunk
                     full_content += chunk
-                    self._ui_manager.print_streaming_content(chunk)
+                    if live:
+                        self._ui_manager.print_streaming_content(chunk)
                 elif hasattr(chunk, 'role') and chunk.role == 'assistant':
                     # This is the final message object (ChatCompletionMessage)
                     response_message = chunk
@@ -169,126 +325,167 @@ class Conversation:
                     token_usage = chunk.usage
 
             # End streaming display
-            self._ui_manager.stop_stream_display()
+            if live:
+                self._ui_manager.stop_stream_display()
+            else:
+                self._ui_manager.print_assistant_message(full_content, f"🤖 [{self._task_label or 'task'}]")
             
             # If no complete response message, create one
             if response_message is None:
                 response_message = self._create_simple_message(full_content)
             
         except Exception as e:
+            # the APIClient already retried what could be retried, a non-streaming
+            # request would only fail the same way
+            if live:
+                self._ui_manager.stop_stream_display()
+            turn.record_error(e)
             self._ui_manager.print_error(f"Streaming response processing error: {e}")
             self._ui_manager.print_info(f"Error type: {type(e).__name__}")
-            traceback.print_exc()
-            
-            # Fallback to non-streaming mode
-            try:
-                self._ui_manager.print_info("Trying non-streaming mode...")
-                response_message, token_usage = self._api_client.get_completion(request)
-                self._ui_manager.print_assistant_message(response_message.content)
-                
-                # Update token usage in history manager
-                if token_usage:
-                    self._history_manager.update_token_usage(token_usage)
-                    
-            except Exception as fallback_error:
-                self._ui_manager.print_error(f"Non-streaming mode also failed: {fallback_error}")
-                # Create error response
-                response_message = self._create_error_message(str(e))
-                self._ui_manager.print_assistant_message(response_message.content)
-                return
+            response_message = self._create_error_message(str(e))
+            self._ui_manager.print_assistant_message(response_message.content)
+            return None
             
-        if token_usage:
+        with turn.measure("history"):
+            if token_usage:
+                turn.record_usage(token_usage)
                 self._history_manager.update_token_usage(token_usage)
-        
-        # Add response to message history through history manager
-        assistant_message = {
-            "role": "assistant",
-            "content": response_message.content,
-            "tool_calls": response_message.tool_calls if hasattr(response_message, 'tool_calls') and response_message.tool_calls else None
-        }
-        self.add_message(assistant_message)
-        
-        # Check for auto compression
-        self._history_manager.auto_messages_compression()
+
+            # Add response to message history through history manager
+            assistant_message = {
+                "role": "assistant",
+                "content": response_message.content,
+                "tool_calls": response_message.tool_calls if hasattr(response_message, 'tool_calls') and response_message.tool_calls else None
+            }
+            self.add_message(assistant_message)
+
+            # Check for auto compression
+            self._history_manager.auto_messages_compression()
 
         # Handle tool calls
         if hasattr(response_message, 'tool_calls') and response_message.tool_calls is not None and len(response_message.tool_calls) > 0:
-            await self._handle_tool_calls(response_message.tool_calls)
+            turn.tool_calls = len(response_message.tool_calls)
+            with turn.measure("tool_wall"):
+                await self._handle_tool_calls(response_message.tool_calls)
             # Update token usage in history manager
-            self._print_context_window_and_total_cost()
-            await self._recursive_message_handling()
-        else:
-            self._print_context_window_and_total_cost()
-            # No tool calls, wait for user input
-            if self._task_depth > 0:  # In a nested task, return to parent
-                return
-            user_input = await self._ui_manager.get_user_input()
-            user_message = {
-                "role": "user", 
-                "content": [
-                    {"type": "text", "text": user_input}
-                ]
-            }
-            self.add_message(user_message)
-            await self._recursive_message_handling()
+            self._print_context_window_and_total_cost(turn)
+            return True
+
+        self._print_context_window_and_total_cost(turn)
+        return False
 
-    def _print_context_window_and_total_cost(self):
-        self._ui_manager.print_simple_message(f"(context window: {self._history_manager.current_context_window}%, total cost: {self._api_client.total_cost}$)")
+    async def _get_user_input(self):
+        """Read user input, from the cassette when a recorded session is replayed."""
+        if self._cassette.replaying:
+            return self._cassette.replay_input()
+        user_input = await self._ui_manager.get_user_input()
+        if self._cassette.recording:
+            self._cassette.record_input(user_input)
+        return user_input
+
+    async def _run_tool(self, tool_call, tool_args):
+        """Run a tool, or serve its recorded result when a session is replayed."""
+        name = tool_call.function.name
+        if self._cassette.replaying and self._tool_manager.is_replayable(name):
+            return self._cassette.replay_tool(tool_call.id, name)
+        tool_response = await self._tool_manager.run_tool(name, **tool_args)
+        if self._cassette.recording and self._tool_manager.is_replayable(name):
+            self._cassette.record_tool(tool_call.id, name, tool_args, str(tool_response))
+        return tool_response
+
+    def _print_context_window_and_total_cost(self, turn=None):
+        status = (
+            f"context window: {self._history_manager.current_context_window}%, total cost: {self._api_client.total_cost}$, "
+            f"cache hit: {self._history_manager.cache_hit_rate}%"
+        )
+        if turn is not None and turn.tool_tokens_saved > 0:
+            status += f", tools: {turn.tools_sent}/{turn.tools_total}, ~{turn.tool_tokens_saved} tokens saved"
+        self._ui_manager.print_simple_message(f"({status})")
+        if turn is not None and self._telemetry.print_summary:
+            self._ui_manager.print_simple_message(turn.summary())
     
 
-    def _get_messages_with_cache_mark(self):
-        """Get messages with cache mark."""
-        messages = self._history_manager.get_current_messages()                                                                     
-        if messages and "content" in messages[-1] and messages[-1]["content"]:                                                      
-            messages[-1]["content"][-1]["cache_control"] = {"type": "ephemeral"}                                                    
-        return messages  
+    def _get_messages_with_cache_mark(self, tools_hash=None):
+        """Get messages with cache breakpoints, without touching the stored history."""
+        return self._history_manager.get_messages_with_cache_marks(tools_hash)
 
     async def _handle_tool_calls(self, tool_calls):
-        """Handle tool calls with user approval when needed."""
+        """
+        Handle tool calls with user approval when needed.
+        Calls that need no approval run concurrently, approval prompts and tools that are not
+        concurrency safe run alone in order. Results are added in the original tool_call order.
+        """
+        results = [None] * len(tool_calls)
+        batch = []
+
         for i, tool_call in enumerate(tool_calls):
-            is_last_tool = (i == len(tool_calls) - 1)
             try:
                 args = json.loads(tool_call.function.arguments)
             except json.JSONDecodeError as e:
                 self._ui_manager.print_error(f"Tool parameter parsing failed: {e}")
-                tool_response = {
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "name": tool_call.function.name,
-                    "content": [
-                        {"type": "text", "text": "tool call failed due to JSONDecodeError"}
-                    ]
-                }
-                self.add_message(tool_response)
+                results[i] = "tool call failed due to JSONDecodeError"
                 continue
 
             # Check if user approval is needed
             need_user_approve = args.get('need_user_approve', False)
-            should_execute = True
 
+            if not need_user_approve and self._tool_manager.is_concurrency_safe(tool_call.function.name):
+                batch.append((i, tool_call, args))
+                continue
+
+            # Finish the running batch first so calls keep their relative order
+            await self._execute_tool_batch(batch, results)
+            batch = []
+
+            should_execute = True
             if need_user_approve:
                 approval_content = f"Tool: {tool_call.function.name}, args: {args}"
-                should_execute, content = await self._ui_manager.wait_for_user_approval(approval_content)
+                # one prompt at a time, and a sub-agent says which one is asking
+                emoji = f"🤖 [{self._task_label or 'task'}]" if self._task_depth > 0 else "🤖"
+                async with self.approval_lock:
+                    should_execute, content = await self._ui_manager.wait_for_user_approval(approval_content, emoji)
 
             if should_execute:
-                await self._execute_tool(tool_call, args, is_last_tool)
+                results[i] = await self._execute_tool(tool_call, args)
             else:
-                self._add_tool_response(tool_call, f"user denied to execute tool, user input: {content}", is_last_tool)
+                results[i] = f"user denied to execute tool, user input: {content}"
+
+        await self._execute_tool_batch(batch, results)
+
+        for i, tool_call in enumerate(tool_calls):
+            is_last_tool = (i == len(tool_calls) - 1)
+            self._add_tool_response(tool_call, results[i], is_last_tool)
+
+    async def _execute_tool_batch(self, batch, results):
+        """Execute independent tool calls concurrently, bounded by the tool semaphore."""
+        if not batch:
+            return
+
+        async def run(tool_call, args):
+            async with self._tool_semaphore:
+                return await self._execute_tool(tool_call, args)
+
+        responses = await asyncio.gather(*(run(tool_call, args) for _, tool_call, args in batch))
+        for (i, _, _), response in zip(batch, responses):
+            results[i] = response
 
-    async def _execute_tool(self, tool_call, args, is_last_tool=False):
-        """Execute a tool call and handle the response."""
+    async def _execute_tool(self, tool_call, args):
+        """Execute a tool call and return the content for its tool response."""
         tool_args = {k: v for k, v in args.items() if k != 'need_user_approve'}
         self._ui_manager.show_preparing_tool(tool_call.function.name, tool_args)
         
         try:
-            tool_response = await self._tool_manager.run_tool(tool_call.function.name, **tool_args)
+            tool_response = await self._run_tool(tool_call, tool_args)
             self._ui_manager.show_tool_execution(
                 tool_call.function.name, 
                 tool_args, 
                 success=True, 
                 result=str(tool_response)
             )
-            self._add_tool_response(tool_call, str(tool_response), is_last_tool)
+            if tool_call.function.name == ReadToolOutput.get_tool_name():
+                # already bounded by the spill store, spilling it again would loop
+                return str(tool_response)
+            return self._output_spill.cap(tool_call.function.name, str(tool_response))
         except Exception as e:
             # Enhanced error handling for tool execution
             self._ui_manager.show_tool_execution(
@@ -297,7 +494,7 @@ class Conversation:
                 success=False, 
                 result=str(e)
             )
-            self._add_tool_response(tool_call, f"tool call failed, fail reason: {str(e)}", is_last_tool)
+            return f"tool call failed, fail reason: {str(e)}"
 
     def _add_tool_response(self, tool_call, content, is_last_tool=False):
         """Add tool response to message history through history manager."""
@@ -0,0 +1,186 @@
+"""
+Prompt cache breakpoint placement.
+
+Providers with explicit prompt caching (Anthropic, also through OpenRouter)
+cache the request prefix that ends at a message carrying a cache_control mark,
+and allow a few such breakpoints per request (4 for Anthropic). A later request
+reads the cache only if its prefix up to a breakpoint is byte-identical to a
+prefix that was written before, so one mark on the last message loses
+everything as soon as the history is cropped or compressed.
+
+CachePlanner spends the breakpoints on prefixes that are likely to be sent
+again:
+- the latest message, which writes the prefix the next turn reads
+- the previous request's latest breakpoint that is still unchanged, which reads
+  what the last turn wrote (even when a turn added more than the provider's
+  20 block lookback)
+- the system prompt, which is stable for the whole session. The tool schemas
+  come before the system prompt in the cached prefix, so they are covered too
+- an older history segment that only moves forward every `segment_stride`
+  messages, and moves onto the summary or compression notice after the history
+  has been compressed, so a rewritten tail doesn't cost the whole prefix
+
+Stored messages are shared between requests (see message_store), so comparing
+message identity is enough to find the prefix two requests have in common. The
+tool schemas come first in every prefix, so a changed tool manifest hash means
+nothing is cached any more.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence
+from dotenv import load_dotenv
+from .message_store import cache_markable, with_cache_marks
+
+# Load environment variables
+load_dotenv()
+
+
+@dataclass
+class CacheStats:
+    requests: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    cache_write_tokens: int = 0
+    last_prompt_tokens: int = 0
+    last_cached_tokens: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Percentage of all prompt tokens that were read from the cache"""
+        return 100 * self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    @property
+    def last_hit_rate(self) -> float:
+        """Percentage of the latest request's prompt tokens that were read from the cache"""
+        return 100 * self.last_cached_tokens / self.last_prompt_tokens if self.last_prompt_tokens else 0.0
+
+    def record(self, token_usage) -> None:
+        prompt_tokens = getattr(token_usage, "prompt_tokens", 0) or 0
+        cached_tokens, cache_write_tokens = cached_tokens_of(token_usage)
+        self.requests += 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
+        self.cache_write_tokens += cache_write_tokens
+        self.last_prompt_tokens = prompt_tokens
+        self.last_cached_tokens = cached_tokens
+
+
+def cached_tokens_of(token_usage) -> tuple:
+    """(cached, cache write) prompt tokens of a usage object, zero where the provider doesn't report them"""
+    details = getattr(token_usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        return details.get("cached_tokens") or 0, details.get("cache_write_tokens") or 0
+    cached = getattr(details, "cached_tokens", None) or 0
+    # cache writes are an OpenRouter extension, not part of the OpenAI types
+    written = getattr(details, "cache_write_tokens", None) or 0
+    return cached, written
+
+
+class CachePlanner:
+    """
+    Places cache breakpoints on the messages of one session, see the module docstring.
+
+    Args:
+        max_breakpoints: Breakpoints per request, the provider's limit
+        segment_stride: Messages between the older history segment and the
+            breakpoint it moves up to
+        is_anchor: Tells messages that start a rewritten history (summaries,
+            compression notices), the older segment moves onto the latest of them
+    """
+
+    def __init__(
+        self,
+        max_breakpoints: Optional[int] = None,
+        segment_stride: int = 20,
+        is_anchor: Optional[Callable[[Any], bool]] = None
+    ):
+        if max_breakpoints is None:
+            max_breakpoints = int(os.getenv("CACHE_BREAKPOINTS", 4))
+        self.max_breakpoints = max_breakpoints
+        self.segment_stride = segment_stride
+        self._is_anchor = is_anchor
+        self._previous: List[Any] = []
+        self._previous_marks: List[int] = []
+        self._segment: Optional[int] = None
+        self._prefix_hash: Optional[str] = None
+        self.prefix_changes = 0
+
+    def mark(self, messages: Sequence, prefix_hash: Optional[str] = None) -> List[Any]:
+        """The messages as a list, with cache_control marks on the planned breakpoints"""
+        return with_cache_marks(messages, self.plan(messages, prefix_hash))
+
+    def plan(self, messages: Sequence, prefix_hash: Optional[str] = None) -> List[int]:
+        """
+        Indices of the messages to mark, in ascending order.
+        prefix_hash identifies what is sent ahead of the messages (the tool manifest hash).
+        """
+        messages = list(messages)
+        if prefix_hash != self._prefix_hash:
+            if self._prefix_hash is not None:
+                self.prefix_changes += 1
+            self._prefix_hash = prefix_hash
+            self._previous, self._previous_marks, self._segment = [], [], None
+        if not messages or self.max_breakpoints <= 0:
+            self._remember(messages, [])
+            return []
+
+        common = self._common_prefix(messages)
+        tail = self._markable_at_or_before(messages, len(messages) - 1)
+        system = self._system_end(messages)
+        still_cached = [i for i in self._previous_marks if i < common]
+        read = still_cached[-1] if still_cached else None
+
+        if self._segment is not None and self._segment >= common:
+            self._segment = None
+        anchor = self._latest_anchor(messages)
+        if anchor is not None and (self._segment is None or anchor > self._segment):
+            self._segment = anchor
+        elif read is not None and (self._segment is None or read - self._segment >= self.segment_stride):
+            self._segment = read
+
+        marks = []
+        for index in (tail, read, system, self._segment):
+            if index is not None and index not in marks and len(marks) < self.max_breakpoints:
+                marks.append(index)
+        marks.sort()
+        self._remember(messages, marks)
+        return marks
+
+    def _remember(self, messages: List[Any], marks: List[int]) -> None:
+        self._previous = messages
+        self._previous_marks = marks
+
+    def _common_prefix(self, messages: List[Any]) -> int:
+        common = 0
+        for old, new in zip(self._previous, messages):
+            if old is not new:
+                break
+            common += 1
+        return common
+
+    @staticmethod
+    def _markable_at_or_before(messages: List[Any], index: int) -> Optional[int]:
+        for i in range(index, -1, -1):
+            if cache_markable(messages[i]):
+                return i
+        return None
+
+    @staticmethod
+    def _system_end(messages: List[Any]) -> Optional[int]:
+        end = None
+        for i, message in enumerate(messages):
+            if not isinstance(message, dict) or message.get("role") != "system":
+                break
+            end = i
+        if end is None or not cache_markable(messages[end]):
+            return None
+        return end
+
+    def _latest_anchor(self, messages: List[Any]) -> Optional[int]:
+        if self._is_anchor is None:
+            return None
+        for i in range(len(messages) - 1, -1, -1):
+            if self._is_anchor(messages[i]) and cache_markable(messages[i]):
+                return i
+        return None
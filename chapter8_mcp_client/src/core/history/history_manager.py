@@ -1,11 +1,18 @@
 from abc import ABC, abstractmethod
-import copy
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
+import asyncio
+import json
 import os
+import time
 from pyexpat.errors import messages
 from dotenv import load_dotenv
 from ui.ui_manager import UIManager
 from enum import Enum
+from .cache_planner import CachePlanner, CacheStats, cached_tokens_of
+from .message_store import MessagesView, freeze
+from .summarizer import HistorySummarizer
+from .token_estimator import TokenEstimator
 
 # Load environment variables
 load_dotenv()
@@ -15,6 +22,26 @@ class TokenUsage:
     input_tokens: int
     output_tokens: int
     total_tokens: int
+    cached_tokens: int = 0
+
+@dataclass
+class CompressionStats:
+    turns: int = 0
+    hard_limit_turns: int = 0
+    background_summaries: int = 0
+    failed_summaries: int = 0
+    tokens_saved: int = 0
+    # latest compression latencies in seconds, bounded for long sessions
+    latencies: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    @property
+    def hard_limit_rate(self) -> float:
+        """Percentage of turns whose context reached the hard compression threshold"""
+        return 100 * self.hard_limit_turns / self.turns if self.turns else 0.0
+
+    def record(self, latency: float, tokens_saved: int) -> None:
+        self.latencies.append(latency)
+        self.tokens_saved += max(0, tokens_saved)
 
 from enum import Enum
 
@@ -24,6 +51,10 @@ class Role(str, Enum):
     TOOL = "tool"
     ASSISTANT = "assistant"
 
+# user-role messages the history manager inserts itself, they don't start a user session
+COMPRESSION_NOTICE = "[Previous conversation history has been compressed to save context window space]"
+SUMMARY_HEADER = "[Summary of the earlier conversation]"
+
 class Crop_Direction(str, Enum):
     TOP = "top"
     BOTTOM = "bottom"
@@ -48,11 +79,21 @@ class BaseHistoryManager(ABC):
     def auto_messages_compression(self) -> None:
         if self._requires_compression():
             self._compress_current_message()
+        elif self._requires_background_compression():
+            self._start_background_compression()
 
     @abstractmethod
     def _requires_compression(self) -> bool:
         pass
 
+    @abstractmethod
+    def _requires_background_compression(self) -> bool:
+        pass
+
+    @abstractmethod
+    def _start_background_compression(self) -> None:
+        pass
+
     @abstractmethod
     def _compress_current_message(self) -> None:
         pass
@@ -81,10 +122,35 @@ class HistoryManager(BaseHistoryManager):
             self._ui_manager = UIManager()
             self._model_max_tokens =  int(os.getenv("MODEL_MAX_TOKENS", model_max_tokens)) * 1024
             self._compress_threshold = float(os.getenv("COMPRESS_THRESHOLD", compress_threshold))
+            # summarize old turns in the background once usage passes the soft threshold
+            self._soft_compress_threshold = float(os.getenv("COMPRESS_SOFT_THRESHOLD", 0.6))
+            background_summary = os.getenv("BACKGROUND_SUMMARY", "true").lower() == "true"
+            self._summarizer = HistorySummarizer() if background_summary else None
+            self._summary_task = None
+            self.compression_stats = CompressionStats()
+            self._token_estimator = TokenEstimator()
+            self._calibration_log = os.getenv("TOKEN_CALIBRATION_LOG")
+            # per session: raw estimate of the current messages, and the raw estimate
+            # at the time of the last reported usage
+            self._estimated_tokens = [0.0]
+            self._estimate_anchors = [0.0]
+            # per session, breakpoints follow the history through crops and compression
+            self._cache_planners = [self._new_cache_planner()]
+            self.cache_stats = CacheStats()
             self._initialized = True
 
+    @classmethod
+    def for_task(cls) -> "HistoryManager":
+        """A history of its own for a sub-agent, apart from the shared instance"""
+        manager = super().__new__(cls)
+        manager.__init__()
+        return manager
+
+    # messages are frozen on the way in and current message lists are only ever
+    # appended to in place, every other change replaces the list (see MessagesView)
     def add_message(self, message) -> None:
-        self.messages_history[-1].append(message)
+        self.messages_history[-1].append(freeze(message))
+        self._estimated_tokens[-1] += self._token_estimator.count_message(message)
 
     # mustn't crop the latest user input message
     # mustn't crop_amount < current_messages - 1 
@@ -126,20 +192,45 @@ class HistoryManager(BaseHistoryManager):
             cropped_messages = current_messages[:-crop_amount]
         
         self.messages_history[-1] = cropped_messages
+        self._recount_current_messages()
         return "Crop message successful"
 
-    @property                                                                                                                       
-    def current_context_window(self):                                                                                               
-        """get current context window usage percentage"""                                                                           
-        if not self.history_token_usage or self._model_max_tokens == 0:                                                             
-            return "0.0"                                                                                                            
-        return f"{100 * self.history_token_usage[-1].total_tokens / self._model_max_tokens:.1f}" 
+    @property
+    def current_context_tokens(self) -> int:
+        """
+        Estimated size of the next request: the prompt_tokens last reported by the API
+        plus the calibrated estimate of everything added (or removed) since.
+        """
+        reported = self.history_token_usage[-1].input_tokens if self.history_token_usage else 0
+        delta = self._estimated_tokens[-1] - self._estimate_anchors[-1]
+        return max(0, round(reported + self._token_estimator.scale * delta))
+
+    @property
+    def current_context_window(self):
+        """get current context window usage percentage"""
+        if self._model_max_tokens == 0:
+            return "0.0"
+        return f"{100 * self.current_context_tokens / self._model_max_tokens:.1f}"
 
     def update_token_usage(self, token_usage) -> None:
+        # called before the response is added, so the current messages are what was sent
+        estimated = self.current_context_tokens
+        previous_prompt = self.history_token_usage[-1].input_tokens if self.history_token_usage else 0
+        if previous_prompt:
+            self._token_estimator.calibrate(
+                self._estimated_tokens[-1] - self._estimate_anchors[-1],
+                token_usage.prompt_tokens - previous_prompt
+            )
+        self._log_calibration(estimated, token_usage.prompt_tokens, anchored=bool(previous_prompt))
+        self._estimate_anchors[-1] = self._estimated_tokens[-1]
+        self.compression_stats.turns += 1
+        self.cache_stats.record(token_usage)
+
         token_usage = TokenUsage(
             input_tokens = token_usage.prompt_tokens,
             output_tokens = token_usage.completion_tokens,
-            total_tokens = token_usage.total_tokens
+            total_tokens = token_usage.total_tokens,
+            cached_tokens = cached_tokens_of(token_usage)[0]
         )
 
         if len(self.history_token_usage) == 0:
@@ -147,32 +238,148 @@ class HistoryManager(BaseHistoryManager):
         else:
             self.history_token_usage[-1] = token_usage
 
-    def get_current_messages(self) -> any:
-        return  copy.deepcopy(self.messages_history[-1])
+    def get_current_messages(self) -> MessagesView:
+        return MessagesView(self.messages_history[-1])
+
+    def get_messages_with_cache_marks(self, tools_hash: str = None) -> list:
+        """Current messages with cache breakpoints, without touching the stored history"""
+        return self._cache_planners[-1].mark(self.get_current_messages(), tools_hash)
+
+    @property
+    def cache_hit_rate(self) -> str:
+        """get the share of the latest prompt read from the provider's cache"""
+        return f"{self.cache_stats.last_hit_rate:.1f}"
 
     def start_new_chat(self) -> None:
         self.messages_history.append([])
         self.history_token_usage.append(TokenUsage(0, 0, 0))
+        self._estimated_tokens.append(0.0)
+        self._estimate_anchors.append(0.0)
+        self._cache_planners.append(self._new_cache_planner())
 
     def finish_chat_get_response(self) -> str:
         assert len(self.messages_history) >= 2, "there must more than or equal to 2 messages in history"
         task_messages = self.messages_history.pop() 
         self.history_token_usage.pop()
+        self._estimated_tokens.pop()
+        self._estimate_anchors.pop()
+        self._cache_planners.pop()
         response = task_messages[-1]["content"]
         return response
 
     def _requires_compression(self) -> bool:
-        if self._compress_threshold and self.history_token_usage:
-            current_usage = self.history_token_usage[-1]
-            return current_usage.total_tokens > self._compress_threshold * self._model_max_tokens
+        if self._compress_threshold:
+            return self.current_context_tokens > self._compress_threshold * self._model_max_tokens
         return False
 
+    def _requires_background_compression(self) -> bool:
+        if self._summarizer is None or self.compression_stats.failed_summaries >= 3:
+            return False
+        if not self._compress_threshold or self._soft_compress_threshold >= self._compress_threshold:
+            return False
+        return self.current_context_tokens > self._soft_compress_threshold * self._model_max_tokens
+
+    def _start_background_compression(self) -> None:
+        """Summarize the oldest turns of the current session without waiting for it"""
+        if self._summary_task is not None and not self._summary_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        messages = self.messages_history[-1]
+        summary_range = self._plan_summary(messages)
+        if summary_range is not None:
+            self._summary_task = loop.create_task(self._summarize_in_background(messages, *summary_range))
+
+    def _plan_summary(self, messages: list):
+        """
+        Pick the oldest messages holding about half of the session's tokens.
+
+        The range starts after the leading system messages and ends in front of a user
+        or assistant message, so tool results are never split from their tool call.
+        """
+        start = 0
+        while start < len(messages) and self._role(messages[start]) == Role.SYSTEM:
+            start += 1
+        counts = [self._token_estimator.count_message(message) for message in messages]
+        target = sum(counts[start:]) / 2
+
+        tokens = 0
+        for index in range(start, len(messages) - 1):
+            tokens += counts[index]
+            if tokens >= target and self._role(messages[index + 1]) in (Role.USER, Role.ASSISTANT):
+                return (start, index + 1) if index + 1 - start >= 2 else None
+        return None
+
+    async def _summarize_in_background(self, messages: list, start: int, end: int) -> None:
+        started = time.perf_counter()
+        try:
+            summary = await self._summarizer.summarize(messages[start:end])
+        except Exception:
+            self.compression_stats.failed_summaries += 1
+            return
+
+        # the session may have been cropped or compressed meanwhile, the summary is stale then
+        level = next((i for i, session in enumerate(self.messages_history) if session is messages), None)
+        if level is None:
+            return
+
+        # the latest user request stays verbatim, in front of the summary
+        kept = [
+            messages[i] for i in range(end - 1, start - 1, -1)
+            if self._is_user_input(messages[i])
+        ][:1]
+        summary_message = freeze({
+            "role": Role.USER,
+            "content": [{"type": "text", "text": f"{SUMMARY_HEADER}\n{summary}"}]
+        })
+
+        before = self._estimated_tokens[level]
+        # appended messages after `end` are picked up too, the swap itself never awaits
+        self.messages_history[level] = messages[:start] + kept + [summary_message] + messages[end:]
+        self._recount_current_messages(level)
+
+        saved = self._token_estimator.scale * (before - self._estimated_tokens[level])
+        self.compression_stats.background_summaries += 1
+        self.compression_stats.record(time.perf_counter() - started, round(saved))
+
+    def _recount_current_messages(self, level: int = -1) -> None:
+        """Re-estimate a session after its message list was replaced."""
+        self._estimated_tokens[level] = sum(
+            self._token_estimator.count_message(message) for message in self.messages_history[level]
+        )
+
+    def _log_calibration(self, estimated: int, actual: int, anchored: bool) -> None:
+        """Append an estimated/actual pair to TOKEN_CALIBRATION_LOG, if configured."""
+        if not self._calibration_log:
+            return
+        record = {
+            "estimated": estimated,
+            "actual": actual,
+            "anchored": anchored,
+            "messages": len(self.messages_history[-1]),
+            "scale": round(self._token_estimator.scale, 4),
+        }
+        try:
+            with open(self._calibration_log, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError:
+            pass
+
     # if there is more than one  session, compress the oldest chat session
     # else compress the current roll assistant output
     # tell the model we have compressed the messages
     def _compress_current_message(self) -> None:
         """Compress current message history to save context window space"""
         self._ui_manager.print_assistant_message("History context too long, compressing...")
+        started = time.perf_counter()
+        before = self.current_context_tokens
+        self.compression_stats.hard_limit_turns += 1
+        # a running summary is based on the list we are about to replace
+        if self._summary_task is not None:
+            self._summary_task.cancel()
 
         current_messages = self.messages_history[-1]
         user_indices = self._get_user_message_indices(current_messages)
@@ -180,31 +387,69 @@ class HistoryManager(BaseHistoryManager):
         if len(user_indices) > 1:
             self._compress_multiple_sessions(current_messages, user_indices)
         elif len(user_indices) == 1:
-            # delete_message_num is hardcode to 3 right now
-            self._compress_single_session(current_messages, user_indices[0], 3)
+            self._compress_single_session(current_messages, user_indices[0])
+        self._recount_current_messages()
+        self.compression_stats.record(time.perf_counter() - started, before - self.current_context_tokens)
     
     def _get_user_message_indices(self, messages: list) -> list[int]:
-        """Get index positions of all user messages"""
-        return [i for i, msg in enumerate(messages) if msg.role == Role.USER]
+        """Get index positions of all user messages, compression notices and summaries excluded"""
+        return [i for i, msg in enumerate(messages) if self._is_user_input(msg)]
     
     def _compress_multiple_sessions(self, messages: list, user_indices: list[int]) -> None:
         """delete the oldest chat session"""
         second_oldest_user_index = user_indices[1]
 
-        system_messages = [msg for msg in messages[:second_oldest_user_index] if msg.role == Role.SYSTEM]
+        system_messages = [msg for msg in messages[:second_oldest_user_index] if self._role(msg) == Role.SYSTEM]
         recent_messages = messages[second_oldest_user_index:]
 
         self.messages_history[-1] = system_messages + self._create_compression_notice(messages) + recent_messages
 
-    def _compress_single_session(self, messages: list, user_index: int, delete_message_num: int) -> None:
-        """delete assistant messages and tool message close to user input"""
-        system_messages = [msg for msg in messages[:user_index] if msg.role == Role.SYSTEM]
-        
-        start_index = min(user_index + 1 + delete_message_num, len(messages))
+    def _compress_single_session(self, messages: list, user_index: int) -> None:
+        """delete the oldest assistant rounds (with their tool messages) after the user input"""
+        system_messages = [msg for msg in messages[:user_index] if self._role(msg) == Role.SYSTEM]
+
+        # drop whole rounds until the context is back under the soft threshold,
+        # the latest round is always kept
+        round_starts = [i for i in range(user_index + 1, len(messages)) if self._role(messages[i]) == Role.ASSISTANT]
+        target = min(self._soft_compress_threshold, self._compress_threshold) * self._model_max_tokens
+        excess = self.current_context_tokens - target
+        start_index = user_index + 1
+        for next_round in round_starts[1:]:
+            if excess <= 0:
+                break
+            excess -= self._token_estimator.scale * sum(
+                self._token_estimator.count_message(message) for message in messages[start_index:next_round]
+            )
+            start_index = next_round
+
+        if start_index == user_index + 1:
+            return
         user_message = [messages[user_index]] + self._create_compression_notice(messages) + messages[start_index:]
 
         self.messages_history[-1] = system_messages + user_message
 
+    @staticmethod
+    def _role(message) -> str:
+        # stored messages are frozen dicts, but callers may also add message objects
+        return message["role"] if isinstance(message, dict) else message.role
+
+    @classmethod
+    def _is_user_input(cls, message) -> bool:
+        if cls._role(message) != Role.USER:
+            return False
+        content = message["content"] if isinstance(message, dict) else message.content
+        if isinstance(content, (list, tuple)):
+            content = content[0].get("text", "") if content and isinstance(content[0], dict) else ""
+        return not (isinstance(content, str) and content.startswith((COMPRESSION_NOTICE, SUMMARY_HEADER)))
+
+    @classmethod
+    def _is_history_rewrite(cls, message) -> bool:
+        """summaries and compression notices, where a rewritten history starts"""
+        return cls._role(message) == Role.USER and not cls._is_user_input(message)
+
+    def _new_cache_planner(self) -> CachePlanner:
+        return CachePlanner(is_anchor=self._is_history_rewrite)
+
     def _create_compression_notice(self, messages: list) -> list:
         """create compression notice"""
         if not messages:
@@ -213,7 +458,7 @@ class HistoryManager(BaseHistoryManager):
         message_class = type(messages[0])
         compression_notice = message_class(
             role=Role.USER,
-            content="[Previous conversation history has been compressed to save context window space]"
+            content=COMPRESSION_NOTICE
         )
         return [compression_notice]
             
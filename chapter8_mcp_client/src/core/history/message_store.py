@@ -0,0 +1,133 @@
+"""
+Copy-on-write message storage helpers for the HistoryManager.
+
+Messages are frozen once when they are added to the history. After that the
+history hands out read-only views that share the stored message objects, so a
+model round trip no longer deep-copies the whole transcript.
+"""
+
+import copy
+from collections.abc import Sequence
+from itertools import islice
+from typing import Any, List
+
+
+class FrozenDict(dict):
+    """A dict that refuses modification, still serializable wherever a dict is."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("history messages are read-only, use thaw() to get a mutable copy")
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return FrozenDict((key, copy.deepcopy(value, memo)) for key, value in self.items())
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Recursively turn dicts into FrozenDict and lists into tuples."""
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Recursively turn a frozen value back into plain dicts and lists."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class MessagesView(Sequence):
+    """
+    Read-only snapshot of a message list.
+
+    The HistoryManager only ever appends to a message list in place, cropping and
+    compression replace the list, so remembering the length is enough to keep the
+    snapshot stable without copying.
+    """
+
+    def __init__(self, messages: list, length: int = None):
+        self._messages = messages
+        self._length = len(messages) if length is None else length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._messages[i] for i in range(self._length)[index]]
+        return self._messages[range(self._length)[index]]
+
+    def __iter__(self):
+        return islice(self._messages, self._length)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Sequence) and not isinstance(other, (str, bytes)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"MessagesView({list(self)!r})"
+
+
+def cache_markable(message: Any) -> bool:
+    """Whether with_cache_marks can put a cache_control mark on the message."""
+    if not isinstance(message, dict):
+        return False
+    content = message.get("content")
+    if isinstance(content, (list, tuple)):
+        return bool(content) and isinstance(content[-1], dict)
+    # plain text content is turned into a text block, except for the model's own replies
+    return isinstance(content, str) and bool(content) and message.get("role") != "assistant"
+
+
+def with_cache_marks(messages: Sequence, indices) -> List[Any]:
+    """
+    Return the messages as a list with a cache_control mark on the last content block
+    of each message at `indices` that can carry one.
+    Only the marked messages and their last block are copied, stored history stays untouched.
+    """
+    marked = list(messages)
+    for index in indices:
+        message = marked[index]
+        if not cache_markable(message):
+            continue
+        content = message["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        last_block = dict(content[-1])
+        last_block["cache_control"] = {"type": "ephemeral"}
+        marked_message = dict(message)
+        marked_message["content"] = list(content[:-1]) + [last_block]
+        marked[index] = marked_message
+    return marked
+
+
+def with_cache_mark(messages: Sequence) -> List[Any]:
+    """
+    Return the messages as a list with a cache_control mark on the last content block.
+    Only the last message and its last block are copied, stored history stays untouched.
+    """
+    if not messages or not isinstance(messages[-1], dict) or not isinstance(messages[-1].get("content"), (list, tuple)):
+        return list(messages)
+    return with_cache_marks(messages, [len(messages) - 1])
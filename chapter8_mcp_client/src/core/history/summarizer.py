@@ -0,0 +1,89 @@
+"""
+LLM summarization of old conversation turns for the HistoryManager.
+"""
+
+import os
+from typing import Any, Sequence
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+SUMMARY_PROMPT = """You compress the history of a coding assistant conversation.
+Summarize the conversation excerpt below so the assistant can continue the work without it.
+Keep: the user's requests and constraints, decisions made, files and commands involved,
+important tool results and errors, and what is still left to do. Drop pleasantries,
+repeated output and anything superseded later in the excerpt. Answer with the summary only."""
+
+
+def _text_of(content: Any) -> str:
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, (list, tuple)):
+        return "\n".join(_text_of(block) for block in content)
+    if isinstance(content, dict):
+        return content.get("text") or ""
+    return getattr(content, "text", None) or ""
+
+
+def _field(message: Any, name: str) -> Any:
+    if isinstance(message, dict):
+        return message.get(name)
+    return getattr(message, name, None)
+
+
+class HistorySummarizer:
+    """
+    Summarizes a slice of conversation history with a (preferably cheaper) model.
+
+    The model is SUMMARY_MODEL, falling back to OPENAI_MODEL. Every message is
+    clipped to SUMMARY_MESSAGE_CHARS before it is sent, so one huge tool output
+    can't blow up the summary request itself.
+    """
+
+    def __init__(self):
+        self.model = os.getenv("SUMMARY_MODEL")
+        self.max_tokens = int(os.getenv("SUMMARY_MAX_TOKENS", 1024))
+        self.message_chars = int(os.getenv("SUMMARY_MESSAGE_CHARS", 4000))
+
+    async def summarize(self, messages: Sequence[Any]) -> str:
+        """Return a summary of the messages"""
+        # imported here, the API client is only needed (and configured) at runtime
+        from core.api_client import APIClient
+
+        request = {
+            "messages": [
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": self._transcript(messages)},
+            ],
+            "max_tokens": self.max_tokens,
+        }
+        if self.model:
+            request["model"] = self.model
+        message, _ = await APIClient().get_completion_async(request)
+        summary = (message.content or "").strip()
+        if not summary:
+            raise ValueError("summary model returned an empty summary")
+        return summary
+
+    def _transcript(self, messages: Sequence[Any]) -> str:
+        parts = []
+        for message in messages:
+            role = _field(message, "role")
+            role = getattr(role, "value", role)
+            text = self._clip(_text_of(_field(message, "content")))
+            for tool_call in _field(message, "tool_calls") or ():
+                function = _field(tool_call, "function")
+                arguments = self._clip(_field(function, "arguments") or "")
+                text += f"\n[called {_field(function, 'name')}({arguments})]"
+            parts.append(f"<{role}>\n{text.strip()}\n</{role}>")
+        return "\n\n".join(parts)
+
+    def _clip(self, text: str) -> str:
+        if len(text) <= self.message_chars:
+            return text
+        half = self.message_chars // 2
+        return f"{text[:half]}\n...[{len(text) - 2 * half} chars omitted]...\n{text[-half:]}"
@@ -0,0 +1,72 @@
+"""
+Tokenizer-free token estimation for context window decisions.
+"""
+
+from typing import Any
+
+
+def _field(obj: Any, name: str) -> Any:
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+class TokenEstimator:
+    """
+    Estimates token counts from text length.
+
+    ASCII text averages about four characters per token, other scripts (CJK in
+    particular) about one token per character. Raw estimates are multiplied by a
+    scale that is calibrated against the prompt_tokens the API reports.
+    """
+
+    CHARS_PER_TOKEN = 4.0
+    MESSAGE_OVERHEAD = 4
+
+    def __init__(self, smoothing: float = 0.3, min_calibration_tokens: int = 200):
+        self.scale = 1.0
+        self.samples = 0
+        self._smoothing = smoothing
+        self._min_calibration_tokens = min_calibration_tokens
+
+    def count_text(self, text: str) -> float:
+        if not text:
+            return 0.0
+        if text.isascii():
+            return len(text) / self.CHARS_PER_TOKEN
+        non_ascii = len(text) - len(text.encode("ascii", "ignore"))
+        return (len(text) - non_ascii) / self.CHARS_PER_TOKEN + non_ascii
+
+    def count_content(self, content: Any) -> float:
+        if content is None:
+            return 0.0
+        if isinstance(content, str):
+            return self.count_text(content)
+        if isinstance(content, (list, tuple)):
+            return sum(self.count_content(block) for block in content)
+        text = _field(content, "text")
+        if isinstance(text, str):
+            return self.count_text(text)
+        return 0.0
+
+    def count_message(self, message: Any) -> float:
+        """Raw (uncalibrated) token estimate of one message."""
+        tokens = self.MESSAGE_OVERHEAD + self.count_content(_field(message, "content"))
+        for tool_call in _field(message, "tool_calls") or ():
+            function = _field(tool_call, "function")
+            tokens += self.count_text(_field(function, "name") or "")
+            tokens += self.count_text(_field(function, "arguments") or "")
+        return tokens
+
+    def calibrate(self, raw_delta: float, actual_delta: int) -> None:
+        """
+        Move the scale towards the observed ratio between two requests.
+
+        Deltas are used rather than totals so the constant prompt overhead (tool
+        schemas, request framing) doesn't leak into the per-message ratio.
+        """
+        if raw_delta < self._min_calibration_tokens or actual_delta <= 0:
+            return
+        ratio = actual_delta / raw_delta
+        self.scale += self._smoothing * (ratio - self.scale)
+        self.samples += 1
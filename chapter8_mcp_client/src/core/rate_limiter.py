@@ -0,0 +1,264 @@
+"""
+Client-side rate limiting of model requests.
+
+The main conversation, its sub-agents and the background summaries share one
+provider quota. Every request goes through the RequestScheduler of the APIClient:
+- two token buckets hold the requests per minute (RATE_LIMIT_RPM) and tokens per
+  minute (RATE_LIMIT_TPM) still allowed, refilled continuously. A request takes
+  one request and its estimated tokens, the estimate is corrected once the usage
+  is known
+- waiting requests are admitted by priority, then in arrival order: the
+  interactive main conversation first, sub-agents by task depth, background
+  summaries last
+- the x-ratelimit-* headers of every response bring the buckets in line with the
+  provider's counters, limits it reports apply even when none is configured
+- a 429 holds every request back until its retry-after has passed
+
+A limit of 0 (the default) leaves that bucket to the provider's headers.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class RateLimitExceeded(Exception):
+    """The provider kept answering 429 after every retry"""
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds of a header duration: "12", "1.5", "20ms", "6m0s", "1h2m"..."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _UNITS[unit] for number, unit in parts)
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """A per-minute allowance refilled continuously, disabled while its limit is 0"""
+
+    def __init__(self, per_minute: float = 0):
+        self.configured = per_minute
+        self.capacity = per_minute
+        self.level = per_minute
+        self._updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken, a request larger than the bucket waits for a full one"""
+        if not self.enabled:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60 / self.capacity
+
+    def take(self, amount: float, now: float) -> None:
+        """Take (or give back, with a negative amount) from the bucket, it may go into debt"""
+        if self.enabled:
+            self._refill(now)
+            self.level -= amount
+
+    def set_limit(self, per_minute: float, now: float) -> None:
+        """Adopt the provider's limit, unless a lower one is configured"""
+        limit = min(per_minute, self.configured) if self.configured else per_minute
+        if limit == self.capacity:
+            return
+        self._refill(now)
+        self.level = limit if not self.enabled else min(self.level, limit)
+        self.capacity = limit
+
+    def sync(self, remaining: float, now: float) -> None:
+        """The provider has `remaining` left, never assume more than that"""
+        if self.enabled:
+            self._refill(now)
+            self.level = min(self.level, remaining)
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+
+@dataclass
+class Admission:
+    """A request let through by the scheduler"""
+    tokens: int
+    priority: int
+    waited: float
+    queued_behind: int
+
+
+@dataclass
+class SchedulerStats:
+    requests: int = 0
+    delayed: int = 0
+    rate_limited: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+    max_queue_depth: int = 0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.wait_total / self.requests if self.requests else 0.0
+
+    def record(self, admission: Admission) -> None:
+        self.requests += 1
+        if admission.waited > 0.001:
+            self.delayed += 1
+        self.wait_total += admission.waited
+        self.wait_max = max(self.wait_max, admission.waited)
+
+
+class RequestScheduler:
+    """
+    Admits model requests within the rate limits, see the module docstring.
+
+    Args:
+        requests_per_minute: Defaults to RATE_LIMIT_RPM, 0 for no limit
+        tokens_per_minute: Defaults to RATE_LIMIT_TPM, 0 for no limit
+    """
+
+    MAIN = 0
+    BACKGROUND = 100
+    # waited after a 429 that names no retry-after
+    DEFAULT_RETRY_AFTER = 1.0
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        if requests_per_minute is None:
+            requests_per_minute = float(os.getenv("RATE_LIMIT_RPM", 0))
+        if tokens_per_minute is None:
+            tokens_per_minute = float(os.getenv("RATE_LIMIT_TPM", 0))
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.stats = SchedulerStats()
+        self._blocked_until = 0.0
+        self._sequence = itertools.count()
+        self._queue = []
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting for admission"""
+        return len(self._queue)
+
+    async def acquire(self, tokens: int, priority: int = MAIN) -> Admission:
+        """Wait until a request of about `tokens` tokens may be sent, lower priorities first"""
+        condition = self._get_condition()
+        entry = (priority, next(self._sequence))
+        started = time.monotonic()
+        async with condition:
+            heapq.heappush(self._queue, entry)
+            queued_behind = len(self._queue) - 1
+            self.stats.max_queue_depth = max(self.stats.max_queue_depth, len(self._queue))
+            try:
+                while True:
+                    delay = self._delay(tokens) if self._queue[0] == entry else None
+                    if delay is not None and delay <= 0:
+                        break
+                    try:
+                        await asyncio.wait_for(condition.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                condition.notify_all()
+                raise
+            heapq.heappop(self._queue)
+            now = time.monotonic()
+            self.requests.take(1, now)
+            self.tokens.take(tokens, now)
+            # the next one in line checks its own delay
+            condition.notify_all()
+
+        admission = Admission(tokens, priority, now - started, queued_behind)
+        self.stats.record(admission)
+        return admission
+
+    def settle(self, admission: Admission, used_tokens: Optional[int]) -> None:
+        """Correct the estimate an admission took with the tokens the request really used"""
+        if used_tokens is not None:
+            self.tokens.take(used_tokens - admission.tokens, time.monotonic())
+
+    def observe(self, headers: Optional[Mapping[str, Any]]) -> None:
+        """Bring the buckets in line with a response's x-ratelimit-* headers"""
+        if not headers:
+            return
+        now = time.monotonic()
+        for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            limit = _number(headers.get(f"x-ratelimit-limit-{kind}"))
+            if limit:
+                bucket.set_limit(limit, now)
+            remaining = _number(headers.get(f"x-ratelimit-remaining-{kind}"))
+            if remaining is None:
+                continue
+            bucket.sync(remaining, now)
+            # with a known limit the empty bucket refills at its rate, the reset header is
+            # the time until it is full again
+            if remaining <= 0 and not bucket.enabled:
+                self._block(parse_duration(headers.get(f"x-ratelimit-reset-{kind}")) or 0.0)
+
+    def rate_limited(self, headers: Optional[Mapping[str, Any]]) -> float:
+        """A 429 came back: hold every request back for its retry-after, return that delay"""
+        headers = headers or {}
+        self.stats.rate_limited += 1
+        self.observe(headers)
+        retry_after_ms = _number(headers.get("retry-after-ms"))
+        if retry_after_ms is not None:
+            delay = retry_after_ms / 1000
+        else:
+            delay = parse_duration(headers.get("retry-after"))
+        if delay is None:
+            delay = self.DEFAULT_RETRY_AFTER
+        self._block(delay)
+        return delay
+
+    def _block(self, seconds: float) -> None:
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def _delay(self, tokens: int) -> float:
+        now = time.monotonic()
+        return max(
+            self._blocked_until - now,
+            self.requests.delay(1, now),
+            self.tokens.delay(tokens, now),
+        )
+
+    def _get_condition(self) -> asyncio.Condition:
+        # asyncio primitives belong to one event loop, tests and benchmarks start several
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._condition = asyncio.Condition()
+            self._queue = []
+        return self._condition
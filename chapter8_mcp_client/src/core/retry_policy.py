@@ -0,0 +1,76 @@
+"""
+Retries of failed model requests.
+
+Errors are either retryable (connection drops, timeouts, 408/409/429/5xx, a
+stream cut off mid-answer) or fatal (any other 4xx: a bad request, a bad key,
+an unknown model), which no retry would fix. Retryable errors are retried after
+a jittered exponential backoff ("full jitter": a random delay up to base * 2^n,
+capped), so agents that failed together don't retry together.
+
+A stream cut off after some content isn't regenerated from scratch. The APIClient
+sends the request again with the partial answer as an assistant prefill, and the
+model continues where the stream stopped. Partial tool call arguments can't be
+continued that way, they are dropped and counted as wasted tokens.
+"""
+
+import os
+import random
+from dataclasses import dataclass
+from typing import Optional
+import httpx
+from dotenv import load_dotenv
+from openai import APIConnectionError, APIError, APIStatusError
+
+# Load environment variables
+load_dotenv()
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class StreamInterrupted(Exception):
+    """A stream ended before its final chunk"""
+
+
+@dataclass
+class ResilienceStats:
+    retries: int = 0
+    interrupted_streams: int = 0
+    recovered_streams: int = 0
+    failed_requests: int = 0
+    # generated tokens received and kept across an interruption
+    salvaged_tokens: int = 0
+    # generated tokens received and thrown away (partial tool calls)
+    wasted_tokens: int = 0
+
+
+class RetryPolicy:
+    """
+    Which errors to retry and how long to wait before doing so, see the module docstring.
+
+    Args:
+        max_retries: Retries after the first attempt, defaults to API_MAX_RETRIES
+        base_delay: Backoff of the first retry, defaults to API_RETRY_BASE_DELAY
+        max_delay: Upper bound of a backoff, defaults to API_RETRY_MAX_DELAY
+    """
+
+    def __init__(self, max_retries: Optional[int] = None, base_delay: Optional[float] = None, max_delay: Optional[float] = None):
+        self.max_retries = int(os.getenv("API_MAX_RETRIES", 2)) if max_retries is None else max_retries
+        self.base_delay = float(os.getenv("API_RETRY_BASE_DELAY", 0.5)) if base_delay is None else base_delay
+        self.max_delay = float(os.getenv("API_RETRY_MAX_DELAY", 8)) if max_delay is None else max_delay
+        self.stats = ResilienceStats()
+
+    @staticmethod
+    def is_retryable(error: BaseException) -> bool:
+        if isinstance(error, StreamInterrupted):
+            return True
+        if isinstance(error, APIStatusError):
+            return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+        # connection errors and timeouts before the response, SSE error events during it
+        if isinstance(error, (APIConnectionError, APIError)):
+            return True
+        # the connection dropped while the body was streaming
+        return isinstance(error, (httpx.TransportError, httpx.StreamError))
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (1 for the first retry)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
@@ -0,0 +1,229 @@
+"""
+Per-turn latency instrumentation.
+
+A turn is one model request plus the tool calls it asked for. Every turn, failed
+ones too, is written as one JSON line to TELEMETRY_LOG, and with TELEMETRY_SUMMARY=true
+a one-line summary is printed next to the context window / cost line.
+"""
+
+import asyncio
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class StreamTimings:
+    """Arrival times of one streamed response, filled in by the APIClient"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token: Optional[float] = None
+        self.last_token: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.gaps: List[float] = []
+        # time spent in the rate limiter's queue and requests admitted ahead of this one
+        self.queue_wait = 0.0
+        self.queued_behind = 0
+        # attempts sent again after a failure, see RetryPolicy
+        self.retries = 0
+
+    def start(self) -> None:
+        """Mark the moment the request is sent, a resumed stream keeps its first token's timing"""
+        if self.first_token is None:
+            self.started = time.perf_counter()
+
+    def record_admission(self, admission) -> None:
+        """Add the wait of one attempt at the rate limiter, see RequestScheduler"""
+        self.queue_wait += admission.waited
+        self.queued_behind = max(self.queued_behind, admission.queued_behind)
+
+    def on_chunk(self, has_token: bool) -> None:
+        """Record a chunk, has_token is True if it carried content or tool call deltas"""
+        if not has_token:
+            return
+        now = time.perf_counter()
+        if self.first_token is None:
+            self.first_token = now
+        else:
+            self.gaps.append(now - self.last_token)
+        self.last_token = now
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    @property
+    def ttft(self) -> Optional[float]:
+        return None if self.first_token is None else self.first_token - self.started
+
+    @property
+    def generation_time(self) -> Optional[float]:
+        if self.first_token is None or self.last_token is None:
+            return None
+        return self.last_token - self.first_token
+
+
+class TurnMetrics:
+    """Timers of one turn, see Telemetry.start_turn"""
+
+    def __init__(self, depth: int, measure_size: bool):
+        self.started = time.perf_counter()
+        self.depth = depth
+        self.stream = StreamTimings()
+        self.durations: Dict[str, float] = {"request_build": 0.0, "history": 0.0, "tool_wall": 0.0}
+        self.request_bytes: Optional[int] = None
+        self.messages = 0
+        self.tool_calls = 0
+        self.completion_tokens: Optional[int] = None
+        self.prompt_tokens: Optional[int] = None
+        self.cached_tokens: Optional[int] = None
+        self.tools_sent = 0
+        self.tools_total = 0
+        self.tool_tokens_saved = 0
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self._measure_size = measure_size
+
+    @contextmanager
+    def measure(self, name: str):
+        """Add the time spent in the block to the named duration"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - start
+
+    def record_request(self, request: Dict[str, Any]) -> None:
+        self.messages = len(request.get("messages") or ())
+        if self._measure_size:
+            # only paid for when the numbers are going somewhere
+            self.request_bytes = len(json.dumps(request, default=str).encode("utf-8"))
+
+    def record_tools(self, sent: int, total: int, tokens_saved: int) -> None:
+        self.tools_sent = sent
+        self.tools_total = total
+        self.tool_tokens_saved = max(0, tokens_saved)
+
+    def record_error(self, error: BaseException) -> None:
+        """The turn failed, or was cancelled before it ended"""
+        self.status = "cancelled" if isinstance(error, asyncio.CancelledError) else "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def record_usage(self, token_usage) -> None:
+        self.completion_tokens = getattr(token_usage, "completion_tokens", None)
+        self.prompt_tokens = getattr(token_usage, "prompt_tokens", None)
+        details = getattr(token_usage, "prompt_tokens_details", None)
+        self.cached_tokens = getattr(details, "cached_tokens", None)
+
+    @property
+    def cache_hit_rate(self) -> Optional[float]:
+        if not self.prompt_tokens or self.cached_tokens is None:
+            return None
+        return self.cached_tokens / self.prompt_tokens
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        generation_time = self.stream.generation_time
+        if not self.completion_tokens or not generation_time:
+            return None
+        return self.completion_tokens / generation_time
+
+    def to_event(self) -> Dict[str, Any]:
+        def ms(seconds):
+            return None if seconds is None else round(seconds * 1000, 2)
+
+        return {
+            "event": "turn",
+            "ts": time.time(),
+            "depth": self.depth,
+            "status": self.status,
+            "error": self.error,
+            "messages": self.messages,
+            "request_bytes": self.request_bytes,
+            "request_build_ms": ms(self.durations["request_build"]),
+            "queue_wait_ms": ms(self.stream.queue_wait),
+            "queued_behind": self.stream.queued_behind,
+            "retries": self.stream.retries,
+            "ttft_ms": ms(self.stream.ttft),
+            "generation_ms": ms(self.stream.generation_time),
+            "gap_p50_ms": ms(percentile(self.stream.gaps, 0.5)),
+            "gap_p90_ms": ms(percentile(self.stream.gaps, 0.9)),
+            "gap_p99_ms": ms(percentile(self.stream.gaps, 0.99)),
+            "gap_max_ms": ms(max(self.stream.gaps, default=None)),
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cache_hit_rate": None if self.cache_hit_rate is None else round(self.cache_hit_rate, 3),
+            "completion_tokens": self.completion_tokens,
+            "tokens_per_s": None if self.tokens_per_second is None else round(self.tokens_per_second, 1),
+            "tools_sent": self.tools_sent,
+            "tools_total": self.tools_total,
+            "tool_tokens_saved": self.tool_tokens_saved,
+            "tool_calls": self.tool_calls,
+            "tool_wall_ms": ms(self.durations["tool_wall"]),
+            "history_ms": ms(self.durations["history"]),
+            "total_ms": ms(time.perf_counter() - self.started),
+        }
+
+    def summary(self) -> str:
+        parts = []
+        if self.stream.queue_wait >= 0.01:
+            parts.append(f"queued: {self.stream.queue_wait:.2f}s")
+        if self.stream.retries:
+            parts.append(f"retries: {self.stream.retries}")
+        if self.stream.ttft is not None:
+            parts.append(f"ttft: {self.stream.ttft:.2f}s")
+        if self.tokens_per_second is not None:
+            parts.append(f"{self.tokens_per_second:.0f} tok/s")
+        if self.tool_calls:
+            parts.append(f"tools: {self.durations['tool_wall']:.2f}s")
+        overhead = self.durations["request_build"] + self.durations["history"]
+        parts.append(f"overhead: {overhead * 1000:.0f}ms")
+        return f"({', '.join(parts)})"
+
+
+class Telemetry:
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not self._initialized:
+            self.log_path = os.getenv("TELEMETRY_LOG")
+            self.print_summary = os.getenv("TELEMETRY_SUMMARY", "false").lower() == "true"
+            self._initialized = True
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.log_path) or self.print_summary
+
+    def start_turn(self, depth: int = 0) -> TurnMetrics:
+        return TurnMetrics(depth, measure_size=self.enabled)
+
+    def finish_turn(self, turn: TurnMetrics) -> None:
+        self.emit(turn.to_event())
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        """Append one event to TELEMETRY_LOG, if configured"""
+        if not self.log_path:
+            return
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event) + "\n")
+        except OSError:
+            pass
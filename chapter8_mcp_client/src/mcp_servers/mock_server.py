@@ -0,0 +1,110 @@
+"""
+Configurable MCP server for tests and benchmarks.
+
+    python src/mcp_servers/mock_server.py --name notes --tools 3 --startup-delay 0.5
+
+serves the tools notes_0 .. notes_2, each echoing its text argument, after
+taking --startup-delay seconds to start. With --hang the process starts but
+never answers, with --crash it exits right away.
+
+--sleep-tool adds notes_sleep(seconds), which answers after that long. A
+cancelled sleep is appended to --cancel-log. The sleep is idempotent, calling
+it twice does no harm.
+
+--crash-tool adds notes_crash(delay), after which the process exits, as a
+server that dies mid-session, and notes_freeze(seconds), which blocks the
+server for that long, as one that stops answering.
+
+--transport streamable-http or sse serves the tools over HTTP on --port, at
+/mcp and /sse. Over HTTP notes_header(header) answers with that header of the
+request.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.types import ToolAnnotations
+
+
+def build_server(
+    name: str,
+    tools: int,
+    sleep_tool: bool = False,
+    cancel_log: str = None,
+    crash_tool: bool = False,
+    port: int = 8000,
+    http: bool = False
+) -> FastMCP:
+    mcp = FastMCP(name, log_level="WARNING", port=port)
+    for index in range(tools):
+        async def echo(text: str) -> str:
+            return text
+
+        mcp.add_tool(echo, name=f"{name}_{index}", description=f"Echo the text back, tool {index} of the {name} server")
+
+    if sleep_tool:
+        async def sleep(seconds: float) -> str:
+            try:
+                await asyncio.sleep(seconds)
+            except asyncio.CancelledError:
+                if cancel_log:
+                    with open(cancel_log, "a", encoding="utf-8") as f:
+                        f.write(f"{seconds}\n")
+                raise
+            return f"slept {seconds:g}s"
+
+        mcp.add_tool(sleep, name=f"{name}_sleep", description="Answer after the given number of seconds",
+                     annotations=ToolAnnotations(idempotentHint=True))
+
+    if crash_tool:
+        async def crash(delay: float = 0.0) -> str:
+            threading.Timer(delay, os._exit, args=(1,)).start()
+            return f"exiting in {delay:g}s"
+
+        def freeze(seconds: float) -> str:
+            time.sleep(seconds)
+            return f"froze {seconds:g}s"
+
+        mcp.add_tool(crash, name=f"{name}_crash", description="Exit the server process after the given delay")
+        mcp.add_tool(freeze, name=f"{name}_freeze", description="Block the server for the given number of seconds")
+
+    if http:
+        async def header(header: str, ctx: Context) -> str:
+            return ctx.request_context.request.headers.get(header, "")
+
+        mcp.add_tool(header, name=f"{name}_header", description="Answer with the given header of the HTTP request")
+    return mcp
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Configurable MCP server")
+    parser.add_argument("--name", default="mock")
+    parser.add_argument("--tools", type=int, default=1)
+    parser.add_argument("--startup-delay", type=float, default=0.0)
+    parser.add_argument("--hang", action="store_true", help="never answer")
+    parser.add_argument("--crash", action="store_true", help="exit before answering")
+    parser.add_argument("--sleep-tool", action="store_true")
+    parser.add_argument("--cancel-log", help="file the cancelled sleeps are appended to")
+    parser.add_argument("--crash-tool", action="store_true")
+    parser.add_argument("--transport", choices=["stdio", "streamable-http", "sse"], default="stdio")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    if args.crash:
+        sys.exit(1)
+    time.sleep(args.startup_delay)
+    if args.hang:
+        time.sleep(3600)
+    server = build_server(
+        args.name, args.tools, args.sleep_tool, args.cancel_log, args.crash_tool, args.port, args.transport != "stdio"
+    )
+    server.run(transport=args.transport)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Offline OpenAI-compatible server for tests and benchmarks.
+"""
+
+from .server import MockOpenAIServer, ScriptedResponse
+
+__all__ = ['MockOpenAIServer', 'ScriptedResponse']
@@ -0,0 +1,363 @@
+"""
+Offline OpenAI-compatible chat completions server for tests and benchmarks.
+
+It serves scripted responses on POST /v1/chat/completions, streamed as SSE
+chunks (content and tool_calls deltas, a usage chunk with cost when
+stream_options.include_usage is set) or as a single JSON completion.
+Time to first token and token rate are configurable per response, and so are
+error responses (a 429 with its retry-after headers, a 500...) and streams
+whose connection drops midway.
+
+With requests_per_minute / tokens_per_minute set, the server also limits
+requests the way providers do: a bucket per limit refilled continuously, the
+x-ratelimit-* headers on every response, and a 429 with retry-after once a
+bucket runs dry.
+
+Run standalone:
+    python src/mock_openai/server.py --port 8765 --script script.json
+
+where script.json is {"responses": [{"content": "...", "tool_calls": [...]}], "loop": true}.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import socket
+import threading
+import math
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+
+@dataclass
+class ScriptedResponse:
+    """
+    One model response.
+
+    tool_calls are dicts with "name" and "arguments" (a dict or a JSON string).
+    Token counts are estimated from text length unless given. With
+    tokens_per_second unset, all chunks are sent without delay. With drop_after
+    set, the connection of a stream is cut once that many characters of content
+    and tool call arguments were sent. With end_after set, the stream is ended
+    there as if complete, [DONE] without the chunk carrying the finish reason.
+    """
+    content: str = ""
+    tool_calls: List[Dict[str, Any]] = field(default_factory=list)
+    ttft: float = 0.0
+    tokens_per_second: Optional[float] = None
+    chars_per_token: int = 4
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: int = 0
+    cost: float = 0.0
+    status: int = 200
+    headers: Dict[str, str] = field(default_factory=dict)
+    drop_after: Optional[int] = None
+    end_after: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ScriptedResponse":
+        return cls(**data)
+
+
+Responder = Callable[[Dict[str, Any]], ScriptedResponse]
+
+
+class _DroppedStreamFilter(logging.Filter):
+    """A stream dropped on purpose (drop_after) isn't an error of the server"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return not (record.exc_info and isinstance(record.exc_info[1], ConnectionAbortedError))
+
+
+_dropped_stream_filter = _DroppedStreamFilter()
+
+
+class MockOpenAIServer:
+    """
+    Serves scripted responses in order, in a background thread.
+
+    Usage:
+        with MockOpenAIServer([ScriptedResponse(content="Hello")]) as server:
+            client = OpenAI(base_url=server.base_url, api_key="mock")
+
+    Args:
+        responses: Responses in the order they are served, or a callable that
+            builds the response for a request body
+        loop: Start over when the scripted responses are used up, instead of
+            answering with HTTP 500
+        host: Interface to bind
+        port: Port to bind, 0 picks a free one
+        requests_per_minute: Limit of requests, None for no limit
+        tokens_per_minute: Limit of prompt tokens, None for no limit
+        burst: Fraction of a minute's allowance that may be spent at once
+    """
+
+    def __init__(
+        self,
+        responses: Union[List[ScriptedResponse], Responder],
+        loop: bool = False,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        burst: float = 1.0
+    ):
+        self._responder = responses if callable(responses) else None
+        self._responses = [] if callable(responses) else list(responses)
+        self._loop = loop
+        self._host = host
+        self._port = port
+        self._served = 0
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self.requests: List[Dict[str, Any]] = []
+        self.rate_limited = 0
+        self._limits = {
+            kind: {"limit": limit, "capacity": limit * burst, "level": limit * burst, "updated": time.monotonic()}
+            for kind, limit in (("requests", requests_per_minute), ("tokens", tokens_per_minute)) if limit
+        }
+        self.app = Starlette(routes=[Route("/v1/chat/completions", self._chat_completions, methods=["POST"])])
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self._host}:{self._port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self._host, self._port))
+        self._port = sock.getsockname()[1]
+
+        config = uvicorn.Config(self.app, log_level="warning", lifespan="off")
+        self._server = uvicorn.Server(config)
+        logging.getLogger("uvicorn.error").addFilter(_dropped_stream_filter)
+        self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": [sock]}, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError("mock OpenAI server failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(timeout=5)
+            self._server = None
+
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _next_response(self, body: Dict[str, Any]) -> Optional[ScriptedResponse]:
+        if self._responder is not None:
+            return self._responder(body)
+        if self._served >= len(self._responses):
+            if not self._loop or not self._responses:
+                return None
+            self._served = 0
+        response = self._responses[self._served]
+        self._served += 1
+        return response
+
+    def _admit(self, body: Dict[str, Any]):
+        """Take the request from the rate limit buckets: the delay before it could be served, and the headers"""
+        now = time.monotonic()
+        costs = {"requests": 1, "tokens": len(json.dumps(body.get("messages", []))) // 4}
+        headers, delay = {}, 0.0
+        for kind, bucket in self._limits.items():
+            rate = bucket["limit"] / 60
+            bucket["level"] = min(bucket["capacity"], bucket["level"] + (now - bucket["updated"]) * rate)
+            bucket["updated"] = now
+            delay = max(delay, (min(costs[kind], bucket["capacity"]) - bucket["level"]) / rate)
+        for kind, bucket in self._limits.items():
+            if delay <= 0:
+                bucket["level"] -= costs[kind]
+            headers[f"x-ratelimit-limit-{kind}"] = str(bucket["limit"])
+            headers[f"x-ratelimit-remaining-{kind}"] = str(max(0, int(bucket["level"])))
+            headers[f"x-ratelimit-reset-{kind}"] = f"{max(0.0, (bucket['capacity'] - bucket['level']) * 60 / bucket['limit']):.3f}s"
+        if delay > 0:
+            headers["retry-after-ms"] = str(math.ceil(delay * 1000))
+            headers["retry-after"] = str(math.ceil(delay))
+        return delay, headers
+
+    async def _chat_completions(self, request: Request):
+        body = await request.json()
+        delay, headers = self._admit(body)
+        if delay > 0:
+            self.rate_limited += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers=headers,
+            )
+        self.requests.append(body)
+        scripted = self._next_response(body)
+        if scripted is None:
+            return JSONResponse({"error": {"message": "mock script exhausted"}}, status_code=500)
+        if scripted.status != 200:
+            if scripted.status == 429:
+                self.rate_limited += 1
+            return JSONResponse(
+                {"error": {"message": f"scripted error {scripted.status}", "code": scripted.status}},
+                status_code=scripted.status,
+                headers={**headers, **scripted.headers},
+            )
+        headers.update(scripted.headers)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "mock-model")
+        tool_calls = [
+            {
+                "id": call.get("id") or f"call_{uuid.uuid4().hex[:12]}",
+                "name": call["name"],
+                "arguments": call["arguments"] if isinstance(call["arguments"], str) else json.dumps(call["arguments"]),
+            }
+            for call in scripted.tool_calls
+        ]
+        usage = self._usage(scripted, body, tool_calls)
+
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+            events = self._stream_events(scripted, completion_id, model, tool_calls, usage if include_usage else None)
+            return StreamingResponse(events, media_type="text/event-stream", headers=headers)
+
+        await asyncio.sleep(scripted.ttft)
+        if scripted.tokens_per_second:
+            # the whole answer is generated before it is sent
+            await asyncio.sleep(usage["completion_tokens"] / scripted.tokens_per_second)
+        message = {"role": "assistant", "content": scripted.content or None}
+        if tool_calls:
+            message["tool_calls"] = [
+                {"id": c["id"], "type": "function", "function": {"name": c["name"], "arguments": c["arguments"]}}
+                for c in tool_calls
+            ]
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_calls else "stop"}],
+            "usage": usage,
+        }, headers=headers)
+
+    async def _stream_events(self, scripted, completion_id, model, tool_calls, usage):
+        def event(choices, usage_data=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": choices,
+            }
+            if usage_data is not None:
+                chunk["usage"] = usage_data
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        def delta(data, finish_reason=None):
+            return [{"index": 0, "delta": data, "finish_reason": finish_reason}]
+
+        interval = 1 / scripted.tokens_per_second if scripted.tokens_per_second else 0
+        step = max(1, scripted.chars_per_token)
+        sent = 0
+
+        def check_drop():
+            """True when the stream should end here, cleanly"""
+            if scripted.drop_after is not None and sent >= scripted.drop_after:
+                # ends the response without its last chunk, the client sees a broken connection
+                raise ConnectionAbortedError("mock stream dropped")
+            return scripted.end_after is not None and sent >= scripted.end_after
+
+        await asyncio.sleep(scripted.ttft)
+        yield event(delta({"role": "assistant", "content": ""}))
+
+        for start in range(0, len(scripted.content), step):
+            if check_drop():
+                yield "data: [DONE]\n\n"
+                return
+            yield event(delta({"content": scripted.content[start:start + step]}))
+            sent += len(scripted.content[start:start + step])
+            if interval:
+                await asyncio.sleep(interval)
+
+        for index, call in enumerate(tool_calls):
+            yield event(delta({"tool_calls": [{
+                "index": index,
+                "id": call["id"],
+                "type": "function",
+                "function": {"name": call["name"], "arguments": ""},
+            }]}))
+            arguments = call["arguments"]
+            for start in range(0, len(arguments), step):
+                if check_drop():
+                    yield "data: [DONE]\n\n"
+                    return
+                yield event(delta({"tool_calls": [{"index": index, "function": {"arguments": arguments[start:start + step]}}]}))
+                sent += len(arguments[start:start + step])
+                if interval:
+                    await asyncio.sleep(interval)
+
+        if check_drop():
+            yield "data: [DONE]\n\n"
+            return
+        yield event(delta({}, "tool_calls" if tool_calls else "stop"))
+        if usage is not None:
+            yield event([], usage)
+        yield "data: [DONE]\n\n"
+
+    @staticmethod
+    def _usage(scripted: ScriptedResponse, body: Dict[str, Any], tool_calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+        chars = max(1, scripted.chars_per_token)
+        prompt_tokens = scripted.prompt_tokens
+        if prompt_tokens is None:
+            prompt_tokens = len(json.dumps(body.get("messages", []))) // chars
+        completion_tokens = scripted.completion_tokens
+        if completion_tokens is None:
+            generated = len(scripted.content) + sum(len(c["name"]) + len(c["arguments"]) for c in tool_calls)
+            completion_tokens = -(-generated // chars)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": min(scripted.cached_tokens, prompt_tokens)},
+            "cost": scripted.cost,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--script", help="JSON file with scripted responses, default answers 'Hello!'")
+    args = parser.parse_args()
+
+    loop = True
+    responses = [ScriptedResponse(content="Hello!")]
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            script = json.load(f)
+        responses = [ScriptedResponse.from_dict(item) for item in script["responses"]]
+        loop = script.get("loop", True)
+
+    server = MockOpenAIServer(responses, loop=loop, host=args.host, port=args.port).start()
+    print(f"Mock OpenAI server listening on {server.base_url}")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
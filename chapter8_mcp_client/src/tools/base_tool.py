@@ -9,6 +9,16 @@ class BaseTool:
     def get_tool_name():
         return "base_agent"
 
+    @staticmethod
+    def is_concurrency_safe():
+        """Whether calls of this tool may run concurrently with other tool calls"""
+        return True
+
+    @staticmethod
+    def is_replayable():
+        """Whether a recorded result can stand in for running this tool when a session is replayed"""
+        return True
+
     @abstractmethod
     async def act(self, **kwargs):
         pass
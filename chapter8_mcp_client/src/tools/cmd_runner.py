@@ -1,9 +1,35 @@
-import subprocess
+import asyncio
+import codecs
+import os
+import signal
+from dotenv import load_dotenv
 from tools.base_tool import BaseTool
+from tools.shell_session import ShellSession
+from ui.ui_manager import UIManager
+
+# Load environment variables
+load_dotenv()
 
 class CmdRunner(BaseTool):
+    shell_session = None  # the shell of calls made outside of a conversation
+
     def __init__(self):
         super().__init__()
+        self._ui_manager = UIManager()
+        persistent = os.getenv("CMD_RUNNER_PERSISTENT_SHELL", "true").lower() in ("1", "true", "yes")
+        self._persistent = persistent and ShellSession.is_supported()
+
+    @property
+    def _shell_session(self):
+        # the shell of the conversation calling the tool, each sub-agent keeps its own
+        # cwd and variables, and its shell is closed when its task ends
+        if not self._persistent:
+            return None
+        from core.conversation import Conversation
+        owner = Conversation.running() or self
+        if owner.shell_session is None:
+            owner.shell_session = ShellSession()
+        return owner.shell_session
 
     @staticmethod
     def get_tool_name():
@@ -12,29 +38,113 @@ class CmdRunner(BaseTool):
     async def act(self, command="", timeout=30):
         if not command:
             return "No command provided"
-        
+        timeout = float(timeout) if timeout else 30
+
+        session = self._shell_session
+        if session is not None and not session.busy:
+            return await self._run_in_session(session, command, timeout)
+        # the shell is busy with a concurrent call, run this one in a fresh process from the same directory
+        return await self._run_in_new_process(command, timeout, cwd=session.cwd if session else None)
+
+    async def _run_in_session(self, session, command, timeout):
+        try:
+            returncode, stdout, stderr = await session.run(command, timeout, self._ui_manager.print_tool_output)
+        except asyncio.TimeoutError as e:
+            return self._format_timeout(timeout, e.stdout, e.stderr)
+        except Exception as e:
+            self.status = "error"
+            return f"cmd_runner Exception: {str(e)}"
+        return self._format_result(returncode, stdout, stderr)
+
+    async def _run_in_new_process(self, command, timeout, cwd=None):
         try:
-            result = subprocess.run(
-                command, 
-                shell=True, 
-                capture_output=True, 
-                text=True, 
-                timeout=30
+            # own process group, so a timeout kills everything the command spawned
+            process = await asyncio.create_subprocess_shell(
+                command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=cwd,
+                start_new_session=(os.name == "posix")
             )
-            
-            if result.returncode == 0:
-                if result.stdout.strip():
-                    return result.stdout
-                else:
-                    return "Command executed successfully and no return"
-            else:
-                return f"Error: {result.stderr}"
-        except subprocess.TimeoutExpired:
-            return "Command timed out"
         except Exception as e:
             self.status = "error"
             return f"cmd_runner Exception: {str(e)}"
 
+        stdout_chunks, stderr_chunks = [], []
+        try:
+            await asyncio.wait_for(
+                self._communicate(process, stdout_chunks, stderr_chunks),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            await self._kill(process)
+            return self._format_timeout(timeout, "".join(stdout_chunks), "".join(stderr_chunks))
+        except asyncio.CancelledError:
+            await self._kill(process)
+            raise
+
+        return self._format_result(process.returncode, "".join(stdout_chunks), "".join(stderr_chunks))
+
+    async def _communicate(self, process, stdout_chunks, stderr_chunks):
+        await asyncio.gather(
+            self._read_stream(process.stdout, stdout_chunks, is_stderr=False),
+            self._read_stream(process.stderr, stderr_chunks, is_stderr=True)
+        )
+        await process.wait()
+
+    async def _read_stream(self, stream, chunks, is_stderr):
+        """Read a pipe incrementally, forwarding complete lines to the UI as they arrive"""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        while True:
+            data = await stream.read(65536)
+            text = decoder.decode(data, final=not data)
+            if text:
+                chunks.append(text)
+                pending += text
+                *lines, pending = pending.split("\n")
+                for line in lines:
+                    self._ui_manager.print_tool_output(line, is_stderr)
+            if not data:
+                break
+        if pending:
+            self._ui_manager.print_tool_output(pending, is_stderr)
+
+    async def _kill(self, process):
+        if process.returncode is not None:
+            return
+        try:
+            if os.name == "posix":
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
+        await process.wait()
+
+    def _format_result(self, returncode, stdout, stderr):
+        if returncode == 0:
+            if not stdout.strip() and not stderr.strip():
+                return "Command executed successfully and no return"
+            if not stderr.strip():
+                return stdout
+            return f"{stdout}\n[stderr]\n{stderr}" if stdout.strip() else f"[stderr]\n{stderr}"
+
+        result = f"Error: exit code {returncode}"
+        if stdout.strip():
+            result += f"\n[stdout]\n{stdout}"
+        if stderr.strip():
+            result += f"\n[stderr]\n{stderr}"
+        return result
+
+    def _format_timeout(self, timeout, stdout, stderr):
+        result = f"Command timed out after {timeout:g} seconds and was killed"
+        if stdout.strip():
+            result += f"\n[stdout]\n{stdout}"
+        if stderr.strip():
+            result += f"\n[stderr]\n{stderr}"
+        return result
+
     def json_schema(self):
         return {
                 "type": "function",
@@ -100,8 +210,9 @@ Note: The above commands are for Linux/macOS systems. For Windows, use appropria
 
 Usage notes:
   - The command and need_user_approve arguments are required.
-  - You can specify an optional timeout in milliseconds (up to 120 seconds). If not specified, commands will timeout after 30 seconds.
-  - Try to maintain your current working directory throughout the session by using absolute paths and avoiding usage of `cd`. You may use `cd` if the User explicitly requests it.
+  - You can specify an optional timeout in seconds. If not specified, commands will timeout after 30 seconds.
+  - The shell session persists between calls, so `cd` and exported variables carry over to later commands. Still try to maintain your current working directory throughout the session by using absolute paths and avoiding usage of `cd`. You may use `cd` if the User explicitly requests it.
+  - Commands never read from stdin; a command that times out restarts the shell session and its exported variables are lost.
 
 Committing changes with git
 
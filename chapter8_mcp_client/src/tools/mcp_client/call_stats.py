@@ -0,0 +1,62 @@
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from core.telemetry import percentile
+
+# upper bounds of the latency histogram's buckets, in seconds
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf"))
+
+
+class CallStats:
+    """Tool calls of one MCP server: outcomes and a latency histogram"""
+
+    OUTCOMES = ("ok", "error", "timeout", "cancelled")
+
+    def __init__(self, recent: int = 1024):
+        self.outcomes: Dict[str, int] = {outcome: 0 for outcome in self.OUTCOMES}
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        # calls sent again after the server was lost during them
+        self.retries = 0
+        # latest latencies, for percentiles
+        self._recent = deque(maxlen=recent)
+
+    @property
+    def calls(self) -> int:
+        return sum(self.outcomes.values())
+
+    @property
+    def timeouts(self) -> int:
+        return self.outcomes["timeout"]
+
+    @property
+    def error_rate(self) -> float:
+        """Share of the calls that failed or timed out"""
+        failed = self.outcomes["error"] + self.outcomes["timeout"]
+        return failed / self.calls if self.calls else 0.0
+
+    def record(self, seconds: float, outcome: str) -> None:
+        self.outcomes[outcome] += 1
+        self._recent.append(seconds)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+                break
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        return percentile(list(self._recent), fraction)
+
+    def histogram(self) -> List[Tuple[float, int]]:
+        """(upper bound in seconds, calls) of the non-empty buckets"""
+        return [(bound, count) for bound, count in zip(LATENCY_BUCKETS, self.buckets) if count]
+
+    def summary(self) -> str:
+        if not self.calls:
+            return "no calls"
+        parts = [f"{self.calls} calls"]
+        parts += [f"{count} {outcome}" for outcome, count in self.outcomes.items() if count and outcome != "ok"]
+        if self.retries:
+            parts.append(f"{self.retries} retried")
+        parts.append(f"p50 {self.percentile(0.5) * 1000:.0f}ms")
+        parts.append(f"p95 {self.percentile(0.95) * 1000:.0f}ms")
+        buckets = ", ".join(f"≤{'∞' if bound == float('inf') else f'{bound:g}s'}: {count}" for bound, count in self.histogram())
+        return f"{', '.join(parts)} [{buckets}]"
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from mcp.types import Tool
+from dotenv import load_dotenv
+
+from .server_config import MCPServer
+
+load_dotenv()  # load environment variables from .env
+
+
+class ToolCatalog:
+    """
+    The tools of every MCP server, persisted between runs.
+
+    With a server's tools in the catalog its tools are offered to the model
+    without starting it, the server is spawned when one of them is called. An
+    entry belongs to the server's fingerprint: its command and arguments, and
+    the modification time and size of the executable and of every file among
+    the arguments. Installing another version of the server or editing its
+    script lists its tools anew. A remote server's fingerprint is its URL, a
+    new version there is only seen by the refresh below or tools/list_changed.
+
+    Entries older than MCP_CATALOG_MAX_AGE seconds are still used, and listed
+    again in the background.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age: Optional[float] = None):
+        self.path = Path(path or os.getenv("MCP_CATALOG", "~/.quickstar/mcp_catalog.json")).expanduser()
+        self.max_age = float(os.getenv("MCP_CATALOG_MAX_AGE", 86400)) if max_age is None else max_age
+        self._entries: Dict[str, dict] = self._load()
+
+    @staticmethod
+    def fingerprint(server: MCPServer) -> str:
+        if server.remote:
+            launch = json.dumps([server.type, server.url])
+            return hashlib.sha256(launch.encode("utf-8")).hexdigest()[:16]
+        files = []
+        for candidate in [shutil.which(server.command) or server.command, *server.args]:
+            try:
+                stat = os.stat(candidate)
+            except (OSError, ValueError):
+                continue
+            if os.path.isfile(candidate):
+                files.append([candidate, stat.st_mtime_ns, stat.st_size])
+        launch = json.dumps([server.command, server.args, files])
+        return hashlib.sha256(launch.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def dump(tools: List[Tool]) -> List[dict]:
+        return [tool.model_dump(mode="json", exclude_none=True) for tool in tools]
+
+    def get(self, server: MCPServer) -> Optional[List[Tool]]:
+        entry = self._entries.get(server.name)
+        if entry is None or entry.get("fingerprint") != self.fingerprint(server):
+            return None
+        try:
+            return [Tool.model_validate(tool) for tool in entry["tools"]]
+        except (KeyError, ValueError):
+            return None
+
+    def is_stale(self, server: MCPServer) -> bool:
+        entry = self._entries.get(server.name)
+        return entry is None or time.time() - entry.get("listed_at", 0) > self.max_age
+
+    def put(self, server: MCPServer, tools: List[Tool]) -> None:
+        self._entries[server.name] = {
+            "fingerprint": self.fingerprint(server),
+            "listed_at": time.time(),
+            "tools": self.dump(tools),
+        }
+        self._save()
+
+    def invalidate(self, server: MCPServer) -> None:
+        """The server's tools changed, its entry no longer holds"""
+        if self._entries.pop(server.name, None) is not None:
+            self._save()
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # written aside and renamed, a concurrent run never reads half a file
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # without a catalog the servers are started to list their tools, as before
+            pass
@@ -1,50 +1,116 @@
 # adapt from https://modelcontextprotocol.io/docs/develop/build-client
 
 import asyncio
-from typing import Optional
-from contextlib import AsyncExitStack
+import os
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-from mcp import ClientSession, StdioServerParameters, LoggingLevel
-from mcp.client.stdio import stdio_client
+from mcp import ClientSession
+from mcp.types import ServerNotification, Tool, ToolListChangedNotification
 
-from anthropic import Anthropic
 from dotenv import load_dotenv
 
+from ui.ui_manager import UIManager
+from .call_stats import CallStats
+from .catalog import ToolCatalog
+from .connection import MCPServerConnection
+from .http_pool import HttpClientPool
 from .server_config import MCPConfig
 
 load_dotenv()  # load environment variables from .env
 
 class MCPClient:
-    def __init__(self):
-        # Initialize session and client objects
-        self.sessions: list[ClientSession] = []
-        self.exit_stack = AsyncExitStack()
-        self.config = MCPConfig("~/.quickstar/mcp.json")
+    def __init__(self, config_path: str = None, catalog: Optional[ToolCatalog] = None):
+        self.config = MCPConfig(config_path or os.getenv("MCP_CONFIG", "~/.quickstar/mcp.json"))
+        self.catalog = catalog or ToolCatalog()
+        self._tools_changed_handlers = []
+        self._handler_tasks = set()
+        # Spawning many interpreters at once would only stretch every startup past its timeout
+        self._start_slots = asyncio.Semaphore(int(os.getenv("MCP_STARTUP_CONCURRENCY", 8)))
+        # keep-alive connections of the remote servers, kept across their restarts
+        self.http_pool = HttpClientPool()
+        self.connections: Dict[str, MCPServerConnection] = {
+            name: MCPServerConnection(
+                self.config.get_server(name),
+                message_handler=self._handle_message,
+                catalog=self.catalog,
+                on_tools_changed=self._tools_changed,
+                start_slots=self._start_slots,
+                http_pool=self.http_pool,
+            )
+            for name in self.config.list_servers()
+        }
 
+        # servers whose tools aren't in the catalog start side by side, each within its
+        # own timeouts. The others start when one of their tools is called
+        self._start_tasks = [asyncio.create_task(self._server_tools(connection)) for connection in self.connections.values()]
         self.connect_server_task = asyncio.create_task(self.connect_to_server())
 
     async def connect_to_server(self):
-        """Connect to all MCP servers
+        """Get the tools of all MCP servers, from the catalog or by starting the server
 
+        A server that fails or times out is reported and left out, the others are used.
         """
-        mcp_servers = self.config.list_servers()
+        await asyncio.gather(*self._start_tasks)
 
-        for name in mcp_servers:
-            server = self.config.get_server(name)
+    async def _server_tools(self, connection: MCPServerConnection) -> Optional[Tuple[MCPServerConnection, List[Tool]]]:
+        tools = self.catalog.get(connection.server)
+        if tools is not None:
+            if self.catalog.is_stale(connection.server):
+                connection.refresh_tools_in_background()
+            return connection, tools
+        try:
+            result = await connection.list_tools()
+        except Exception as e:
+            UIManager().print_error(f"MCP server '{connection.name}' failed to start: {connection.error or e}")
+            return None
+        return connection, result.tools
 
-            server_params = StdioServerParameters(
-                command=server.command,
-                args=server.args,
-                env=None
-            )
+    async def ready_servers(self) -> AsyncIterator[Tuple[MCPServerConnection, List[Tool]]]:
+        """Every server with its tools, as soon as they are known"""
+        for server_tools in asyncio.as_completed(self._start_tasks):
+            result = await server_tools
+            if result is not None:
+                yield result
+
+    @property
+    def failed_servers(self) -> Dict[str, BaseException]:
+        return {
+            name: connection.error
+            for name, connection in self.connections.items()
+            if connection.status == MCPServerConnection.FAILED
+        }
+
+    @property
+    def call_stats(self) -> Dict[str, CallStats]:
+        """Tool call outcomes and latencies, per server"""
+        return {name: connection.stats for name, connection in self.connections.items()}
+
+    @property
+    def server_health(self) -> Dict[str, dict]:
+        """Status, uptime, restarts and error rate, per server"""
+        return {name: connection.health() for name, connection in self.connections.items()}
+
+    async def close(self):
+        await asyncio.gather(*(connection.close() for connection in self.connections.values()))
+        await self.http_pool.close()
+
+    def add_tools_changed_handler(self, handler):
+        """handler(connection) is awaited whenever a server announces that its tools changed"""
+        self._tools_changed_handlers.append(handler)
 
-            stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
-            stdio, write = stdio_transport
-            session = await self.exit_stack.enter_async_context(ClientSession(stdio, write))
+    async def _handle_message(self, connection: MCPServerConnection, message):
+        if isinstance(message, ServerNotification) and isinstance(message.root, ToolListChangedNotification):
+            self.catalog.invalidate(connection.server)
+            self._tools_changed(connection)
 
-            await session.initialize()
-            self.sessions.append(session)
+    def _tools_changed(self, connection: MCPServerConnection):
+        for handler in self._tools_changed_handlers:
+            # handlers talk to the session, which can't answer until the notification is handled
+            task = asyncio.create_task(handler(connection))
+            self._handler_tasks.add(task)
+            task.add_done_callback(self._handler_tasks.discard)
 
     async def get_sessions(self) -> list[ClientSession]:
+        """The sessions of the servers running now"""
         await self.connect_server_task
-        return self.sessions
\ No newline at end of file
+        return [connection.session for connection in self.connections.values() if connection.running]
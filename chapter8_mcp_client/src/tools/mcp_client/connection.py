@@ -0,0 +1,525 @@
+import asyncio
+import contextvars
+import os
+import time
+from contextlib import AsyncExitStack
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import anyio
+import httpx
+from mcp import ClientSession, StdioServerParameters
+from mcp.shared.exceptions import McpError
+from mcp.shared.message import SessionMessage
+from mcp.types import (
+    CONNECTION_CLOSED, CallToolResult, CancelledNotification, CancelledNotificationParams, ClientNotification,
+    JSONRPCRequest, ListToolsResult, Tool
+)
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+from dotenv import load_dotenv
+
+from core.retry_policy import RetryPolicy
+from core.telemetry import Telemetry
+from .call_stats import CallStats
+from .catalog import ToolCatalog
+from .http_pool import HttpClientPool
+from .server_config import MCPServer
+
+load_dotenv()  # load environment variables from .env
+
+MessageHandler = Callable[["MCPServerConnection", object], Awaitable[None]]
+ToolsChangedHandler = Callable[["MCPServerConnection"], None]
+# what a request on a session whose server died raises
+CONNECTION_LOST = (anyio.ClosedResourceError, anyio.BrokenResourceError)
+# the ids of the tools/call requests a call_tool sent, see _RequestIdWriter
+_call_request_ids = contextvars.ContextVar("mcp_call_request_ids", default=None)
+
+
+class _RequestIdWriter:
+    """
+    The write stream of a session, noting the id of each tools/call request sent by
+    a call_tool, so that the call can be cancelled by it
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def send(self, message: SessionMessage) -> None:
+        request_ids = _call_request_ids.get()
+        root = message.message.root
+        if request_ids is not None and isinstance(root, JSONRPCRequest) and root.method == "tools/call":
+            request_ids.append(root.id)
+        await self._stream.send(message)
+
+    async def __aenter__(self) -> "_RequestIdWriter":
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self._stream.__aexit__(*exc_info)
+
+    def __getattr__(self, name: str):
+        return getattr(self._stream, name)
+
+
+class MCPServerConnection:
+    """
+    One MCP server, started in a task of its own.
+
+    A stdio server is spawned as a child process. An "http" (streamable HTTP) or
+    "sse" server already runs, starting it opens a session over keep-alive
+    connections from http_pool.
+
+    The task enters the transport and the session and leaves them again on close,
+    anyio wants both done by the same task. start() waits for it within two
+    timeouts, one for the process to be spawned and connected, one for the
+    initialize handshake, and stops the server when either runs out.
+
+    list_tools() and call_tool() start the server if it isn't running. Once no
+    call has used it for MCP_IDLE_TTL seconds it is shut down again, the next
+    call starts it anew.
+
+    Started for a call with its tools taken from the catalog, the server lists
+    its tools once in the background. If they differ from the catalog's, the
+    catalog is updated and on_tools_changed is called.
+
+    A tool call runs within the server's timeout, or the tool's own from
+    "toolTimeouts" in mcp.json, and at most max_concurrency calls share the
+    session at once. A call that times out or is cancelled is cancelled on the
+    server too, the SDK only stops waiting for it.
+
+    While the server runs a supervisor watches it: it notices at once when the
+    server's stdout closes, and pings it every MCP_PING_INTERVAL seconds. A
+    server that died or didn't answer the ping within MCP_PING_TIMEOUT is
+    started and initialized anew, after a backoff that grows with every restart
+    until one stays up. Calls cut off by the crash are sent again if their tool
+    is idempotent or read-only, the others fail.
+    """
+
+    PENDING = "pending"
+    CONNECTING = "connecting"
+    INITIALIZING = "initializing"
+    READY = "ready"
+    FAILED = "failed"
+    CLOSED = "closed"
+
+    def __init__(
+        self,
+        server: MCPServer,
+        message_handler: Optional[MessageHandler] = None,
+        connect_timeout: Optional[float] = None,
+        initialize_timeout: Optional[float] = None,
+        idle_ttl: Optional[float] = None,
+        ping_interval: Optional[float] = None,
+        ping_timeout: Optional[float] = None,
+        restart_policy: Optional[RetryPolicy] = None,
+        catalog: Optional[ToolCatalog] = None,
+        on_tools_changed: Optional[ToolsChangedHandler] = None,
+        start_slots: Optional[asyncio.Semaphore] = None,
+        http_pool: Optional[HttpClientPool] = None
+    ):
+        self.server = server
+        self.name = server.name
+        self.connect_timeout = float(os.getenv("MCP_CONNECT_TIMEOUT", 10)) if connect_timeout is None else connect_timeout
+        self.initialize_timeout = float(os.getenv("MCP_INITIALIZE_TIMEOUT", 10)) if initialize_timeout is None else initialize_timeout
+        # seconds without a call before the server is shut down, 0 keeps it running
+        self.idle_ttl = float(os.getenv("MCP_IDLE_TTL", 300)) if idle_ttl is None else idle_ttl
+        self.call_timeout = float(server.call_timeout or os.getenv("MCP_CALL_TIMEOUT", 60))
+        self.max_concurrency = int(server.max_concurrency or os.getenv("MCP_MAX_CONCURRENT_CALLS", 4))
+        # seconds between health checks, 0 only watches for the server exiting
+        self.ping_interval = float(os.getenv("MCP_PING_INTERVAL", 30)) if ping_interval is None else ping_interval
+        self.ping_timeout = float(os.getenv("MCP_PING_TIMEOUT", 5)) if ping_timeout is None else ping_timeout
+        # max_retries bounds the restarts in a row that don't stay up until the next ping
+        self.restart_policy = restart_policy or RetryPolicy(
+            max_retries=int(os.getenv("MCP_MAX_RESTARTS", 5)),
+            base_delay=float(os.getenv("MCP_RESTART_BASE_DELAY", 0.5)),
+            max_delay=float(os.getenv("MCP_RESTART_MAX_DELAY", 30)),
+        )
+        self.stats = CallStats()
+        self.catalog = catalog
+        self.http_pool = http_pool or HttpClientPool()
+        self.on_tools_changed = on_tools_changed
+        self.status = self.PENDING
+        self.starts = 0
+        # starts after the server was lost, and how often it was lost
+        self.restarts = 0
+        self.lost = 0
+        # the server's tools, by name
+        self.tools: Dict[str, Tool] = {}
+        self.error: Optional[BaseException] = None
+        self.session: Optional[ClientSession] = None
+        # seconds from start() until the server was ready
+        self.startup_time: Optional[float] = None
+        self._message_handler = message_handler
+        self._task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+        # shared by the servers of a client, bounds how many start at once
+        self._start_slots = start_slots or asyncio.Semaphore(1)
+        self._in_flight = 0
+        self._call_slots = asyncio.Semaphore(self.max_concurrency)
+        self._idle_timer: Optional[asyncio.TimerHandle] = None
+        self._idle_close: Optional[asyncio.Task] = None
+        # whether this run listed the tools, or they all come from the catalog
+        self._listed = False
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._supervisor: Optional[asyncio.Task] = None
+        self._lost = asyncio.Event()
+        self._ready_since = 0.0
+        self._uptime = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self.status == self.READY and self.session is not None
+
+    @property
+    def uptime(self) -> float:
+        """Seconds the server was ready, over all its runs"""
+        current = time.monotonic() - self._ready_since if self.status == self.READY else 0.0
+        return self._uptime + current
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "uptime": round(self.uptime, 1),
+            "starts": self.starts,
+            "restarts": self.restarts,
+            "lost": self.lost,
+            "calls": self.stats.calls,
+            "error_rate": round(self.stats.error_rate, 3),
+            "timeouts": self.stats.timeouts,
+            "retried": self.stats.retries,
+        }
+
+    def is_idempotent(self, name: str) -> bool:
+        """Whether a call cut off by a crash may be sent again"""
+        tool = self.tools.get(name)
+        if tool is None and self.catalog is not None:
+            tool = next((tool for tool in self.catalog.get(self.server) or [] if tool.name == name), None)
+        annotations = tool.annotations if tool is not None else None
+        return bool(annotations and (annotations.idempotentHint or annotations.readOnlyHint))
+
+    async def ensure_started(self) -> ClientSession:
+        """The session of the server, started first if it isn't running"""
+        async with self._start_lock:
+            if not self.running:
+                async with self._start_slots:
+                    session = await self.start()
+                if session is None:
+                    raise ConnectionError(f"MCP server '{self.name}' failed to start: {self.error}")
+            return self.session
+
+    async def list_tools(self) -> ListToolsResult:
+        """List the server's tools, and keep them in the catalog"""
+        self._listed = True
+        session = await self.ensure_started()
+        result = await self._until_lost(self._lost, session.list_tools())
+        self.tools = {tool.name: tool for tool in result.tools}
+        if self.catalog is not None:
+            self.catalog.put(self.server, result.tools)
+        self._schedule_idle_close()
+        return result
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> CallToolResult:
+        timeout = float(self.server.tool_timeouts.get(name, self.call_timeout))
+        session = await self.ensure_started()
+        if not self._listed:
+            self.refresh_tools_in_background()
+        self._in_flight += 1
+        # the latency includes waiting for a free call slot
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            async with self._call_slots:
+                retried = False
+                while True:
+                    # lost while the call waited, it goes to the server started after it
+                    if session is not self.session or not self.running:
+                        session = await self.ensure_started()
+                    server_lost = self._lost
+                    # the id the request is sent with, to cancel it by
+                    request_ids = []
+                    token = _call_request_ids.set(request_ids)
+                    try:
+                        result = await self._until_lost(
+                            server_lost, session.call_tool(name, arguments, read_timeout_seconds=timedelta(seconds=timeout))
+                        )
+                        break
+                    except McpError as e:
+                        if e.error.code == httpx.codes.REQUEST_TIMEOUT:
+                            outcome = "timeout"
+                            await self._cancel_request(session, request_ids, f"timed out after {timeout:g}s")
+                            raise TimeoutError(f"MCP tool {name} timed out after {timeout:g}s") from None
+                        if e.error.code != CONNECTION_CLOSED:
+                            raise
+                        lost = e
+                    except (*CONNECTION_LOST, ConnectionError) as e:
+                        lost = e
+                    except asyncio.CancelledError:
+                        outcome = "cancelled"
+                        await asyncio.shield(self._cancel_request(session, request_ids, "cancelled by the client"))
+                        raise
+                    finally:
+                        _call_request_ids.reset(token)
+                    self._connection_lost(f"connection lost during {name}")
+                    if retried or not self.is_idempotent(name):
+                        reason = "again" if retried else "and the tool isn't idempotent"
+                        raise ConnectionError(f"MCP server '{self.name}' was lost during {name} {reason}") from lost
+                    # sent once more, to the restarted server
+                    retried = True
+                    self.stats.retries += 1
+            outcome = "error" if result.isError else "ok"
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stats.record(elapsed, outcome)
+            Telemetry().emit({"event": "mcp_call", "server": self.name, "tool": name,
+                              "ms": round(elapsed * 1000, 1), "outcome": outcome})
+            self._in_flight -= 1
+            self._schedule_idle_close()
+
+    async def _cancel_request(self, session: ClientSession, request_ids: list, reason: str) -> None:
+        """Tell the server to stop working on a request nobody waits for any more"""
+        if not request_ids:
+            # cancelled before the request was sent
+            return
+        notification = CancelledNotification(
+            method="notifications/cancelled",
+            params=CancelledNotificationParams(requestId=request_ids[-1], reason=reason),
+        )
+        try:
+            await session.send_notification(ClientNotification(notification))
+        except Exception:
+            # the server is gone, nothing left to cancel
+            pass
+
+    def refresh_tools_in_background(self) -> None:
+        self._listed = True
+        self._refresh_task = asyncio.create_task(self.refresh_tools())
+
+    async def refresh_tools(self) -> None:
+        """List the tools again, tell on_tools_changed if they differ from the catalog's"""
+        cached = self.catalog.get(self.server) if self.catalog is not None else None
+        try:
+            result = await self.list_tools()
+        except Exception:
+            # the catalog's tools stay, a call to a server that doesn't start reports it
+            return
+        if cached is not None and ToolCatalog.dump(cached) != ToolCatalog.dump(result.tools):
+            if self.on_tools_changed is not None:
+                self.on_tools_changed(self)
+
+    async def start(self) -> Optional[ClientSession]:
+        """Connect and initialize the server, return its session, or None if it failed"""
+        started = time.perf_counter()
+        if self._task is not None and not self._task.done():
+            # what's left of a server that was lost is shut down as on close(), which
+            # terminates a process that doesn't exit once its stdin is closed
+            self._closing.set()
+            await self._task
+        self.starts += 1
+        if self._lost.is_set():
+            self.restarts += 1
+            self._lost = asyncio.Event()
+        self.error = None
+        self._connected = asyncio.Event()
+        self._initialized = asyncio.Event()
+        self._closing = asyncio.Event()
+        self.status = self.CONNECTING
+        self._task = asyncio.create_task(self._run())
+        try:
+            await self._wait(self._connected, self.connect_timeout, "connect")
+            self.status = self.INITIALIZING
+            await self._wait(self._initialized, self.initialize_timeout, "initialize")
+        except Exception as e:
+            self.status, self.error = self.FAILED, e
+            await self._stop()
+            return None
+        self.status = self.READY
+        self._ready_since = time.monotonic()
+        self.startup_time = time.perf_counter() - started
+        if self._supervisor is None or self._supervisor.done():
+            self._supervisor = asyncio.create_task(self._supervise())
+        return self.session
+
+    async def close(self) -> None:
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+        if self._supervisor is not None and self._supervisor is not asyncio.current_task():
+            self._supervisor.cancel()
+        if self.status != self.FAILED:
+            self._set_down(self.CLOSED)
+        if self._task is not None and not self._task.done():
+            self._closing.set()
+            await self._task
+
+    async def _supervise(self) -> None:
+        """Watch the running server, restart it when it's lost, until close() or the restarts run out"""
+        attempt = 0
+        while True:
+            try:
+                await asyncio.wait_for(self._lost.wait(), self.ping_interval or None)
+            except asyncio.TimeoutError:
+                if await self._ping():
+                    # it stayed up, the next loss starts over with a short backoff
+                    attempt = 0
+                continue
+            async with self._start_lock:
+                # a call may have started it again meanwhile
+                while not self.running:
+                    if attempt >= self.restart_policy.max_retries:
+                        Telemetry().emit({"event": "mcp_server_given_up", "server": self.name, "error": str(self.error)})
+                        return
+                    attempt += 1
+                    await asyncio.sleep(self.restart_policy.backoff(attempt))
+                    async with self._start_slots:
+                        await self.start()
+                    Telemetry().emit({"event": "mcp_server_restart", "server": self.name, "attempt": attempt,
+                                      "status": self.status, "error": None if self.running else str(self.error)})
+
+    async def _ping(self) -> bool:
+        session = self.session
+        if not self.running:
+            return False
+        try:
+            await asyncio.wait_for(session.send_ping(), self.ping_timeout)
+        except asyncio.TimeoutError:
+            self._connection_lost(f"no answer to ping within {self.ping_timeout:g}s")
+            return False
+        except (McpError, *CONNECTION_LOST) as e:
+            self._connection_lost(f"ping failed: {e!r}")
+            return False
+        return True
+
+    def _connection_lost(self, reason: str) -> None:
+        """The server died or stopped answering, the supervisor starts it again"""
+        if self.status != self.READY:
+            return
+        self._set_down(self.FAILED)
+        self.error = ConnectionError(reason)
+        self.lost += 1
+        self._lost.set()
+        Telemetry().emit({"event": "mcp_server_lost", "server": self.name, "reason": reason})
+
+    async def _until_lost(self, lost: asyncio.Event, request: Awaitable):
+        """
+        Await a request to the server, or raise ConnectionError once the server is lost.
+        A session torn down with its server doesn't always answer what it was waiting for.
+        """
+        request = asyncio.ensure_future(request)
+        waiter = asyncio.create_task(lost.wait())
+        try:
+            await asyncio.wait({request, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+            if not request.done():
+                request.cancel()
+        if not request.done() or request.cancelled():
+            raise ConnectionError(f"MCP server '{self.name}' was lost")
+        return request.result()
+
+    def _set_down(self, status: str) -> None:
+        if self.status == self.READY:
+            self._uptime += time.monotonic() - self._ready_since
+        self.status = status
+
+    async def _run(self):
+        try:
+            async with AsyncExitStack() as stack:
+                # streamable HTTP also yields a getter of the session id
+                read, write, *_ = await stack.enter_async_context(self._transport())
+                read = await self._watch_pipe(stack, read)
+                self.session = await stack.enter_async_context(
+                    ClientSession(read, _RequestIdWriter(write), message_handler=self._handle_message)
+                )
+                self._connected.set()
+                await self.session.initialize()
+                self._initialized.set()
+                await self._closing.wait()
+        except Exception as e:
+            # start() reports it, or the server died after it was ready
+            self.error = self.error or e
+            if self.status == self.READY:
+                self._connection_lost(f"session ended: {e!r}")
+        finally:
+            self.session = None
+
+    def _transport(self):
+        if self.server.type == "http":
+            return streamablehttp_client(
+                self.server.url,
+                headers=self.server.headers,
+                timeout=self.http_pool.request_timeout,
+                sse_read_timeout=self.http_pool.sse_read_timeout,
+                httpx_client_factory=self.http_pool.factory(self.server)
+            )
+        if self.server.type == "sse":
+            return sse_client(
+                self.server.url,
+                headers=self.server.headers,
+                timeout=self.http_pool.request_timeout,
+                sse_read_timeout=self.http_pool.sse_read_timeout,
+                httpx_client_factory=self.http_pool.factory(self.server)
+            )
+        params = StdioServerParameters(command=self.server.command, args=self.server.args, env=None)
+        return stdio_client(params)
+
+    async def _watch_pipe(self, stack: AsyncExitStack, read):
+        """Pass the server's messages on to the session, and notice when its stream closes or fails"""
+        send, receive = anyio.create_memory_object_stream(0)
+        relays = await stack.enter_async_context(anyio.create_task_group())
+        # on the way out the relay is stopped before the transport it reads from
+        stack.callback(relays.cancel_scope.cancel)
+
+        async def relay():
+            async with send:
+                async for message in read:
+                    if isinstance(message, httpx.TransportError):
+                        # a request the remote server never got or never answered
+                        self._connection_lost(f"request failed: {message!r}")
+                    await send.send(message)
+            self._connection_lost("the server closed its stream")
+
+        relays.start_soon(relay)
+        return receive
+
+    async def _wait(self, event: asyncio.Event, timeout: float, phase: str) -> None:
+        waiter = asyncio.create_task(event.wait())
+        try:
+            await asyncio.wait({waiter, self._task}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+        if event.is_set():
+            return
+        if self._task.done():
+            raise self.error or ConnectionError(f"server exited during {phase}")
+        raise TimeoutError(f"no {phase} within {timeout:g}s")
+
+    async def _stop(self) -> None:
+        """Cancel the task, which leaves the session and the transport and ends the process"""
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def _schedule_idle_close(self) -> None:
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+        if self.idle_ttl > 0:
+            self._idle_timer = asyncio.get_running_loop().call_later(self.idle_ttl, self._close_if_idle)
+
+    def _close_if_idle(self) -> None:
+        if self._in_flight == 0 and self.running:
+            self._idle_close = asyncio.create_task(self._close_idle())
+
+    async def _close_idle(self) -> None:
+        # a call arriving meanwhile waits, then starts the server again
+        async with self._start_lock:
+            if self._in_flight == 0 and self.running:
+                await self.close()
+
+    async def _handle_message(self, message) -> None:
+        if self._message_handler is not None:
+            await self._message_handler(self, message)
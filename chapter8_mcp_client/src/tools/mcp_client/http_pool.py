@@ -0,0 +1,111 @@
+import asyncio
+import os
+from typing import Dict, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+from .server_config import MCPServer
+
+load_dotenv()  # load environment variables from .env
+
+
+class _LentClient:
+    """
+    A pooled client as one transport sees it.
+
+    The client is shared by every server at its origin, so the timeout and auth the
+    transport asked for are passed with each of its requests instead of set on it.
+    A request that passes its own keeps them.
+    """
+
+    _REQUEST_METHODS = {"request", "stream", "get", "options", "head", "post", "put", "patch", "delete"}
+
+    def __init__(self, client: httpx.AsyncClient, timeout: Optional[httpx.Timeout], auth: Optional[httpx.Auth]):
+        self._client = client
+        self._defaults = {}
+        if timeout is not None:
+            self._defaults["timeout"] = timeout
+        if auth is not None:
+            self._defaults["auth"] = auth
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if name not in self._REQUEST_METHODS or not self._defaults:
+            return attr
+
+        def with_defaults(*args, **kwargs):
+            return attr(*args, **{**self._defaults, **kwargs})
+
+        return with_defaults
+
+
+class _Lent:
+    """A pooled client handed to a transport, which leaves it open when it's done"""
+
+    def __init__(self, client: _LentClient):
+        self.client = client
+
+    async def __aenter__(self) -> _LentClient:
+        return self.client
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+
+class HttpClientPool:
+    """
+    Keep-alive HTTP connections to the remote MCP servers, shared by their sessions.
+
+    The SDK's streamable HTTP and SSE transports open an httpx client per session
+    and close it with the session. Lent one of these instead, a session reuses
+    the open connections, and a server reconnected after a restart or its idle
+    TTL skips the TCP and TLS handshakes. Servers at the same origin with the
+    same headers share a client.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        timeout: Optional[float] = None,
+        sse_read_timeout: Optional[float] = None
+    ):
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("MCP_HTTP_MAX_CONNECTIONS", 20)) if max_connections is None else max_connections,
+            max_keepalive_connections=int(os.getenv("MCP_HTTP_MAX_KEEPALIVE", 10)) if max_keepalive is None else max_keepalive,
+            keepalive_expiry=float(os.getenv("MCP_HTTP_KEEPALIVE_EXPIRY", 60)) if keepalive_expiry is None else keepalive_expiry,
+        )
+        # handed to the transports, which pass them back with each request; the read
+        # timeout also bounds the wait between two events of a stream
+        self.request_timeout = float(os.getenv("MCP_HTTP_TIMEOUT", 30)) if timeout is None else timeout
+        self.sse_read_timeout = (
+            float(os.getenv("MCP_HTTP_SSE_READ_TIMEOUT", 300)) if sse_read_timeout is None else sse_read_timeout
+        )
+        self.timeout = httpx.Timeout(self.request_timeout, read=self.sse_read_timeout)
+        self._clients: Dict[Tuple, httpx.AsyncClient] = {}
+
+    def client(self, server: MCPServer) -> httpx.AsyncClient:
+        url = httpx.URL(server.url)
+        key = (url.scheme, url.host, url.port, tuple(sorted(server.headers.items())))
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                headers=server.headers, limits=self.limits, timeout=self.timeout, follow_redirects=True
+            )
+            self._clients[key] = client
+        return client
+
+    def factory(self, server: MCPServer):
+        """An httpx_client_factory for the SDK's transports, lending them the server's pooled client"""
+        def lend(headers=None, timeout=None, auth=None) -> _Lent:
+            # the transports pass their protocol headers with every request, the
+            # server's headers are on the client
+            return _Lent(_LentClient(self.client(server), timeout, auth))
+
+        return lend
+
+    async def close(self) -> None:
+        await asyncio.gather(*(client.aclose() for client in self._clients.values()))
+        self._clients.clear()
@@ -1,15 +1,45 @@
 import json
+import os
 from pathlib import Path
 from typing import List, Dict, Optional
 
+# "type" in mcp.json, by transport
+HTTP_TYPES = {"http", "streamable-http", "streamable_http", "streamableHttp"}
+SSE_TYPES = {"sse"}
+
 class MCPServer:
-    def __init__(self, name: str, type_: str, command: str, args: List[str]):
+    def __init__(
+        self,
+        name: str,
+        type_: str,
+        command: Optional[str],
+        args: List[str],
+        url: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+        call_timeout: Optional[float] = None,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        max_concurrency: Optional[int] = None
+    ):
         self.name = name
         self.type = type_
         self.command = command
         self.args = args
+        # an "http" or "sse" server runs on its own, it's reached at url with these headers
+        self.url = url
+        self.headers = headers or {}
+        # seconds a tool call may take, MCP_CALL_TIMEOUT when unset, overridden per tool
+        self.call_timeout = call_timeout
+        self.tool_timeouts = tool_timeouts or {}
+        # calls in flight on the session at once, MCP_MAX_CONCURRENT_CALLS when unset
+        self.max_concurrency = max_concurrency
+
+    @property
+    def remote(self) -> bool:
+        return self.type != "stdio"
 
     def __repr__(self):
+        if self.remote:
+            return f"<MCPServer name={self.name}, type={self.type}, url={self.url}>"
         return f"<MCPServer name={self.name}, type={self.type}, command={self.command}, args={self.args}>"
 
 class MCPConfig:
@@ -28,16 +58,33 @@ class MCPConfig:
         mcp_servers = raw_config.get("mcpServers", {})
         for name, info in mcp_servers.items():
             type_ = info.get("type")
-            if not (type_ == "stdio" or type_ is None):
-                # only handle stdio type
+            if type_ in HTTP_TYPES or type_ in SSE_TYPES or (type_ is None and "url" in info):
+                type_ = "sse" if type_ in SSE_TYPES else "http"
+                command, args = None, []
+                if not info.get("url"):
+                    raise ValueError(f"Invalid {type_} mcp server config for {name}: {info}, Please reset src/tools/mcp_client/mcp.json")
+            elif type_ == "stdio" or type_ is None:
+                type_ = "stdio"
+                command = info.get("command")
+                args = info.get("args", [])
+                if not command or not args:
+                    raise ValueError(f"Invalid stdio mcp server config for {name}: {info}, Please reset src/tools/mcp_client/mcp.json")
+            else:
+                # a transport we don't speak
                 continue
 
-            command = info.get("command")
-            args = info.get("args", [])
-            if not command or not args:
-                raise ValueError(f"Invalid stdio mcp server config for {name}: {info}, Please reset src/tools/mcp_client/mcp.json")
-
-            self.servers[name] = MCPServer(name=name, type_=type_, command=command, args=args)
+            self.servers[name] = MCPServer(
+                name=name,
+                type_=type_,
+                command=command,
+                args=args,
+                url=info.get("url"),
+                # "Bearer ${GITHUB_TOKEN}" keeps the secret out of mcp.json
+                headers={key: os.path.expandvars(str(value)) for key, value in info.get("headers", {}).items()},
+                call_timeout=info.get("timeout"),
+                tool_timeouts=info.get("toolTimeouts"),
+                max_concurrency=info.get("maxConcurrency"),
+            )
 
     def get_server(self, name: str) -> Optional[MCPServer]:
         return self.servers.get(name)
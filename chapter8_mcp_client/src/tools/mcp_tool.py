@@ -1,9 +1,14 @@
 import json
+from typing import TYPE_CHECKING, Union
 from tools.base_tool import BaseTool
 from mcp import ClientSession, Tool
 
+if TYPE_CHECKING:
+    from tools.mcp_client.connection import MCPServerConnection
+
 class McpTool(BaseTool):
-    def __init__(self, tool: Tool, session: ClientSession):
+    def __init__(self, tool: Tool, session: Union[ClientSession, "MCPServerConnection"]):
+        """session: the server's session, or its MCPServerConnection, which starts the server on the first call"""
         super().__init__()
         self.session = session
         self.tool = tool
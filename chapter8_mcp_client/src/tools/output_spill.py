@@ -0,0 +1,111 @@
+import atexit
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+class OutputSpillStore:
+    """
+    Caps the size of tool output kept in the conversation history.
+
+    Output over the budget keeps a head and a tail excerpt inline, the full text is
+    written to the session spill directory, from where the read_tool_output tool can
+    fetch line or byte ranges on demand.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not self._initialized:
+            self.max_chars = int(os.getenv("TOOL_OUTPUT_MAX_CHARS", 30000))
+            spill_dir = os.getenv("TOOL_OUTPUT_SPILL_DIR")
+            if spill_dir:
+                self._spill_dir = Path(spill_dir).expanduser() / f"session-{os.getpid()}"
+            else:
+                # without a configured directory, spills live as long as the session
+                self._spill_dir = Path(tempfile.mkdtemp(prefix="quickstar-spill-"))
+                atexit.register(shutil.rmtree, self._spill_dir, ignore_errors=True)
+            self._spills = {}
+            self._initialized = True
+
+    def cap(self, tool_name: str, content: str) -> str:
+        """Return content unchanged if it fits the budget, else spill it and return excerpts."""
+        if self.max_chars <= 0 or len(content) <= self.max_chars:
+            return content
+
+        spill_id = f"{tool_name}-{len(self._spills) + 1}"
+        path = self._spill_dir / f"{spill_id}.txt"
+        self._spill_dir.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+        self._spills[spill_id] = path
+
+        total_lines = content.count("\n") + 1
+        head = self._cut_at_line(content[:self.max_chars * 3 // 5], keep_start=True)
+        tail = self._cut_at_line(content[-(self.max_chars * 2 // 5):], keep_start=False)
+        head_lines = len(head.splitlines())
+        tail_lines = len(tail.splitlines())
+        notice = (
+            f"[Output truncated: {len(content)} chars, {total_lines} lines. "
+            f"Showing lines 1-{head_lines} and the last {tail_lines} lines. "
+            f"Full output saved with spill_id \"{spill_id}\", use read_tool_output to fetch other line or byte ranges.]"
+        )
+        return f"{head.rstrip()}\n{notice}\n{tail}"
+
+    def read(
+        self,
+        spill_id: str,
+        start_line: Optional[int] = None,
+        end_line: Optional[int] = None,
+        byte_offset: Optional[int] = None,
+        byte_length: Optional[int] = None
+    ) -> str:
+        """Read a line range (1-based, inclusive) or a byte range of a spilled output."""
+        path = self._spills.get(spill_id)
+        if path is None or not path.exists():
+            return f"Unknown spill_id: {spill_id}"
+
+        if byte_offset is not None or byte_length is not None:
+            offset = max(byte_offset or 0, 0)
+            length = min(byte_length or self.max_chars, self.max_chars)
+            with path.open("rb") as f:
+                f.seek(offset)
+                data = f.read(length)
+            size = path.stat().st_size
+            text = data.decode("utf-8", errors="replace")
+            return f"[bytes {offset}-{offset + len(data)} of {size}]\n{text}"
+
+        lines = path.read_text(encoding="utf-8").split("\n")
+        start = max(start_line or 1, 1)
+        end = min(end_line or len(lines), len(lines))
+        if start > end:
+            return f"Invalid line range {start}-{end}, output has {len(lines)} lines"
+
+        selected = []
+        size = 0
+        for number in range(start, end + 1):
+            size += len(lines[number - 1]) + 1
+            if size > self.max_chars and selected:
+                end = number - 1
+                break
+            selected.append(lines[number - 1])
+        return f"[lines {start}-{end} of {len(lines)}]\n" + "\n".join(selected)
+
+    @staticmethod
+    def _cut_at_line(text: str, keep_start: bool) -> str:
+        """Trim a partial line off the cut side of an excerpt, if that leaves anything."""
+        if keep_start:
+            newline = text.rfind("\n")
+            return text[:newline + 1] if newline > 0 else text
+        newline = text.find("\n")
+        return text[newline + 1:] if 0 <= newline < len(text) - 1 else text
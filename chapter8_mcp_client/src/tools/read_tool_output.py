@@ -0,0 +1,80 @@
+from tools.base_tool import BaseTool
+from tools.output_spill import OutputSpillStore
+
+
+class ReadToolOutput(BaseTool):
+    def __init__(self):
+        super().__init__()
+        self._spill_store = OutputSpillStore()
+
+    @staticmethod
+    def get_tool_name():
+        return "read_tool_output"
+
+    @staticmethod
+    def is_replayable():
+        # reads the spill store, which a replay fills again from the replayed outputs
+        return False
+
+    async def act(self, spill_id="", start_line=None, end_line=None, byte_offset=None, byte_length=None):
+        if not spill_id:
+            return "No spill_id provided"
+        try:
+            return self._spill_store.read(spill_id, start_line, end_line, byte_offset, byte_length)
+        except Exception as e:
+            return f"read_tool_output run Error: {e}"
+
+    def json_schema(self):
+        return {
+            "type": "function",
+            "function": {
+                "name": self.get_tool_name(),
+                "description": self._tool_description(),
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "spill_id": {
+                            "type": "string",
+                            "description": "The spill_id from a truncated tool output notice"
+                        },
+                        "start_line": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "description": "First line to read, 1-based"
+                        },
+                        "end_line": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "description": "Last line to read, inclusive"
+                        },
+                        "byte_offset": {
+                            "type": "integer",
+                            "minimum": 0,
+                            "description": "Read by bytes instead of lines, starting at this offset"
+                        },
+                        "byte_length": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "description": "Number of bytes to read from byte_offset"
+                        }
+                    },
+                    "required": ["spill_id"]
+                }
+            }
+        }
+
+    def get_status(self):
+        return ""
+
+    def _tool_description(self):
+        return """
+Read part of a tool output that was too large to keep in the conversation.
+
+When a tool output is over the size budget, only its head and tail are shown, followed by a notice like
+[Output truncated: ... Full output saved with spill_id "cmd_runner-1", use read_tool_output to fetch other line or byte ranges.]
+
+Usage notes:
+  - Pass the spill_id from the notice and either a line range (start_line, end_line) or a byte range (byte_offset, byte_length).
+  - Only read the ranges you actually need, a single read is capped at the same size budget.
+  - Prefer narrowing the original command (grep, head, sed -n) when you know what you are looking for.
+""".strip()
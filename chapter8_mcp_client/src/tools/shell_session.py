@@ -0,0 +1,180 @@
+import asyncio
+import codecs
+import os
+import shutil
+import signal
+import uuid
+from typing import Callable, Optional, Tuple
+
+
+class ShellSession:
+    """
+    A long-lived bash coprocess that keeps cwd and exported variables between commands.
+
+    Every command is framed with a random sentinel printed on stdout (followed by the
+    exit status and working directory) and on stderr, so the output of one command can
+    be told apart from the next. Commands run one at a time; if the shell dies or a
+    command times out, the shell is killed and started again on the next command.
+    """
+
+    def __init__(self, shell: str = "bash", cwd: Optional[str] = None):
+        self._shell = shell
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._lock = asyncio.Lock()
+        self.cwd = cwd or os.getcwd()
+        self._starts = 0
+
+    @staticmethod
+    def is_supported() -> bool:
+        return os.name == "posix" and shutil.which("bash") is not None
+
+    @property
+    def restarts(self) -> int:
+        return max(0, self._starts - 1)
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    async def run(
+        self,
+        command: str,
+        timeout: float,
+        on_output: Callable[[str, bool], None]
+    ) -> Tuple[int, str, str]:
+        """
+        Run a command in the shell.
+
+        Args:
+            command: Shell command to execute
+            timeout: Seconds to wait before the shell is killed
+            on_output: Called with (line, is_stderr) for every output line as it arrives
+
+        Returns:
+            Tuple of (exit code, stdout, stderr)
+
+        Raises:
+            asyncio.TimeoutError: The command did not finish in time, partial output is
+                available on the exception as `stdout` and `stderr`
+        """
+        async with self._lock:
+            if self._process is None or self._process.returncode is not None:
+                await self._start()
+
+            marker = f"__QUICKSTAR_{uuid.uuid4().hex}__"
+            self._process.stdin.write(self._frame(command, marker).encode())
+            await self._process.stdin.drain()
+
+            stdout = _FramedReader(self._process.stdout, marker, lambda line: on_output(line, False))
+            stderr = _FramedReader(self._process.stderr, marker, lambda line: on_output(line, True))
+            try:
+                await asyncio.wait_for(asyncio.gather(stdout.read(), stderr.read()), timeout=timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                await self.close()
+                e.stdout, e.stderr = stdout.output, stderr.output
+                raise
+
+            if stdout.trailer is None:
+                # the command ended the shell itself, e.g. `exit 1`
+                returncode = await self._process.wait()
+                self._process = None
+                return returncode, stdout.output, stderr.output
+
+            status, _, cwd = stdout.trailer.partition(" ")
+            self.cwd = cwd or self.cwd
+            return int(status), stdout.output, stderr.output
+
+    async def close(self) -> None:
+        """Kill the shell and everything it started."""
+        process, self._process = self._process, None
+        if process is None or process.returncode is not None:
+            return
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await process.wait()
+
+    async def _start(self) -> None:
+        self._starts += 1
+        cwd = self.cwd if os.path.isdir(self.cwd) else None
+        self._process = await asyncio.create_subprocess_exec(
+            self._shell, "--noprofile", "--norc",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
+            start_new_session=True
+        )
+
+    @staticmethod
+    def _frame(command: str, marker: str) -> str:
+        # eval keeps a syntax error in the command from swallowing the sentinel lines,
+        # and stdin is detached so the command can't read the rest of our script
+        quoted = "'" + command.replace("'", "'\\''") + "'"
+        return (
+            f"eval {quoted} < /dev/null\n"
+            f"__quickstar_status=$?\n"
+            f"printf '\\n%s %s %s\\n' '{marker}' \"$__quickstar_status\" \"$PWD\"\n"
+            f"printf '\\n%s\\n' '{marker}' >&2\n"
+        )
+
+
+class _FramedReader:
+    """Reads one command's output from a shell pipe, up to the sentinel line."""
+
+    def __init__(self, stream, marker: str, on_line: Callable[[str], None]):
+        self._stream = stream
+        self._marker = "\n" + marker
+        self._on_line = on_line
+        self._buffer = ""
+        self._forwarded = 0
+        self._output: Optional[str] = None
+        self.trailer: Optional[str] = None
+
+    @property
+    def output(self) -> str:
+        """The command output, or everything read so far if the sentinel hasn't arrived."""
+        return self._buffer if self._output is None else self._output
+
+    async def read(self) -> None:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            data = await self._stream.read(65536)
+            self._buffer += decoder.decode(data, final=not data)
+            if self._scan():
+                return
+            if not data:
+                # pipe closed without a sentinel, the shell is gone
+                if self._forwarded < len(self._buffer):
+                    self._on_line(self._buffer[self._forwarded:])
+                return
+
+    def _scan(self) -> bool:
+        """Forward complete lines, return True once the sentinel line was read."""
+        # the newline in front of the sentinel may already have ended a forwarded line
+        marker_at = self._buffer.find(self._marker, max(self._forwarded - 1, 0))
+        if marker_at != -1:
+            trailer_end = self._buffer.find("\n", marker_at + len(self._marker))
+            if trailer_end == -1:
+                return False
+            remaining = self._buffer[self._forwarded:marker_at].split("\n")
+            if remaining[-1] == "":
+                remaining.pop()
+            for line in remaining:
+                self._on_line(line)
+            self._forwarded = marker_at
+            self._output = self._buffer[:marker_at]
+            self.trailer = self._buffer[marker_at + len(self._marker):trailer_end].strip()
+            return True
+
+        while True:
+            newline = self._buffer.find("\n", self._forwarded)
+            if newline == -1:
+                return False
+            line = self._buffer[self._forwarded:newline]
+            if not line and self._marker.startswith(self._buffer[newline:]):
+                # may be the newline printed in front of the sentinel, wait for more data
+                return False
+            self._on_line(line)
+            self._forwarded = newline + 1
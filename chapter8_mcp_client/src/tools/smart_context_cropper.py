@@ -5,12 +5,27 @@ from tools.base_tool import BaseTool
 class SmartContextCropper(BaseTool):
     def __init__(self):
         super().__init__()
-        self._history_manager = HistoryManager()
+
+    @property
+    def _history_manager(self) -> HistoryManager:
+        # the history of the conversation calling the tool, a sub-agent crops its own
+        from core.conversation import Conversation
+        return Conversation.current().history_manager
 
     @staticmethod
     def get_tool_name():
         return "smart_context_cropper"
 
+    @staticmethod
+    def is_concurrency_safe():
+        # rewrites the history other tool results are appended to
+        return False
+
+    @staticmethod
+    def is_replayable():
+        # the crop itself has to happen for the replayed history to match
+        return False
+
     async def act(self, crop_direction: Crop_Direction, crop_amount: int, deleted_messages_summary: str):
         try:
             if (crop_amount <= 0):
@@ -6,30 +6,36 @@ from ui.ui_manager import UIManager
 class Task(BaseTool):
     def __init__(self):
         super().__init__()
-        self.todos = []
         self._ui_manager = UIManager()
-        self._has_initialized_task = False
         self._subagent_manager = SubagentManager()
 
     @staticmethod
     def get_tool_name():
         return "task"
 
+    @staticmethod
+    def is_concurrency_safe():
+        # every sub-agent runs in a conversation of its own
+        return True
+
+    @staticmethod
+    def is_replayable():
+        # the sub-agent's own model turns are on the cassette and replay through it
+        return False
+
     async def act(self, description, prompt, subagent_type):
         if len(prompt) == 0:
             return "Prompt is empty"
         if len(subagent_type) == 0:
             return "Subagent type is empty"
-        self._has_initialized_task = True
-
         from core.conversation import Conversation
-        conversation = Conversation()
+        conversation = Conversation.current()
 
         self._ui_manager.print_info(f"Submitting task to {subagent_type} sub-agent: {description}\n Prompt: {prompt}")
         subagent_system_prompt = self._subagent_manager.get_subagent_prompt(subagent_type)
-        response = await conversation.start_task(task_system_prompt=subagent_system_prompt, user_input=prompt)
-
-        self._has_initialized_task = False
+        response = await conversation.start_task(
+            task_system_prompt=subagent_system_prompt, user_input=prompt, description=description
+        )
         return f"Task Finished with response: {response}"
 
     def json_schema(self):
@@ -5,9 +5,14 @@ from ui.ui_manager import UIManager
 class TodoWrite(BaseTool):
     def __init__(self):
         super().__init__()
-        self.todos = []
         self._ui_manager = UIManager()
 
+    @property
+    def todos(self):
+        # the todos of the conversation calling the tool, each sub-agent keeps its own
+        from core.conversation import Conversation
+        return Conversation.current().todos
+
     @staticmethod
     def get_tool_name():
         return "todo_write"
@@ -32,7 +37,8 @@ class TodoWrite(BaseTool):
             if todo['status'] not in ['pending', 'in_progress', 'completed']:
                 return f"Error: todo item {i} has invalid status '{todo['status']}'. Must be one of: pending, in_progress, completed. todos = {todos}"
         
-        self.todos = todos
+        from core.conversation import Conversation
+        Conversation.current().todos = todos
         
         # Display the updated todos using UI manager
         self._ui_manager.display_todos(todos)
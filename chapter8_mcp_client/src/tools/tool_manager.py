@@ -1,15 +1,23 @@
 import asyncio
+import os
 from tools.cmd_runner import CmdRunner
 from tools.mcp_tool import McpTool
+from tools.read_tool_output import ReadToolOutput
 from tools.smart_context_cropper import SmartContextCropper
 from tools.task import Task
 from tools.todo_write import TodoWrite
+from tools.tool_manifest import ToolManifest
+from tools.tool_search import ToolSearch
+from tools.tool_selector import ToolSelector
+from core.history.history_manager import HistoryManager
 from .mcp_client.client import MCPClient
 
 class ToolManager:
     _instance = None
     _initialized = False
     _mcp_client = None
+    # the first requests wait for MCP servers still starting until then, later ones don't
+    _startup_deadline = 0.0
     
     def __new__(cls):
         if cls._instance is None:
@@ -20,33 +28,133 @@ class ToolManager:
     def __init__(self):
         if not self._initialized:
             self.tools = {}
+            # compiled on first use, dropped whenever the registered tools change
+            self._manifest = None
+            self._subset_manifests = {}
+            self._selector = ToolSelector()
             # Important tools should be placed lower, as this affects their position in the prompt.
             self.register_mcp_task = asyncio.create_task(self._register_mcp_tool())
+            self._startup_deadline = asyncio.get_running_loop().time() + float(os.getenv("MCP_STARTUP_WAIT", 3))
             self._register_tool(SmartContextCropper.get_tool_name(), SmartContextCropper())
+            self._register_tool(ToolSearch.get_tool_name(), ToolSearch())
+            self._register_tool(ReadToolOutput.get_tool_name(), ReadToolOutput())
             self._register_tool(TodoWrite.get_tool_name(), TodoWrite()) 
             self._register_tool(Task.get_tool_name(), Task())
             self._register_tool(CmdRunner.get_tool_name(), CmdRunner())   
             ToolManager._initialized = True
 
     async def _register_mcp_tool(self):
-        sessions = await self._mcp_client.get_sessions()
-        for session in sessions:
-            response = await session.list_tools()
-            tools = response.tools
-            for tool in tools:
-                mcp_tool = McpTool(tool, session)
-                self._register_tool(tool.name, mcp_tool)
+        """Register the tools of every MCP server as soon as they are known, see MCPClient"""
+        self._mcp_client.add_tools_changed_handler(self._refresh_mcp_tools)
+        async for server, tools in self._mcp_client.ready_servers():
+            self._register_mcp_tools(server, tools)
 
+    async def _list_mcp_tools(self, session):
+        response = await session.list_tools()
+        self._register_mcp_tools(session, response.tools)
+
+    def _register_mcp_tools(self, session, tools):
+        for tool in tools:
+            mcp_tool = McpTool(tool, session)
+            self._register_tool(tool.name, mcp_tool)
+
+    async def _refresh_mcp_tools(self, session):
+        """An MCP server sent tools/list_changed, list its tools again"""
+        for name in [name for name, tool in self.tools.items() if getattr(tool, "session", None) is session]:
+            self._unregister_tool(name)
+        await self._list_mcp_tools(session)
 
     def _register_tool(self, name, tool_instance):
         self.tools[name] = tool_instance
+        self._manifest = None
+        self._subset_manifests = {}
+
+    def _unregister_tool(self, name):
+        if self.tools.pop(name, None) is not None:
+            self._manifest = None
+            self._subset_manifests = {}
+
+    @property
+    def full_manifest(self) -> ToolManifest:
+        """every tool, except tool_search which only matters for subsets"""
+        if self._manifest is None:
+            self._manifest = ToolManifest.compile(
+                {name: tool for name, tool in self.tools.items() if name != ToolSearch.get_tool_name()}
+            )
+        return self._manifest
+
+    async def get_tool_manifest(self, messages=None, loaded=()) -> ToolManifest:
+        """
+        The tools to send with a request. Given the current session's messages and the
+        tools it loaded through tool_search, only a relevant subset once there are many
+        MCP tools (see ToolSelector).
+        """
+        await self._wait_for_mcp_startup()
+        selectable = self._selectable_tools()
+        if messages is None or not self._selector.is_active(selectable):
+            return self.full_manifest
+
+        query, used = self._session_context(messages)
+        pinned = [name for name in self.tools if name not in selectable]
+        chosen = self._selector.select(pinned, selectable, query, used, loaded)
+        names = tuple(name for name in self.tools if name in chosen)
+        manifest = self._subset_manifests.get(names)
+        if manifest is None:
+            manifest = ToolManifest.compile({name: self.tools[name] for name in names})
+            self._subset_manifests[names] = manifest
+        return manifest
+
+    async def _wait_for_mcp_startup(self):
+        """Give MCP servers still starting until the startup deadline, their tools are added when ready"""
+        if self.register_mcp_task.done():
+            return
+        remaining = self._startup_deadline - asyncio.get_running_loop().time()
+        if remaining > 0:
+            await asyncio.wait({self.register_mcp_task}, timeout=remaining)
 
     async def get_tools_description(self):
-        await self.register_mcp_task
-        descriptions = []
-        for tool_name, tool_instance in self.tools.items():
-            descriptions.append(tool_instance.json_schema())
-        return descriptions
+        manifest = await self.get_tool_manifest()
+        return list(manifest.schemas)
+
+    def search_tools(self, query, limit):
+        """MCP tools matching the query, best first"""
+        return self._selector.search(self._selectable_tools(), query, limit)
+
+    def deferred_tool_names(self, loaded=()):
+        return [name for name in self._selectable_tools() if name not in loaded]
+
+    def get_tool_description(self, tool_name):
+        tool = self.tools.get(tool_name)
+        if tool:
+            return tool.json_schema()["function"].get("description", "")
+        return None
+
+    def _selectable_tools(self):
+        """descriptions of the tools that may be left out of a request, the MCP tools"""
+        return {
+            name: tool.tool.description or ""
+            for name, tool in self.tools.items()
+            if isinstance(tool, McpTool)
+        }
+
+    @staticmethod
+    def _session_context(messages):
+        """the latest user input and the tools called so far in the session"""
+        query = ""
+        used = set()
+        for message in messages:
+            role = HistoryManager._role(message)
+            if role == "assistant":
+                tool_calls = message["tool_calls"] if isinstance(message, dict) else message.tool_calls
+                for tool_call in tool_calls or ():
+                    function = tool_call["function"] if isinstance(tool_call, dict) else tool_call.function
+                    used.add(function["name"] if isinstance(function, dict) else function.name)
+            elif role == "user" and HistoryManager._is_user_input(message):
+                content = message["content"] if isinstance(message, dict) else message.content
+                if isinstance(content, (list, tuple)):
+                    content = " ".join(block.get("text", "") for block in content if isinstance(block, dict))
+                query = content or ""
+        return query, used
     
     # TODO：Array out of bounds should directly throw exception again
     async def run_tool(self, tool_name, **kwargs):
@@ -58,6 +166,18 @@ class ToolManager:
             return f"Error occurred while running tool '{tool_name}': {str(e)}"
         return "Tool not found"
 
+    def is_concurrency_safe(self, tool_name):
+        tool = self.tools.get(tool_name)
+        if tool:
+            return tool.is_concurrency_safe()
+        return True
+
+    def is_replayable(self, tool_name):
+        tool = self.tools.get(tool_name)
+        if tool:
+            return tool.is_replayable()
+        return True
+
     def get_tool_status(self, tool_name):
         tool = self.tools.get(tool_name)
         if tool:
@@ -0,0 +1,45 @@
+"""
+Compiled tool schemas.
+
+Building every tool's json_schema() means rebuilding dicts around description
+strings of several kilobytes, and the result doesn't change between turns. A
+ToolManifest is built once from the registered tools and stays valid until a
+tool is registered or removed. It holds:
+- the frozen schemas, so a request can't change the cached copy
+- their JSON serialization
+- a hash of that serialization. The tool schemas open the prompt prefix, so a
+  changed hash means the provider's prompt cache starts over
+- an estimate of the prompt tokens the schemas cost
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+from core.history.message_store import freeze
+from core.history.token_estimator import TokenEstimator
+
+
+@dataclass(frozen=True)
+class ToolManifest:
+    schemas: Tuple[Any, ...]
+    names: Tuple[str, ...]
+    serialized: str
+    hash: str
+    tokens: int
+
+    @classmethod
+    def compile(cls, tools: Dict[str, Any]) -> "ToolManifest":
+        """Build the manifest of the tools, in registration order"""
+        schemas = tuple(freeze(tool.json_schema()) for tool in tools.values())
+        serialized = json.dumps(schemas, ensure_ascii=False, separators=(",", ":"))
+        return cls(
+            schemas=schemas,
+            names=tuple(tools),
+            serialized=serialized,
+            hash=hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:16],
+            tokens=round(TokenEstimator().count_text(serialized)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.schemas)
@@ -0,0 +1,65 @@
+from tools.base_tool import BaseTool
+
+
+class ToolSearch(BaseTool):
+    MAX_RESULTS = 5
+    DESCRIPTION_CHARS = 300
+
+    def __init__(self):
+        super().__init__()
+
+    @staticmethod
+    def get_tool_name():
+        return "tool_search"
+
+    async def act(self, query=""):
+        if not query:
+            return "No query provided"
+        from core.conversation import Conversation
+        from tools.tool_manager import ToolManager
+        tool_manager = ToolManager()
+        # loaded for the conversation calling the tool, a sub-agent's loads stay its own
+        loaded = Conversation.current().loaded_tools
+
+        names = tool_manager.search_tools(query, self.MAX_RESULTS)
+        if not names:
+            available = ", ".join(tool_manager.deferred_tool_names(loaded)[:50])
+            return f"No tools match '{query}'. Tools that can be loaded: {available or 'none'}"
+
+        loaded.update(names)
+        lines = [f"Loaded {len(names)} tools, call them directly from now on:"]
+        for name in names:
+            description = " ".join((tool_manager.get_tool_description(name) or "").split())
+            if len(description) > self.DESCRIPTION_CHARS:
+                description = description[:self.DESCRIPTION_CHARS] + "..."
+            lines.append(f"- {name}: {description}")
+        return "\n".join(lines)
+
+    def json_schema(self):
+        return {
+            "type": "function",
+            "function": {
+                "name": self.get_tool_name(),
+                "description": self._tool_description(),
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "query": {
+                            "type": "string",
+                            "description": "Keywords describing the capability you need, e.g. 'create github issue'"
+                        }
+                    },
+                    "required": ["query"]
+                }
+            }
+        }
+
+    def get_status(self):
+        return ""
+
+    def _tool_description(self):
+        return """
+Search the tools of the connected MCP servers that are not offered yet, and load the best matches.
+
+Only the tools most relevant to the user's request are offered to you. When you need a capability that none of your tools provides (an external service, a database, a browser, ...), search for it here first. Loaded tools can be called directly from the next turn on.
+"""
@@ -0,0 +1,133 @@
+"""
+Relevance-based tool subsetting.
+
+With many MCP servers connected, the tool schemas alone cost thousands of
+prompt tokens per request. Once there are more MCP tools than TOOL_SUBSET_TOP_K,
+a request only carries:
+- the built-in tools and tool_search, always
+- the MCP tools already called in the current session
+- the MCP tools loaded through tool_search
+- the TOOL_SUBSET_TOP_K MCP tools whose names and descriptions best match the
+  latest user input (BM25 over a local index)
+
+The subset only changes with a new user input or a tool_search call. Every
+change starts a new prompt cache prefix, so it shouldn't shift from turn to turn.
+TOOL_SUBSET=off always sends every tool, on subsets whatever the tool count.
+"""
+
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+_WORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words of the text, snake_case and camelCase split, trailing plural s dropped"""
+    words = []
+    for word in _WORD.findall(text or ""):
+        word = word.lower()
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        if len(word) > 1:
+            words.append(word)
+    return words
+
+
+class LexicalIndex:
+    """BM25 over short documents, the tool name counts double"""
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, documents: Dict[str, str]):
+        self._terms = {name: Counter(tokenize(name) * 2 + tokenize(text)) for name, text in documents.items()}
+        self._lengths = {name: sum(terms.values()) for name, terms in self._terms.items()}
+        self._average_length = sum(self._lengths.values()) / len(self._lengths) if self._lengths else 0.0
+        document_frequency = Counter(term for terms in self._terms.values() for term in terms)
+        count = len(self._terms)
+        self._idf = {
+            term: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def search(self, query: str, limit: int) -> List[str]:
+        """Names of the best matching documents, best first, only those matching at all"""
+        query_terms = set(tokenize(query)) & self._idf.keys()
+        scores = []
+        for name, terms in self._terms.items():
+            score = 0.0
+            for term in query_terms:
+                frequency = terms.get(term)
+                if frequency:
+                    norm = self.K1 * (1 - self.B + self.B * self._lengths[name] / (self._average_length or 1))
+                    score += self._idf[term] * frequency * (self.K1 + 1) / (frequency + norm)
+            if score > 0:
+                scores.append((score, name))
+        scores.sort(key=lambda item: (-item[0], item[1]))
+        return [name for _, name in scores[:limit]]
+
+
+class ToolSelector:
+    """
+    Picks the tools sent with a request, see the module docstring.
+
+    Args:
+        top_k: MCP tools picked by relevance to the latest user input
+        mode: "auto" subsets once there are more MCP tools than top_k, "on"
+            always, "off" never
+    """
+
+    def __init__(self, top_k: Optional[int] = None, mode: Optional[str] = None):
+        self.top_k = int(os.getenv("TOOL_SUBSET_TOP_K", 8)) if top_k is None else top_k
+        self.mode = (os.getenv("TOOL_SUBSET", "auto") if mode is None else mode).lower()
+        self._index: Optional[LexicalIndex] = None
+        self._indexed: tuple = ()
+        self._last_query: Optional[str] = None
+        self._last_matches: List[str] = []
+
+    def is_active(self, selectable: Sequence[str]) -> bool:
+        if self.mode == "off":
+            return False
+        return self.mode == "on" or len(selectable) > self.top_k
+
+    def select(
+        self, pinned: Sequence[str], selectable: Dict[str, str], query: str, used: Iterable[str], loaded: Iterable[str] = ()
+    ) -> Set[str]:
+        """
+        Names of the tools to send.
+
+        Args:
+            pinned: Tools that are always sent
+            selectable: Description of every tool that may be left out, by name
+            query: The latest user input
+            used: Tools called in the current session
+            loaded: Tools loaded through tool_search in the current session
+        """
+        matches = self._matches(selectable, query)
+        chosen = set(pinned) | set(matches)
+        chosen.update(name for name in used if name in selectable)
+        chosen.update(name for name in loaded if name in selectable)
+        return chosen
+
+    def search(self, selectable: Dict[str, str], query: str, limit: int) -> List[str]:
+        return self._index_for(selectable).search(query, limit)
+
+    def _matches(self, selectable: Dict[str, str], query: str) -> List[str]:
+        # recomputed only when the user said something new
+        if query != self._last_query or tuple(selectable) != self._indexed:
+            self._last_matches = self._index_for(selectable).search(query, self.top_k)
+            self._last_query = query
+        return self._last_matches
+
+    def _index_for(self, selectable: Dict[str, str]) -> LexicalIndex:
+        if self._index is None or tuple(selectable) != self._indexed:
+            self._index = LexicalIndex(selectable)
+            self._indexed = tuple(selectable)
+        return self._index
@@ -2,10 +2,11 @@
 Display management functionality for outputting content to users.
 """
 
-from rich.console import Console
+from rich.console import Console, Group, RenderableType
 from rich.markdown import Markdown
 from rich.live import Live
 from typing import Optional
+from .stream_renderer import MarkdownBlockSplitter
 
 
 class DisplayManager:
@@ -21,6 +22,9 @@ class DisplayManager:
         self._console = console or Console()
         self._live: Optional[Live] = None
         self._stream_buffer: str = ""
+        self._block_splitter = MarkdownBlockSplitter()
+        self._open_block_render = None
+        self._blocks_printed = 0
     
     def print_assistant_message(self, content: str, emoji: str = "🤖") -> None:
         """
@@ -57,7 +61,13 @@ class DisplayManager:
             refresh_rate: Refresh rate per second for live display
         """
         self._stream_buffer = ""
-        self._live = Live(console=self._console, refresh_per_second=refresh_rate)
+        self._block_splitter.reset()
+        self._blocks_printed = 0
+        self._live = Live(
+            console=self._console,
+            refresh_per_second=refresh_rate,
+            get_renderable=self._render_open_block
+        )
         self._live.start()
     
     def stop_stream_display(self) -> None:
@@ -65,10 +75,15 @@ class DisplayManager:
         if self._live:
             self._live.stop()
             self._live = None
+        self._open_block_render = None
     
     def print_streaming_content(self, chunk: str) -> None:
         """
         Print streaming content chunk.
+
+        Finished Markdown blocks are printed once above the live area and frozen,
+        only the trailing open block is re-rendered, at the live refresh rate. Blocks
+        are separated by one blank line, as in a render of the whole text.
         
         Args:
             chunk: Content chunk to append and display
@@ -77,8 +92,24 @@ class DisplayManager:
             self._stream_buffer = ""
         
         self._stream_buffer += chunk
+        finished_blocks = self._block_splitter.feed(chunk)
         if self._live:
-            self._live.update(Markdown(self._stream_buffer))
+            for block in finished_blocks:
+                if self._blocks_printed:
+                    self._live.console.print()
+                self._live.console.print(Markdown(block))
+                self._blocks_printed += 1
+
+    def _render_open_block(self) -> RenderableType:
+        """Render the trailing open block, reusing the last render while it is unchanged."""
+        tail = self._block_splitter.tail
+        key = (tail, self._blocks_printed > 0)
+        if self._open_block_render is None or self._open_block_render[0] != key:
+            render = Markdown(tail)
+            if self._blocks_printed and tail.strip():
+                render = Group("", render)
+            self._open_block_render = (key, render)
+        return self._open_block_render[1]
     
     def get_stream_buffer(self) -> str:
         """Get the current stream buffer content."""
@@ -87,6 +118,17 @@ class DisplayManager:
     def clear_stream_buffer(self) -> None:
         """Clear the stream buffer."""
         self._stream_buffer = ""
+        self._block_splitter.reset()
+    
+    def print_tool_output(self, line: str, is_stderr: bool = False) -> None:
+        """
+        Print one line of live tool output.
+        
+        Args:
+            line: Output line without trailing newline
+            is_stderr: Whether the line came from stderr
+        """
+        self._console.print(f"│ {line}", style="red" if is_stderr else "dim", markup=False, highlight=False)
     
     def print_error(self, error_message: str, emoji: str = "❌") -> None:
         """
@@ -0,0 +1,111 @@
+"""
+Incremental block splitting for streamed Markdown.
+"""
+
+import re
+from typing import List
+
+
+_FENCE_PATTERN = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_LIST_ITEM_PATTERN = re.compile(r"^ {0,3}([-*+]|\d{1,9}[.)])(\s|$)")
+
+
+class MarkdownBlockSplitter:
+    """
+    Splits streamed Markdown into finished blocks and one trailing open block.
+
+    A block is finished once it can no longer change: a paragraph (or list, table,
+    heading...) followed by a blank line and a line that starts something new, or a
+    fenced code block whose closing fence has arrived. An indented line or a list
+    item after the blank line continues the block, so a loose list and the
+    paragraphs of its items stay one block. Finished blocks can be rendered once
+    and frozen, only the open block needs to be re-rendered when new chunks arrive.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all buffered content."""
+        self._block_lines: List[str] = []
+        self._partial_line = ""
+        self._blank_lines = 0
+        self._fence = None
+        self._fence_is_block = False
+
+    @property
+    def tail(self) -> str:
+        """The trailing block that is still open, including an incomplete last line."""
+        lines = self._block_lines
+        if self._partial_line:
+            lines = lines + [""] * self._blank_lines + [self._partial_line]
+        return "\n".join(lines)
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Add a streamed chunk.
+
+        Args:
+            chunk: Content chunk to append
+
+        Returns:
+            Blocks that became finished with this chunk, in order
+        """
+        finished = []
+        lines = (self._partial_line + chunk).split("\n")
+        self._partial_line = lines.pop()
+
+        for line in lines:
+            block = self._add_line(line)
+            if block is not None:
+                finished.append(block)
+
+        # a line after a blank line that can't be indented or a list item starts a new
+        # block, there's no need to wait for its end
+        if self._blank_lines and self._partial_line and self._partial_line[0] not in " \t-*+0123456789":
+            finished.append(self._take_block())
+        return finished
+
+    def _add_line(self, line: str):
+        if self._fence is not None:
+            self._block_lines.append(line)
+            stripped = line.strip()
+            if stripped.startswith(self._fence) and not stripped.lstrip(self._fence[0]):
+                self._fence = None
+                if self._fence_is_block:
+                    return self._take_block()
+            return None
+
+        if not line.strip():
+            if self._block_lines:
+                self._blank_lines += 1
+            return None
+
+        block = None
+        if self._blank_lines:
+            if line[0] in " \t" or _LIST_ITEM_PATTERN.match(line):
+                # the next paragraph of a list item, or the next item of a loose list
+                self._block_lines.extend([""] * self._blank_lines)
+                self._blank_lines = 0
+            else:
+                block = self._take_block()
+
+        fence_match = _FENCE_PATTERN.match(line)
+        if fence_match:
+            # A fence interrupts a paragraph, so the paragraph before it is finished,
+            # unless the fence is part of a list item
+            self._fence_is_block = not self._block_lines or not line[0].isspace()
+            if self._fence_is_block:
+                block = self._take_block() or block
+            self._fence = fence_match.group(1)
+
+        self._block_lines.append(line)
+        return block
+
+    def _take_block(self):
+        if not self._block_lines:
+            return None
+        block = "\n".join(self._block_lines)
+        self._block_lines = []
+        self._blank_lines = 0
+        return block
@@ -70,6 +70,10 @@ class UIManager:
         """Print info message."""
         self.display_manager.print_info(info_message, emoji)
     
+    def print_tool_output(self, line: str, is_stderr: bool = False) -> None:
+        """Print one line of live tool output."""
+        self.display_manager.print_tool_output(line, is_stderr)
+    
     # Streaming methods
     def start_stream_display(self, refresh_rate: int = 10) -> None:
         """Start streaming display mode."""
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Soak test of the agent loop: 5,000 mocked turns must neither hit the recursion
+limit nor grow memory, once the history itself is kept bounded by compression
+"""
+import sys
+import os
+import asyncio
+import gc
+import json
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+import pytest
+from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageFunctionToolCall
+from openai.types.chat.chat_completion_message_function_tool_call import Function
+
+import core.conversation as conversation_module
+from core.cassette import Cassette
+from core.conversation import Conversation
+from core.history.history_manager import HistoryManager
+from core.telemetry import Telemetry
+from tools.output_spill import OutputSpillStore
+from tools.tool_manifest import ToolManifest
+
+TURNS = 5000
+USER_INPUT_EVERY = 10   # every 10th turn answers without tool calls and asks the user
+CONTENT = "lorem ipsum " * 170   # ~2 KB of streamed content per turn
+
+
+def rss_bytes():
+    """Resident set size from /proc, None where that isn't available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class SoakAPIClient:
+    """Streams a scripted response per turn, fails after the last turn to end the session"""
+
+    def __init__(self, turns):
+        self.turns = turns
+        self.turn = 0
+        self.rss = {}
+        self.total_cost = 0
+
+    async def get_completion_stream_async(self, request, timings=None, **scheduling):
+        self.turn += 1
+        if self.turn in (TURNS // 5, TURNS):
+            gc.collect()
+            self.rss[self.turn] = rss_bytes()
+        if self.turn > self.turns:
+            raise Exception("soak finished")
+
+        for start in range(0, len(CONTENT), 256):
+            await asyncio.sleep(0)
+            yield CONTENT[start:start + 256]
+
+        tool_calls = None
+        if self.turn % USER_INPUT_EVERY:
+            tool_calls = [ChatCompletionMessageFunctionToolCall(
+                id=f"call_{self.turn}",
+                type="function",
+                function=Function(name="echo", arguments=json.dumps({"turn": self.turn})),
+            )]
+        yield ChatCompletionMessage(role="assistant", content=CONTENT, tool_calls=tool_calls)
+
+
+class SoakToolManager:
+    manifest = full_manifest = ToolManifest.compile({})
+
+    async def get_tool_manifest(self, messages=None, loaded=()):
+        return self.manifest
+
+    async def get_tools_description(self):
+        return []
+
+    async def run_tool(self, tool_name, **kwargs):
+        return f"turn {kwargs['turn']} done"
+
+    def is_concurrency_safe(self, tool_name):
+        return True
+
+
+class SilentUIManager:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+    async def get_user_input(self):
+        return "continue"
+
+
+def setup_conversation(monkeypatch, api_client):
+    HistoryManager._instance = None
+    HistoryManager._initialized = False
+    monkeypatch.setattr(conversation_module, "get_reminder", lambda: "<reminder></reminder>")
+    monkeypatch.setattr(conversation_module.traceback, "print_exc", lambda: None)
+
+    history_manager = HistoryManager()
+    # a 20k context keeps the history bounded through compression
+    history_manager._model_max_tokens = 20 * 1024
+    history_manager._summarizer = None
+    history_manager._ui_manager = SilentUIManager()
+
+    conv = object.__new__(Conversation)
+    conv._initialized = True
+    conv._task_depth = 0
+    conv._api_client = api_client
+    conv._tool_manager = SoakToolManager()
+    conv._ui_manager = SilentUIManager()
+    conv._history_manager = history_manager
+    conv._tool_semaphore = asyncio.Semaphore(4)
+    conv._output_spill = OutputSpillStore()
+    conv._cassette = Cassette()
+    conv._telemetry = Telemetry()
+    return conv
+
+
+def test_agent_loop_soak(monkeypatch):
+    """5,000 turns run without recursion and with flat memory"""
+    print(f"🧪 Running {TURNS} mocked turns...")
+    api_client = SoakAPIClient(TURNS)
+    conv = setup_conversation(monkeypatch, api_client)
+
+    asyncio.run(conv._run_agent_loop())
+
+    assert api_client.turn == TURNS + 1
+    assert conv._history_manager.compression_stats.hard_limit_turns > 0
+
+    early, late = api_client.rss[TURNS // 5], api_client.rss[TURNS]
+    if early is not None:
+        growth = (late - early) / 1024 / 1024
+        print(f"RSS after {TURNS // 5} turns: {early / 1024 / 1024:.1f} MB, "
+              f"after {TURNS} turns: {late / 1024 / 1024:.1f} MB ({growth:+.1f} MB)")
+        assert growth < 8, f"memory grew by {growth:.1f} MB over {TURNS - TURNS // 5} turns"
+    print("✅ Soak test passed")
+
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_agent_loop_soak(monkeypatch)
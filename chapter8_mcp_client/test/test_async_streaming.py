@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test the AsyncOpenAI backed streaming path with a fake stream (no network needed)
+"""
+import sys
+import os
+import asyncio
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("OPENAI_BASE_URL", "http://127.0.0.1:1/v1")
+os.environ.setdefault("OPENAI_MODEL", "test-model")
+
+from openai.types.chat import ChatCompletionChunk
+from core.api_client import APIClient
+
+
+def make_chunk(delta=None, usage=None, finish_reason=None):
+    return ChatCompletionChunk.model_validate({
+        "id": "test",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "test-model",
+        "choices": [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        "usage": usage,
+    })
+
+
+class FakeAsyncStream:
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self._chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+
+def install_fake_stream(client, chunks):
+    captured = {}
+
+    async def create(**kwargs):
+        captured.update(kwargs)
+        return FakeAsyncStream(chunks)
+
+    client.async_client.chat.completions.create = create
+    return captured
+
+
+async def collect(client, request):
+    pieces, message = [], None
+    async for chunk in client.get_completion_stream_async(request):
+        if isinstance(chunk, str):
+            pieces.append(chunk)
+        else:
+            message = chunk
+    return pieces, message
+
+
+def test_async_stream_content_and_usage():
+    """Content chunks are yielded in order and the final message carries usage"""
+    print("🧪 Testing async streaming content...")
+    client = APIClient()
+    captured = install_fake_stream(client, [
+        make_chunk({"role": "assistant", "content": "Hello"}),
+        make_chunk({"content": " world"}),
+        make_chunk({}, finish_reason="stop"),
+        make_chunk(usage={"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12}),
+    ])
+
+    pieces, message = asyncio.run(collect(client, {"messages": []}))
+
+    assert pieces == ["Hello", " world"]
+    assert message.content == "Hello world"
+    assert message.tool_calls is None
+    assert message.usage.total_tokens == 12
+    assert captured["stream"] is True
+    assert captured["stream_options"] == {"include_usage": True}
+    print("✓ 通过: async stream content and usage collected")
+
+
+def test_async_stream_tool_calls():
+    """Tool call deltas split across chunks are merged into full tool calls"""
+    print("🧪 Testing async streaming tool calls...")
+    client = APIClient()
+    install_fake_stream(client, [
+        make_chunk({"tool_calls": [{"index": 0, "id": "call_1", "type": "function",
+                                    "function": {"name": "cmd_runner", "arguments": '{"comm'}}]}),
+        make_chunk({"tool_calls": [{"index": 0, "function": {"arguments": 'and": "ls"}'}}]}),
+        make_chunk({"tool_calls": [{"index": 1, "id": "call_2", "type": "function",
+                                    "function": {"name": "todo_write", "arguments": "{}"}}]}),
+        make_chunk({}, finish_reason="tool_calls"),
+    ])
+
+    pieces, message = asyncio.run(collect(client, {"messages": []}))
+
+    assert pieces == []
+    assert [tc.id for tc in message.tool_calls] == ["call_1", "call_2"]
+    assert message.tool_calls[0].function.name == "cmd_runner"
+    assert message.tool_calls[0].function.arguments == '{"command": "ls"}'
+    print("✓ 通过: tool call deltas merged")
+
+
+if __name__ == "__main__":
+    test_async_stream_content_and_usage()
+    test_async_stream_tool_calls()
@@ -0,0 +1,171 @@
+import asyncio
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.history.history_manager import HistoryManager, Role, Crop_Direction
+
+
+class MockTokenUsage:
+    def __init__(self, prompt, completion, total):
+        self.prompt_tokens = prompt
+        self.completion_tokens = completion
+        self.total_tokens = total
+
+
+class FakeSummarizer:
+    """Stands in for the summary model, optionally waits until released"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def summarize(self, messages):
+        self.calls.append(list(messages))
+        await self.release.wait()
+        return f"summary of {len(messages)} messages"
+
+
+def setup_history_manager():
+    """Setup a fresh HistoryManager with a 10k context, soft threshold 60%, hard 80%"""
+    HistoryManager._instance = None
+    HistoryManager._initialized = False
+    manager = HistoryManager(model_max_tokens=10, compress_threshold=0.8)
+    manager._soft_compress_threshold = 0.6
+    manager._summarizer = FakeSummarizer()
+    return manager
+
+
+def text_message(role: Role, text: str) -> dict:
+    return {"role": role, "content": [{"type": "text", "text": text}]}
+
+
+def fill_history(manager, turns=6):
+    manager.add_message(text_message(Role.SYSTEM, "System"))
+    for i in range(turns):
+        manager.add_message(text_message(Role.USER, f"Question {i}"))
+        manager.add_message({
+            "role": Role.ASSISTANT,
+            "content": "",
+            "tool_calls": [{"id": f"call_{i}", "type": "function", "function": {"name": "read_file", "arguments": "{}"}}],
+        })
+        manager.add_message({"role": Role.TOOL, "tool_call_id": f"call_{i}", "content": "o" * 5000})
+        manager.add_message(text_message(Role.ASSISTANT, f"Answer {i}"))
+
+
+def test_soft_threshold_summarizes_in_background():
+    """测试超过软阈值后在后台总结"""
+    print("测试: 软阈值触发后台总结")
+
+    async def run():
+        manager = setup_history_manager()
+        fill_history(manager)
+        before = manager.current_context_tokens
+        assert 0.6 * 10 * 1024 < before < 0.8 * 10 * 1024
+
+        original = list(manager.get_current_messages())
+        manager.auto_messages_compression()
+        # nothing is swapped synchronously, the turn is not stalled
+        assert manager.get_current_messages() == original
+        await manager._summary_task
+
+        messages = manager.get_current_messages()
+        summarized = manager._summarizer.calls[0]
+        assert messages[0]["role"] == Role.SYSTEM
+        assert "[Summary of the earlier conversation]" in messages[2]["content"][0]["text"]
+        # the latest summarized user request is kept verbatim in front of the summary
+        assert messages[1] is [m for m in summarized if m["role"] == Role.USER][-1]
+        assert len(messages) == len(original) - len(summarized) + 2
+        # tool results are never separated from their tool call
+        assert messages[3]["role"] in (Role.USER, Role.ASSISTANT)
+
+        assert manager.current_context_tokens < before
+        stats = manager.compression_stats
+        assert stats.background_summaries == 1 and stats.hard_limit_turns == 0
+        assert stats.tokens_saved > 0 and len(stats.latencies) == 1
+
+    asyncio.run(run())
+    print("✓ 通过: 总结在后台完成并替换")
+
+
+def test_messages_added_during_summary_are_kept():
+    """测试总结期间追加的消息保留"""
+    print("\n测试: 总结期间追加的消息保留")
+
+    async def run():
+        manager = setup_history_manager()
+        fill_history(manager)
+        manager._summarizer.release.clear()
+        manager.auto_messages_compression()
+        await asyncio.sleep(0)
+
+        manager.add_message(text_message(Role.USER, "New question"))
+        manager._summarizer.release.set()
+        await manager._summary_task
+
+        messages = manager.get_current_messages()
+        assert messages[-1]["content"][0]["text"] == "New question"
+        assert manager.compression_stats.background_summaries == 1
+
+    asyncio.run(run())
+    print("✓ 通过: 新消息未丢失")
+
+
+def test_stale_summary_is_discarded():
+    """测试历史被裁剪后丢弃过期总结"""
+    print("\n测试: 丢弃过期总结")
+
+    async def run():
+        manager = setup_history_manager()
+        fill_history(manager)
+        manager._summarizer.release.clear()
+        manager.auto_messages_compression()
+        await asyncio.sleep(0)
+
+        assert manager.crop_message(Crop_Direction.BOTTOM, 1) == "Crop message successful"
+        cropped = list(manager.get_current_messages())
+        manager._summarizer.release.set()
+        await manager._summary_task
+
+        assert manager.get_current_messages() == cropped
+        assert manager.compression_stats.background_summaries == 0
+
+    asyncio.run(run())
+    print("✓ 通过: 过期总结未被使用")
+
+
+def test_hard_limit_drops_rounds_and_is_counted():
+    """测试硬阈值按轮次删除并计数"""
+    print("\n测试: 硬阈值删除整轮")
+
+    manager = setup_history_manager()
+    manager.add_message(text_message(Role.SYSTEM, "System"))
+    manager.add_message(text_message(Role.USER, "Long task"))
+    for i in range(10):
+        manager.add_message({
+            "role": Role.ASSISTANT,
+            "content": "",
+            "tool_calls": [{"id": f"call_{i}", "type": "function", "function": {"name": "read_file", "arguments": "{}"}}],
+        })
+        manager.add_message({"role": Role.TOOL, "tool_call_id": f"call_{i}", "content": "o" * 4000})
+    manager.update_token_usage(MockTokenUsage(9000, 10, 9010))
+
+    manager.auto_messages_compression()
+
+    messages = manager.get_current_messages()
+    assert [m["role"] for m in messages[:3]] == [Role.SYSTEM, Role.USER, Role.USER]
+    assert messages[3]["role"] == Role.ASSISTANT
+    assert manager.current_context_tokens <= 0.6 * 10 * 1024
+    assert manager.compression_stats.hard_limit_turns == 1
+    assert manager.compression_stats.hard_limit_rate == 100.0
+    print("✓ 通过: 删除最旧的轮次直到低于软阈值")
+
+
+if __name__ == "__main__":
+    test_soft_threshold_summarizes_in_background()
+    test_messages_added_during_summary_are_kept()
+    test_stale_summary_is_discarded()
+    test_hard_limit_drops_rounds_and_is_counted()
@@ -0,0 +1,142 @@
+import sys
+import os
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.history.cache_planner import CachePlanner
+from core.history.history_manager import HistoryManager, Role, COMPRESSION_NOTICE
+
+
+def setup_history_manager():
+    """Setup a fresh HistoryManager instance for testing"""
+    HistoryManager._instance = None
+    HistoryManager._initialized = False
+    manager = HistoryManager(model_max_tokens=100, compress_threshold=0.8)
+    manager._summarizer = None
+    return manager
+
+
+def text_message(role: Role, text: str) -> dict:
+    return {"role": role, "content": [{"type": "text", "text": text}]}
+
+
+def marked_indices(messages) -> list:
+    return [
+        i for i, message in enumerate(messages)
+        if isinstance(message["content"], list) and "cache_control" in message["content"][-1]
+    ]
+
+
+def add_round(manager, index):
+    manager.add_message({"role": Role.ASSISTANT, "content": f"round {index}", "tool_calls": []})
+    manager.add_message({"role": Role.TOOL, "tool_call_id": f"call_{index}", "content": [{"type": "text", "text": f"result {index}"}]})
+
+
+def test_system_and_latest_message_are_marked():
+    """测试 system 和最新消息都有 breakpoint"""
+    print("测试: system 和最新消息")
+
+    manager = setup_history_manager()
+    manager.add_message(text_message(Role.SYSTEM, "System"))
+    manager.add_message(text_message(Role.USER, "Question"))
+
+    marked = manager.get_messages_with_cache_marks()
+    assert marked_indices(marked) == [0, 1]
+    # stored history stays untouched
+    assert all("cache_control" not in m["content"][-1] for m in manager.get_current_messages())
+    print("✓ 通过: system 和最新消息都被标记")
+
+
+def test_previous_breakpoint_is_read_again():
+    """测试上一轮的 breakpoint 在下一轮仍然保留"""
+    print("\n测试: 保留上一轮的 breakpoint")
+
+    manager = setup_history_manager()
+    manager.add_message(text_message(Role.SYSTEM, "System"))
+    manager.add_message(text_message(Role.USER, "Question"))
+    manager.get_messages_with_cache_marks()
+
+    # a turn with more tool results than the provider looks back over
+    for i in range(30):
+        add_round(manager, i)
+    marked = manager.get_messages_with_cache_marks()
+    assert 1 in marked_indices(marked), "the prefix written by the last turn must be read"
+    assert marked_indices(marked)[-1] == len(marked) - 1
+    # the assistant text can't carry a mark, tool results can
+    assert len(marked_indices(marked)) <= 4
+    print("✓ 通过: 上一轮写入的前缀被再次读取")
+
+
+def test_breakpoints_move_after_compression():
+    """测试压缩后 breakpoint 移到压缩提示之后"""
+    print("\n测试: 压缩后 breakpoint 移动")
+
+    manager = setup_history_manager()
+    manager.add_message(text_message(Role.SYSTEM, "System"))
+    manager.add_message(text_message(Role.USER, "Question"))
+    for i in range(10):
+        add_round(manager, i)
+    manager.get_messages_with_cache_marks()
+
+    # what a hard compression leaves: system, the notice and the recent messages
+    messages = manager.messages_history[-1]
+    manager.messages_history[-1] = messages[:1] + [text_message(Role.USER, COMPRESSION_NOTICE)] + messages[-4:]
+    manager._recount_current_messages()
+
+    marked = manager.get_messages_with_cache_marks()
+    assert marked_indices(marked) == [0, 1, 5]
+    assert marked[1]["content"][-1]["text"] == COMPRESSION_NOTICE
+
+    # next turn: the notice stays a breakpoint, the last tail is read
+    add_round(manager, 10)
+    marked = manager.get_messages_with_cache_marks()
+    assert marked_indices(marked) == [0, 1, 5, 7]
+    print("✓ 通过: 压缩后 breakpoint 落在新的稳定前缀上")
+
+
+def test_breakpoint_limit():
+    """测试 breakpoint 数量不超过上限"""
+    print("\n测试: breakpoint 上限")
+
+    planner = CachePlanner(max_breakpoints=1)
+    messages = [text_message(Role.SYSTEM, "System"), text_message(Role.USER, "Question")]
+    assert planner.plan(messages) == [1]
+    assert CachePlanner(max_breakpoints=0).plan(messages) == []
+
+    planner = CachePlanner(max_breakpoints=4, segment_stride=2)
+    history = [text_message(Role.SYSTEM, "System")]
+    for i in range(20):
+        history = history + [text_message(Role.USER, f"message {i}")]
+        marks = planner.plan(history)
+        assert len(marks) <= 4 and marks[-1] == len(history) - 1
+    print("✓ 通过: 不超过 breakpoint 上限")
+
+
+def test_cache_hit_rate():
+    """测试从 usage 中解析 cached_tokens"""
+    print("\n测试: cache 命中率")
+
+    manager = setup_history_manager()
+    manager.add_message(text_message(Role.USER, "Question"))
+    manager.update_token_usage(SimpleNamespace(
+        prompt_tokens=1000, completion_tokens=10, total_tokens=1010,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=800)
+    ))
+    assert manager.cache_hit_rate == "80.0"
+    assert manager.history_token_usage[-1].cached_tokens == 800
+
+    # providers that don't report caching
+    manager.update_token_usage(SimpleNamespace(prompt_tokens=1000, completion_tokens=10, total_tokens=1010))
+    assert manager.cache_hit_rate == "0.0"
+    assert manager.cache_stats.hit_rate == 40.0
+    print("✓ 通过: cache 命中率")
+
+
+if __name__ == "__main__":
+    test_system_and_latest_message_are_marked()
+    test_previous_breakpoint_is_read_again()
+    test_breakpoints_move_after_compression()
+    test_breakpoint_limit()
+    test_cache_hit_rate()
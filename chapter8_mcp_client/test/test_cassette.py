@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Record a session against the mock OpenAI server into a cassette, then replay it
+with no server and no tools: the replay must rebuild the same conversation
+"""
+import sys
+import os
+import asyncio
+import json
+import tempfile
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+from core.api_client import APIClient
+from core.cassette import Cassette
+from core.conversation import Conversation
+from core.history.history_manager import HistoryManager
+from core.telemetry import Telemetry
+from mock_openai import MockOpenAIServer, ScriptedResponse
+from tools.tool_manager import ToolManager
+
+SINGLETONS = (Conversation, APIClient, HistoryManager, ToolManager, Telemetry, Cassette)
+ENV = ("HOME", "OPENAI_API_KEY", "OPENAI_BASE_URL", "OPENAI_MODEL", "CASSETTE_MODE", "CASSETTE_PATH", "CASSETTE_TIMING")
+
+
+def reset_singletons():
+    for cls in SINGLETONS:
+        cls._instance = None
+        cls._initialized = False
+
+
+async def run_task(home, base_url, **env):
+    """Run one task with a fresh Conversation, returning the result and the final history"""
+    reset_singletons()
+    saved_env = {name: os.environ.get(name) for name in ENV}
+    os.makedirs(os.path.join(home, ".quickstar"), exist_ok=True)
+    with open(os.path.join(home, ".quickstar", "mcp.json"), "w") as f:
+        json.dump({"mcpServers": {}}, f)
+    os.environ.update(HOME=home, OPENAI_API_KEY="mock", OPENAI_BASE_URL=base_url, OPENAI_MODEL="mock-model", **env)
+    try:
+        conv = Conversation()
+        tasks = []
+        new_task_conversation = conv._new_task_conversation
+
+        def keep_task(description=""):
+            tasks.append(new_task_conversation(description))
+            return tasks[-1]
+
+        conv._new_task_conversation = keep_task
+        result = await conv.start_task("You are a helpful assistant.", "Write the marker file")
+        return result, [dict(m) for m in tasks[-1].messages]
+    finally:
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        reset_singletons()
+
+
+def tool_results(messages):
+    return [m["content"][0]["text"] for m in messages if m["role"] == "tool"]
+
+
+def test_record_and_replay():
+    """A replay serves the recorded chunks and tool results without the network or the shell"""
+    print("🧪 Testing cassette record and replay...")
+    with tempfile.TemporaryDirectory() as home:
+        cassette = os.path.join(home, "session.jsonl")
+        marker = os.path.join(home, "marker.txt")
+        responses = [
+            ScriptedResponse(
+                content="Writing the marker.",
+                tool_calls=[{"name": "cmd_runner", "arguments": {"command": f"echo recorded >> {marker}; cat {marker}", "need_user_approve": False}}],
+                ttft=0.05,
+            ),
+            ScriptedResponse(content="The marker says **recorded**.", ttft=0.05),
+        ]
+        with MockOpenAIServer(responses) as server:
+            recorded, recorded_messages = asyncio.run(
+                run_task(home, server.base_url, CASSETTE_MODE="record", CASSETTE_PATH=cassette)
+            )
+
+        with open(cassette, encoding="utf-8") as f:
+            kinds = [json.loads(line)["type"] for line in f]
+        assert kinds == ["stream", "tool", "stream"], kinds
+
+        # nothing listens on this port, and the shell command must not run again
+        replayed, replayed_messages = asyncio.run(
+            run_task(home, "http://127.0.0.1:9/v1", CASSETTE_MODE="replay", CASSETTE_PATH=cassette, CASSETTE_TIMING="zero")
+        )
+        with open(marker) as f:
+            marker_lines = f.read().splitlines()
+
+    assert recorded == replayed == "The marker says **recorded**."
+    assert marker_lines == ["recorded"]
+    assert tool_results(replayed_messages) == tool_results(recorded_messages)
+    assert "recorded" in tool_results(replayed_messages)[0]
+    print("✅ Cassette test passed")
+
+
+if __name__ == "__main__":
+    test_record_and_replay()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test the asyncio based CmdRunner: timeout enforcement, live output, exit codes
+and the persistent shell session
+"""
+import sys
+import os
+import asyncio
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+import core.conversation  # core and tools import each other, load core first like main.py
+from tools.cmd_runner import CmdRunner
+
+
+class RecordingUIManager:
+    def __init__(self):
+        self.lines = []
+
+    def print_tool_output(self, line, is_stderr=False):
+        self.lines.append((time.perf_counter(), line, is_stderr))
+
+
+def make_runner():
+    runner = CmdRunner()
+    runner._ui_manager = RecordingUIManager()
+    return runner
+
+
+def test_success_and_exit_code():
+    """stdout, stderr and the exit code are returned to the model"""
+    print("🧪 Testing cmd_runner results...")
+    async def run():
+        runner = make_runner()
+        assert await runner.act(command="echo hello") == "hello\n"
+        assert await runner.act(command="printf no-newline") == "no-newline"
+        assert await runner.act(command="true") == "Command executed successfully and no return"
+
+        result = await runner.act(command="echo out; echo err >&2; false")
+        assert result.startswith("Error: exit code 1")
+        assert "[stdout]\nout" in result
+        assert "[stderr]\nerr" in result
+
+        result = await runner.act(command="echo 'unbalanced")
+        assert result.startswith("Error: exit code 2")
+
+    asyncio.run(run())
+    print("✓ 通过: exit code and outputs returned")
+
+
+def test_timeout_kills_process_group():
+    """The caller supplied timeout is honored and background children are killed too"""
+    print("🧪 Testing cmd_runner timeout...")
+    runner = make_runner()
+
+    start = time.perf_counter()
+    result = asyncio.run(runner.act(command="echo started; sleep 30 & sleep 30", timeout=0.5))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 5, f"timeout not enforced, took {elapsed:.1f}s"
+    assert result.startswith("Command timed out after 0.5 seconds")
+    assert "started" in result
+    print(f"✓ 通过: command killed after {elapsed:.2f}s")
+
+
+def test_output_is_streamed_live():
+    """Lines reach the UI while the command is still running"""
+    print("🧪 Testing cmd_runner live output...")
+    runner = make_runner()
+
+    async def run():
+        start = time.perf_counter()
+        result = await runner.act(command="echo first; sleep 0.5; echo second >&2")
+        return start, time.perf_counter(), result
+
+    start, end, result = asyncio.run(run())
+    lines = runner._ui_manager.lines
+
+    assert [(line, is_stderr) for _, line, is_stderr in lines] == [("first", False), ("second", True)]
+    # the first line arrived well before the command finished
+    assert lines[0][0] - start < end - start - 0.3
+    assert "first" in result and "second" in result
+    print("✓ 通过: output forwarded line by line")
+
+
+def test_event_loop_not_blocked():
+    """Other coroutines keep running while a command executes"""
+    print("🧪 Testing cmd_runner does not block the event loop...")
+    runner = make_runner()
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.05)
+
+        ticker_task = asyncio.create_task(ticker())
+        await runner.act(command="sleep 0.5")
+        ticker_task.cancel()
+        return ticks
+
+    assert asyncio.run(run()) >= 5
+    print("✓ 通过: event loop kept running")
+
+
+def test_shell_state_persists():
+    """cd and exported variables carry over between calls"""
+    print("🧪 Testing persistent shell session...")
+
+    async def run():
+        runner = make_runner()
+        await runner.act(command="cd /tmp && export QUICKSTAR_TEST_VALUE=42")
+        assert (await runner.act(command="pwd")).strip() == os.path.realpath("/tmp")
+        assert (await runner.act(command="echo $QUICKSTAR_TEST_VALUE")).strip() == "42"
+        return runner
+
+    runner = asyncio.run(run())
+    assert runner._shell_session.cwd == os.path.realpath("/tmp")
+    print("✓ 通过: shell state persisted")
+
+
+def test_shell_restarts_after_exit_and_timeout():
+    """A command that ends the shell or times out gets a fresh shell next time"""
+    print("🧪 Testing shell restart...")
+
+    async def run():
+        runner = make_runner()
+        await runner.act(command="cd /tmp")
+        result = await runner.act(command="exit 7")
+        assert result.startswith("Error: exit code 7")
+        assert (await runner.act(command="pwd")).strip() == os.path.realpath("/tmp")
+
+        result = await runner.act(command="sleep 30", timeout=0.3)
+        assert result.startswith("Command timed out")
+        assert (await runner.act(command="echo alive")) == "alive\n"
+        assert runner._shell_session.restarts == 2
+
+    asyncio.run(run())
+    print("✓ 通过: shell restarted")
+
+
+def test_concurrent_calls_do_not_wait_for_the_shell():
+    """While the shell is busy, another call runs in a new process from the same directory"""
+    print("🧪 Testing concurrent cmd_runner calls...")
+
+    async def run():
+        runner = make_runner()
+        await runner.act(command="cd /tmp")
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            runner.act(command="sleep 0.5; echo slow"),
+            runner.act(command="sleep 0.5; pwd"),
+        )
+        return time.perf_counter() - start, results
+
+    elapsed, results = asyncio.run(run())
+    assert elapsed < 0.9
+    assert results == ["slow\n", os.path.realpath("/tmp") + "\n"]
+    print("✓ 通过: concurrent calls overlapped")
+
+
+if __name__ == "__main__":
+    test_success_and_exit_code()
+    test_timeout_kills_process_group()
+    test_output_is_streamed_live()
+    test_event_loop_not_blocked()
+    test_shell_state_persists()
+    test_shell_restarts_after_exit_and_timeout()
+    test_concurrent_calls_do_not_wait_for_the_shell()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Sub-agents of one assistant message run side by side, each in a conversation of
+its own: separate histories and todos, and the parent's history untouched
+"""
+import sys
+import os
+import asyncio
+import json
+import tempfile
+import time
+
+import pytest
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageFunctionToolCall
+from openai.types.chat.chat_completion_message_function_tool_call import Function
+
+import core.conversation as conversation_module
+from core.cassette import Cassette
+from core.conversation import Conversation
+from core.history.history_manager import HistoryManager
+from core.telemetry import Telemetry
+from tools.cmd_runner import CmdRunner
+from tools.output_spill import OutputSpillStore
+from tools.shell_session import ShellSession
+from tools.task import Task
+from tools.todo_write import TodoWrite
+from tools.tool_manager import ToolManager
+from tools.tool_selector import ToolSelector
+
+TURN_DELAY = 0.2
+RESEARCHERS = 4
+LEAD_PROMPT = "Compare the four storage engines"
+
+
+class SilentUIManager:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def text_of(message):
+    content = message["content"]
+    return content if isinstance(content, str) else "".join(block.get("text", "") for block in content)
+
+
+def tool_call(index, name, arguments):
+    return ChatCompletionMessageFunctionToolCall(
+        id=f"call_{name}_{index}", type="function", function=Function(name=name, arguments=json.dumps(arguments)),
+    )
+
+
+class ResearchAPIClient:
+    """Every model turn takes TURN_DELAY. The lead fans out, each researcher writes its todos, then answers"""
+
+    total_cost = 0
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.reminders = {}
+
+    async def get_completion_stream_async(self, request, timings=None, **scheduling):
+        messages = request["messages"]
+        prompt = text_of(messages[1])
+        tool_results = [text_of(m) for m in messages if m["role"] == "tool"]
+
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(TURN_DELAY)
+        self.running -= 1
+
+        content, tool_calls = "", None
+        if prompt == LEAD_PROMPT and not tool_results:
+            tool_calls = [
+                tool_call(i, "task", {"description": f"engine {i}", "prompt": f"Research engine {i}", "subagent_type": "general-purpose"})
+                for i in range(RESEARCHERS)
+            ]
+        elif prompt == LEAD_PROMPT:
+            content = "\n".join(tool_results)
+        elif not tool_results:
+            tool_calls = [tool_call(0, "todo_write", {"todos": [{"id": "1", "content": prompt, "status": "in_progress"}]})]
+        else:
+            self.reminders[prompt] = tool_results[-1]
+            content = f"Findings of {prompt}"
+        yield ChatCompletionMessage(role="assistant", content=content, tool_calls=tool_calls)
+
+
+class ApprovingUIManager(SilentUIManager):
+    """Approves every prompt after a while, counting the prompts open at once"""
+
+    def __init__(self):
+        self.open = 0
+        self.max_open = 0
+        self.askers = []
+
+    async def wait_for_user_approval(self, content, emoji="🤖"):
+        self.open += 1
+        self.max_open = max(self.max_open, self.open)
+        self.askers.append(emoji)
+        await asyncio.sleep(TURN_DELAY / 4)
+        self.open -= 1
+        return True, "yes"
+
+
+class ApprovalAPIClient(ResearchAPIClient):
+    """The researchers' todo_write asks for approval"""
+
+    async def get_completion_stream_async(self, request, timings=None, **scheduling):
+        async for message in super().get_completion_stream_async(request, timings, **scheduling):
+            for call in message.tool_calls or []:
+                if call.function.name == "todo_write":
+                    arguments = json.loads(call.function.arguments)
+                    call.function.arguments = json.dumps({**arguments, "need_user_approve": True})
+            yield message
+
+
+class ShellAPIClient(ResearchAPIClient):
+    """Each researcher changes its shell, then reads it back along with the shell's pid"""
+
+    def __init__(self, directories):
+        super().__init__()
+        self.directories = directories
+
+    async def get_completion_stream_async(self, request, timings=None, **scheduling):
+        messages = request["messages"]
+        prompt = text_of(messages[1])
+        tool_results = [text_of(m) for m in messages if m["role"] == "tool"]
+        if prompt == LEAD_PROMPT:
+            async for message in super().get_completion_stream_async(request, timings, **scheduling):
+                yield message
+            return
+
+        await asyncio.sleep(TURN_DELAY)
+        i = int(prompt.split()[-1])
+        content, tool_calls = "", None
+        if not tool_results:
+            command = f"cd {self.directories[i]} && export ENGINE={i}"
+            tool_calls = [tool_call(0, "cmd_runner", {"command": command})]
+        elif len(tool_results) == 1:
+            tool_calls = [tool_call(1, "cmd_runner", {"command": "echo $PWD $ENGINE $$"})]
+        else:
+            content = f"{prompt}: {tool_results[-1].strip()}"
+        yield ChatCompletionMessage(role="assistant", content=content, tool_calls=tool_calls)
+
+
+def make_conversation(api_client):
+    """The main conversation, with the real task and todo_write tools"""
+    async def registered():
+        pass
+
+    HistoryManager._instance = None
+    HistoryManager._initialized = False
+    tool_manager = object.__new__(ToolManager)
+    tool_manager.tools = {}
+    tool_manager._manifest = None
+    tool_manager._subset_manifests = {}
+    tool_manager._selector = ToolSelector()
+    tool_manager.register_mcp_task = asyncio.ensure_future(registered())
+    tool_manager._register_tool(TodoWrite.get_tool_name(), TodoWrite())
+    tool_manager._register_tool(Task.get_tool_name(), Task())
+    # the reminder reads the todo status through the singleton
+    ToolManager._instance, ToolManager._initialized = tool_manager, True
+
+    conv = object.__new__(Conversation)
+    conv._initialized = True
+    conv._api_client = api_client
+    conv._tool_manager = tool_manager
+    conv._ui_manager = SilentUIManager()
+    conv._history_manager = HistoryManager()
+    conv._tool_semaphore = asyncio.Semaphore(RESEARCHERS)
+    conv._output_spill = OutputSpillStore()
+    conv._cassette = Cassette()
+    conv._telemetry = Telemetry()
+    conv.todos = []
+    return conv
+
+
+def test_tasks_run_concurrently():
+    """Four researchers take about one researcher's time, each sees only its own todos"""
+    print("🧪 Testing concurrent sub-agents...")
+    api_client = ResearchAPIClient()
+
+    async def run():
+        conv = make_conversation(api_client)
+        try:
+            start = time.perf_counter()
+            result = await conv.start_task("You lead the research.", LEAD_PROMPT)
+            return conv, result, time.perf_counter() - start
+        finally:
+            ToolManager._instance, ToolManager._initialized = None, False
+
+    conv, result, elapsed = asyncio.run(run())
+
+    # lead, researchers (todo_write, answer), lead: 4 turns deep whatever the fan-out
+    assert elapsed < TURN_DELAY * (4 + RESEARCHERS) / 1.5, f"sub-agents did not overlap, took {elapsed:.2f}s"
+    assert api_client.max_running == RESEARCHERS
+    for i in range(RESEARCHERS):
+        assert f"Findings of Research engine {i}" in result
+
+    for prompt, reminder in api_client.reminders.items():
+        others = [f"Research engine {i}" for i in range(RESEARCHERS) if f"Research engine {i}" != prompt]
+        assert prompt in reminder and not any(other in reminder for other in others), reminder
+
+    # the main conversation's history and todos were never touched
+    assert len(conv.messages) == 0
+    assert conv.todos == []
+    print(f"✅ {RESEARCHERS} sub-agents ran concurrently in {elapsed:.2f}s")
+
+
+def test_one_approval_prompt_at_a_time():
+    """Sub-agents asking for approval at once take turns at the prompt, each saying who asks"""
+    print("🧪 Testing approval prompts of concurrent sub-agents...")
+    api_client = ApprovalAPIClient()
+
+    async def run():
+        conv = make_conversation(api_client)
+        conv._ui_manager = ApprovingUIManager()
+        try:
+            result = await conv.start_task("You lead the research.", LEAD_PROMPT)
+            return conv, result
+        finally:
+            ToolManager._instance, ToolManager._initialized = None, False
+
+    conv, result = asyncio.run(run())
+
+    ui = conv._ui_manager
+    assert ui.max_open == 1, f"{ui.max_open} approval prompts were open at once"
+    assert sorted(ui.askers) == [f"🤖 [engine {i}]" for i in range(RESEARCHERS)], ui.askers
+    for i in range(RESEARCHERS):
+        assert f"Findings of Research engine {i}" in result
+    print(f"✅ {len(ui.askers)} prompts, one at a time: {ui.askers}")
+
+
+def test_tasks_keep_their_own_shell():
+    """A researcher's cd and export stay in its own shell, which is closed when its task ends"""
+    print("🧪 Testing the shells of concurrent sub-agents...")
+    if not ShellSession.is_supported():
+        print("⏭️ persistent shell not available (needs bash on a POSIX system)")
+        return
+    directories = [os.path.realpath(tempfile.mkdtemp()) for _ in range(RESEARCHERS)]
+    api_client = ShellAPIClient(directories)
+
+    async def run():
+        conv = make_conversation(api_client)
+        runner = CmdRunner()
+        runner._ui_manager = SilentUIManager()
+        conv._tool_manager._register_tool(CmdRunner.get_tool_name(), runner)
+        try:
+            result = await conv.start_task("You lead the research.", LEAD_PROMPT)
+            return conv, result
+        finally:
+            ToolManager._instance, ToolManager._initialized = None, False
+
+    conv, result = asyncio.run(run())
+
+    for i in range(RESEARCHERS):
+        line = next(line for line in result.splitlines() if f"Research engine {i}:" in line)
+        cwd, engine, pid = line.split(f"Research engine {i}: ")[1].split()
+        assert (cwd, engine) == (directories[i], str(i)), line
+        try:
+            os.kill(int(pid), 0)
+            raise AssertionError(f"the shell of engine {i} outlived its task")
+        except ProcessLookupError:
+            pass
+    # the researchers' shells were their own, the lead never opened one
+    assert conv.shell_session is None
+    print(f"✅ {RESEARCHERS} sub-agents kept their own cwd and variables, shells closed")
+
+
+def test_failed_task_returns_error(monkeypatch):
+    """A researcher that fails answers with its error, the lead and the other researchers carry on"""
+    print("🧪 Testing a failing sub-agent...")
+    api_client = ResearchAPIClient()
+    compress = HistoryManager.auto_messages_compression
+
+    def failing_compression(history):
+        if any(text_of(m) == "Research engine 2" for m in history.get_current_messages()):
+            raise RuntimeError("history store unavailable")
+        return compress(history)
+
+    monkeypatch.setattr(HistoryManager, "auto_messages_compression", failing_compression)
+    monkeypatch.setattr(conversation_module.traceback, "print_exc", lambda: None)
+
+    async def run():
+        conv = make_conversation(api_client)
+        try:
+            return await conv.start_task("You lead the research.", LEAD_PROMPT)
+        finally:
+            ToolManager._instance, ToolManager._initialized = None, False
+
+    result = asyncio.run(run())
+
+    assert "Error: the task failed with RuntimeError: history store unavailable" in result, result
+    for i in (0, 1, 3):
+        assert f"Findings of Research engine {i}" in result
+    print("✅ The failed sub-agent's error was its answer, the others finished")
+
+
+if __name__ == "__main__":
+    test_tasks_run_concurrently()
+    test_one_approval_prompt_at_a_time()
+    test_tasks_keep_their_own_shell()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_failed_task_returns_error(monkeypatch)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Drive Conversation end to end against the bundled mock OpenAI server: streamed
+response, a real cmd_runner tool call, and the final answer (no network needed)
+"""
+import sys
+import os
+import asyncio
+import json
+import tempfile
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+from core.api_client import APIClient
+from core.conversation import Conversation
+from core.history.history_manager import HistoryManager
+from core.telemetry import Telemetry
+from mock_openai import MockOpenAIServer, ScriptedResponse
+from tools.tool_manager import ToolManager
+
+SINGLETONS = (Conversation, APIClient, HistoryManager, ToolManager, Telemetry)
+
+
+def reset_singletons():
+    for cls in SINGLETONS:
+        cls._instance = None
+        cls._initialized = False
+
+
+async def run_task(server, home):
+    """Build a fresh Conversation pointing at the mock server and run one task"""
+    reset_singletons()
+    saved_env = {name: os.environ.get(name) for name in ("HOME", "OPENAI_API_KEY", "OPENAI_BASE_URL", "OPENAI_MODEL")}
+    # an empty MCP config, so no MCP servers are started
+    os.makedirs(os.path.join(home, ".quickstar"), exist_ok=True)
+    with open(os.path.join(home, ".quickstar", "mcp.json"), "w") as f:
+        json.dump({"mcpServers": {}}, f)
+    os.environ.update(HOME=home, OPENAI_API_KEY="mock", OPENAI_BASE_URL=server.base_url, OPENAI_MODEL="mock-model")
+    try:
+        conv = Conversation()
+        return await conv.start_task("You are a helpful assistant.", "Say e2e-ok through the shell")
+    finally:
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        reset_singletons()
+
+
+def test_conversation_end_to_end():
+    """A tool round and a final answer go through the real Conversation stack"""
+    print("🧪 Testing Conversation end to end against the mock server...")
+    responses = [
+        ScriptedResponse(
+            content="Running it now.",
+            tool_calls=[{"name": "cmd_runner", "arguments": {"command": "echo e2e-ok", "need_user_approve": False}}],
+            cost=0.01,
+        ),
+        ScriptedResponse(content="The shell said **e2e-ok**.", tokens_per_second=500, cost=0.01),
+    ]
+    with tempfile.TemporaryDirectory() as home, MockOpenAIServer(responses) as server:
+        result = asyncio.run(run_task(server, home))
+
+    assert result == "The shell said **e2e-ok**."
+    assert len(server.requests) == 2
+    first, second = server.requests
+    assert first["stream"] and first["stream_options"] == {"include_usage": True}
+    assert any(tool["function"]["name"] == "cmd_runner" for tool in first["tools"])
+
+    tool_messages = [m for m in second["messages"] if m["role"] == "tool"]
+    assert len(tool_messages) == 1
+    assert "e2e-ok" in tool_messages[0]["content"][0]["text"]
+    print("✅ End to end test passed")
+
+
+if __name__ == "__main__":
+    test_conversation_end_to_end()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+MCP tool calls: a call that runs out of time is cancelled on the server, calls
+to one server share it up to its concurrency limit, and every call is counted
+"""
+import sys
+import os
+import asyncio
+import json
+import tempfile
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+# core before tools, the two packages import each other
+import core
+from tools.mcp_client.connection import MCPServerConnection
+from tools.mcp_client.server_config import MCPConfig
+from tools.mcp_tool import McpTool
+from mcp.types import Tool
+from test_mcp_startup import MOCK_SERVER
+
+
+def sleep_server(cancel_log=None, **settings):
+    """A connection to a notes server with a sleep tool, settings as in mcp.json"""
+    args = [MOCK_SERVER, "--name", "notes", "--sleep-tool"]
+    if cancel_log:
+        args += ["--cancel-log", cancel_log]
+    config = {"mcpServers": {"notes": {"type": "stdio", "command": sys.executable, "args": args, **settings}}}
+    path = os.path.join(tempfile.mkdtemp(), "mcp.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    return MCPServerConnection(MCPConfig(path).get_server("notes"), idle_ttl=0)
+
+
+async def wait_for_file(path, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path) and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    return os.path.exists(path)
+
+
+def test_timeout_cancels_on_the_server():
+    print("🧪 Testing tool call timeouts...")
+    cancel_log = os.path.join(tempfile.mkdtemp(), "cancelled.txt")
+
+    async def run():
+        notes = sleep_server(cancel_log, timeout=0.5)
+        await notes.ensure_started()
+        started = time.perf_counter()
+        try:
+            await notes.call_tool("notes_sleep", {"seconds": 30})
+            raise AssertionError("the call should have timed out")
+        except TimeoutError as e:
+            assert "0.5s" in str(e), e
+        elapsed = time.perf_counter() - started
+        cancelled = await wait_for_file(cancel_log)
+        # the server is still usable
+        result = await notes.call_tool("notes_sleep", {"seconds": 0})
+        await notes.close()
+        return elapsed, cancelled, result, notes.stats
+
+    elapsed, cancelled, result, stats = asyncio.run(run())
+    assert elapsed < 5, elapsed
+    assert cancelled, "the server kept sleeping"
+    assert result.content[0].text == "slept 0s"
+    assert stats.timeouts == 1 and stats.outcomes["ok"] == 1
+    print(f"✅ Timed out after {elapsed:.2f}s and cancelled on the server")
+
+
+def test_tool_timeout_overrides_the_server():
+    print("🧪 Testing per-tool timeouts...")
+
+    async def run():
+        notes = sleep_server(timeout=0.3, toolTimeouts={"notes_sleep": 5})
+        tool = McpTool(Tool(name="notes_sleep", inputSchema={"type": "object"}), notes)
+        answer = await tool.act(seconds=0.6)
+        await notes.close()
+        return answer
+
+    answer = asyncio.run(run())
+    assert answer[0].text == "slept 0.6s", answer
+    print("✅ The tool's own timeout applies")
+
+
+def test_calls_share_the_server_up_to_the_limit():
+    print("🧪 Testing concurrent calls...")
+
+    async def burst(notes, calls, seconds):
+        await notes.ensure_started()
+        started = time.perf_counter()
+        await asyncio.gather(*(notes.call_tool("notes_sleep", {"seconds": seconds}) for _ in range(calls)))
+        elapsed = time.perf_counter() - started
+        await notes.close()
+        return elapsed
+
+    concurrent = asyncio.run(burst(sleep_server(maxConcurrency=4), 4, 0.5))
+    limited = asyncio.run(burst(sleep_server(maxConcurrency=2), 4, 0.5))
+    # 4 at once take one sleep, 2 at a time two
+    assert concurrent < 0.95, concurrent
+    assert limited >= 1.0, limited
+    print(f"✅ 4 calls: {concurrent:.2f}s at once, {limited:.2f}s two at a time")
+
+
+def test_stats_histogram():
+    print("🧪 Testing call stats...")
+
+    async def run():
+        notes = sleep_server(timeout=0.3)
+        await asyncio.gather(
+            notes.call_tool("notes_sleep", {"seconds": 0}),
+            notes.call_tool("notes_sleep", {"seconds": 0}),
+            notes.call_tool("notes_sleep", {"seconds": 5}),
+            return_exceptions=True,
+        )
+        await notes.close()
+        return notes.stats
+
+    stats = asyncio.run(run())
+    assert stats.calls == 3 and stats.timeouts == 1 and stats.outcomes["ok"] == 2
+    assert sum(count for _, count in stats.histogram()) == 3
+    print(f"✅ {stats.summary()}")
+
+
+if __name__ == "__main__":
+    test_timeout_cancels_on_the_server()
+    test_tool_timeout_overrides_the_server()
+    test_calls_share_the_server_up_to_the_limit()
+    test_stats_histogram()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+The MCP tool catalog: entries follow the server's fingerprint, are refreshed in
+the background, and dropped when a server announces that its tools changed
+"""
+import sys
+import os
+import asyncio
+import json
+import shutil
+import tempfile
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+# core before tools, the two packages import each other
+import core
+from mcp.types import ServerNotification, Tool, ToolListChangedNotification
+from tools.mcp_client.catalog import ToolCatalog
+from tools.mcp_client.client import MCPClient
+from tools.mcp_client.server_config import MCPConfig
+from test_mcp_startup import MOCK_SERVER, catalog_path, write_config
+
+OUTDATED = [Tool(name="notes_old", inputSchema={"type": "object"})]
+
+
+def test_fingerprint_follows_the_script():
+    print("🧪 Testing catalog fingerprints...")
+    script = os.path.join(tempfile.mkdtemp(), "notes_server.py")
+    shutil.copy(MOCK_SERVER, script)
+    path = os.path.join(tempfile.mkdtemp(), "mcp.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"mcpServers": {"notes": {"command": sys.executable, "args": [script, "--name", "notes"]}}}, f)
+    server = MCPConfig(path).get_server("notes")
+
+    catalog = ToolCatalog(catalog_path())
+    catalog.put(server, OUTDATED)
+    assert [tool.name for tool in catalog.get(server)] == ["notes_old"]
+
+    # the script was edited
+    stat = os.stat(script)
+    os.utime(script, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert catalog.get(server) is None
+    print("✅ An edited server script invalidates its entry")
+
+
+def run_with_outdated_catalog(action, max_age=86400):
+    """A client whose catalog holds outdated tools for the notes server"""
+    config = write_config({"notes": ["--tools", "2"]})
+    catalog = ToolCatalog(catalog_path(), max_age=max_age)
+    catalog.put(MCPConfig(config).get_server("notes"), OUTDATED)
+
+    async def run():
+        client = MCPClient(config, catalog)
+        changed = asyncio.Event()
+
+        async def on_changed(connection):
+            changed.set()
+
+        client.add_tools_changed_handler(on_changed)
+        listed = [[tool.name for tool in tools] async for _, tools in client.ready_servers()]
+        await action(client, client.connections["notes"])
+        await asyncio.wait_for(changed.wait(), 15)
+        await client.close()
+        entry = catalog.get(client.connections["notes"].server)
+        return listed, None if entry is None else [tool.name for tool in entry]
+
+    return asyncio.run(run())
+
+
+def test_refreshed_after_a_call():
+    """A server started for a call lists its tools in the background"""
+    print("🧪 Testing the refresh after a lazy start...")
+
+    async def call(client, notes):
+        result = await notes.call_tool("notes_0", {"text": "hi"})
+        assert result.content[0].text == "hi"
+
+    listed, refreshed = run_with_outdated_catalog(call)
+    assert listed == [["notes_old"]]
+    assert refreshed == ["notes_0", "notes_1"], refreshed
+    print("✅ Outdated tools replaced after the first call")
+
+
+def test_stale_entry_refreshed_at_startup():
+    print("🧪 Testing stale catalog entries...")
+
+    async def nothing(client, notes):
+        pass
+
+    listed, refreshed = run_with_outdated_catalog(nothing, max_age=0)
+    # used right away, replaced once the server answered
+    assert listed == [["notes_old"]]
+    assert refreshed == ["notes_0", "notes_1"], refreshed
+    print("✅ Stale entry used, then refreshed in the background")
+
+
+def test_list_changed_invalidates():
+    print("🧪 Testing tools/list_changed...")
+
+    async def announce(client, notes):
+        notification = ServerNotification(ToolListChangedNotification(method="notifications/tools/list_changed"))
+        await client._handle_message(notes, notification)
+        assert client.catalog.get(notes.server) is None
+
+    listed, refreshed = run_with_outdated_catalog(announce)
+    # the handlers list the tools again, this one doesn't
+    assert listed == [["notes_old"]] and refreshed is None
+    print("✅ The entry is dropped when a server's tools change")
+
+
+if __name__ == "__main__":
+    test_fingerprint_follows_the_script()
+    test_refreshed_after_a_call()
+    test_stale_entry_refreshed_at_startup()
+    test_list_changed_invalidates()
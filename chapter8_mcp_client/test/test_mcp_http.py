@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Remote MCP servers over streamable HTTP and SSE: configured with a URL and
+headers, reached over pooled keep-alive connections
+"""
+import sys
+import os
+import asyncio
+import json
+import socket
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+# core before tools, the two packages import each other
+import core
+import httpx
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from tools.mcp_client.catalog import ToolCatalog
+from tools.mcp_client.client import MCPClient
+from tools.mcp_client.http_pool import HttpClientPool
+from tools.mcp_client.server_config import MCPConfig, MCPServer
+from test_mcp_startup import MOCK_SERVER, catalog_path
+
+PATHS = {"streamable-http": "/mcp", "sse": "/sse"}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def http_server(transport, name="notes"):
+    """A mock server serving over HTTP, yields its URL"""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, MOCK_SERVER, "--name", name, "--tools", "2", "--transport", transport, "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        yield process, f"http://127.0.0.1:{port}{PATHS[transport]}"
+    finally:
+        process.kill()
+        process.wait()
+
+
+def write_config(servers):
+    path = os.path.join(tempfile.mkdtemp(), "mcp.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"mcpServers": servers}, f)
+    return path
+
+
+def test_config():
+    print("🧪 Testing remote server configs...")
+    os.environ["TEST_MCP_TOKEN"] = "secret"
+    config = MCPConfig(write_config({
+        "remote": {"type": "streamableHttp", "url": "http://127.0.0.1/mcp", "headers": {"Authorization": "Bearer ${TEST_MCP_TOKEN}"}},
+        "events": {"type": "sse", "url": "http://127.0.0.1/sse"},
+        "bare": {"url": "http://127.0.0.1/mcp"},
+        "socket": {"type": "websocket", "url": "ws://127.0.0.1/"},
+    }))
+    remote = config.get_server("remote")
+    assert remote.type == "http" and remote.remote
+    assert remote.headers == {"Authorization": "Bearer secret"}
+    assert config.get_server("events").type == "sse"
+    assert config.get_server("bare").type == "http"
+    assert config.get_server("socket") is None
+    print("✅ http and sse servers read, headers expanded")
+
+
+def call_remote(transport):
+    os.environ["TEST_MCP_AGENT"] = "agent-7"
+    with http_server(transport) as (_, url):
+        type_ = "http" if transport == "streamable-http" else "sse"
+        config = write_config({"notes": {"type": type_, "url": url, "headers": {"X-Agent": "${TEST_MCP_AGENT}"}}})
+
+        async def run():
+            client = MCPClient(config, ToolCatalog(catalog_path()))
+            listed = [[tool.name for tool in tools] async for _, tools in client.ready_servers()]
+            notes = client.connections["notes"]
+            echo = await notes.call_tool("notes_0", {"text": "hi"})
+            header = await notes.call_tool("notes_header", {"header": "x-agent"})
+            await client.close()
+            return listed, echo.content[0].text, header.content[0].text
+
+        return asyncio.run(run())
+
+
+def test_streamable_http():
+    print("🧪 Testing a streamable HTTP server...")
+    listed, echo, header = call_remote("streamable-http")
+    assert listed == [["notes_0", "notes_1", "notes_header"]], listed
+    assert echo == "hi" and header == "agent-7", (echo, header)
+    print("✅ Tools listed and called, headers sent")
+
+
+def test_sse():
+    print("🧪 Testing an SSE server...")
+    listed, echo, header = call_remote("sse")
+    assert listed == [["notes_0", "notes_1", "notes_header"]], listed
+    assert echo == "hi" and header == "agent-7", (echo, header)
+    print("✅ Tools listed and called over SSE")
+
+
+def test_pooled_connections():
+    print("🧪 Testing the HTTP connection pool...")
+    with http_server("streamable-http") as (process, url):
+        config = write_config({
+            "notes": {"type": "http", "url": url},
+            "more_notes": {"type": "http", "url": url},
+        })
+
+        async def run():
+            client = MCPClient(config, ToolCatalog(catalog_path()))
+            await client.connect_to_server()
+            notes, more_notes = client.connections["notes"], client.connections["more_notes"]
+            pooled = client.http_pool.client(notes.server)
+            # reconnected, as after the idle TTL
+            await notes.close()
+            result = await notes.call_tool("notes_0", {"text": "again"})
+            shared = client.http_pool.client(more_notes.server) is pooled and not pooled.is_closed
+
+            # the server went away: the call fails at once instead of waiting for its timeout
+            process.kill()
+            process.wait()
+            started = time.perf_counter()
+            try:
+                await notes.call_tool("notes_0", {"text": "gone"})
+                raise AssertionError("the call should have failed")
+            except ConnectionError:
+                failed_after = time.perf_counter() - started
+            await client.close()
+            return result.content[0].text, shared, failed_after, pooled.is_closed
+
+        text, shared, failed_after, closed = asyncio.run(run())
+
+    assert text == "again"
+    assert shared, "servers at one origin should share a client, kept across reconnects"
+    assert failed_after < 5, failed_after
+    assert closed
+    print(f"✅ One client for both servers, a dead server noticed after {failed_after:.2f}s")
+
+
+def test_pooled_client_honors_timeout_and_auth():
+    print("🧪 Testing the transport's timeout and auth on a pooled client...")
+    with http_server("sse") as (process, url):
+        server = MCPServer("notes", "sse", None, [], url=url)
+
+        async def run():
+            pool = HttpClientPool()
+            requests = []
+
+            async def record(request):
+                requests.append(request)
+
+            pool.client(server).event_hooks = {"request": [record]}
+            transport = sse_client(
+                url, timeout=3, sse_read_timeout=40, auth=httpx.BasicAuth("reader", "secret"),
+                httpx_client_factory=pool.factory(server),
+            )
+            async with transport as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    await session.list_tools()
+            await pool.close()
+            return requests
+
+        requests = asyncio.run(run())
+
+    assert len(requests) >= 3, requests
+    expected_auth = httpx.BasicAuth("reader", "secret")._auth_header
+    for request in requests:
+        assert request.headers["authorization"] == expected_auth, request
+    # the event stream waits with the transport's read timeout, not the pool's default
+    assert requests[0].extensions["timeout"] == {"connect": 3, "read": 40, "write": 3, "pool": 3}
+    print(f"✅ Auth and timeout applied to all {len(requests)} requests")
+
+
+if __name__ == "__main__":
+    test_config()
+    test_streamable_http()
+    test_sse()
+    test_pooled_connections()
+    test_pooled_client_honors_timeout_and_auth()
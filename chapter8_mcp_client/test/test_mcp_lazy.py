@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+MCP servers listed in the tool catalog aren't started until one of their tools
+is called, and are shut down again once idle
+"""
+import sys
+import os
+import asyncio
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+# core before tools, the two packages import each other
+import core
+from mcp.types import Tool
+from tools.mcp_client.catalog import ToolCatalog
+from tools.mcp_client.client import MCPClient
+from tools.mcp_client.connection import MCPServerConnection
+from tools.mcp_client.server_config import MCPConfig
+from test_mcp_startup import catalog_path, write_config
+
+IDLE_TTL = 0.5
+
+
+def make_client(config, catalog):
+    os.environ["MCP_IDLE_TTL"] = str(IDLE_TTL)
+    try:
+        return MCPClient(config, ToolCatalog(catalog))
+    finally:
+        os.environ.pop("MCP_IDLE_TTL")
+
+
+async def server_tools(client):
+    return {server.name: [tool.name for tool in tools] async for server, tools in client.ready_servers()}
+
+
+def test_catalog_avoids_spawning():
+    print("🧪 Testing lazy MCP servers...")
+    config = write_config({"notes": ["--tools", "2"], "weather": []})
+    catalog = catalog_path()
+
+    async def cold():
+        client = make_client(config, catalog)
+        tools = await server_tools(client)
+        starts = {name: connection.starts for name, connection in client.connections.items()}
+        await client.close()
+        return tools, starts
+
+    async def warm():
+        client = make_client(config, catalog)
+        start = time.perf_counter()
+        tools = await server_tools(client)
+        listed = time.perf_counter() - start
+        idle = {name: connection.status for name, connection in client.connections.items()}
+
+        notes = client.connections["notes"]
+        result = await notes.call_tool("notes_1", {"text": "hello"})
+        after_call = (notes.status, client.connections["weather"].status)
+
+        await asyncio.sleep(IDLE_TTL * 3)
+        after_idle = notes.status
+        again = await notes.call_tool("notes_0", {"text": "again"})
+        await client.close()
+        return tools, listed, idle, result, after_call, after_idle, again, notes.starts
+
+    cold_tools, cold_starts = asyncio.run(cold())
+    assert cold_tools == {"notes": ["notes_0", "notes_1"], "weather": ["weather_0"]}, cold_tools
+    assert cold_starts == {"notes": 1, "weather": 1}
+
+    tools, listed, idle, result, after_call, after_idle, again, starts = asyncio.run(warm())
+    assert tools == cold_tools
+    # listed from the catalog, nothing spawned
+    assert listed < 0.2, listed
+    assert set(idle.values()) == {MCPServerConnection.PENDING}, idle
+    # a call starts its server only
+    assert result.content[0].text == "hello"
+    assert after_call == (MCPServerConnection.READY, MCPServerConnection.PENDING), after_call
+    # shut down once idle, started again by the next call
+    assert after_idle == MCPServerConnection.CLOSED
+    assert again.content[0].text == "again" and starts == 2
+    print(f"✅ Tools of 2 servers listed in {listed * 1000:.1f}ms without starting them")
+
+
+def test_catalog_entry_needs_the_same_launch():
+    """A server launched with other arguments is listed again"""
+    print("🧪 Testing catalog keys...")
+    path = catalog_path()
+    catalog = ToolCatalog(path)
+    server = MCPConfig(write_config({"notes": ["--tools", "2"]})).get_server("notes")
+    catalog.put(server, [Tool(name="notes_0", inputSchema={"type": "object"})])
+
+    assert [tool.name for tool in ToolCatalog(path).get(server)] == ["notes_0"]
+    server.args = server.args + ["--startup-delay", "1"]
+    assert ToolCatalog(path).get(server) is None
+    print("✅ Catalog entries follow the server's command and arguments")
+
+
+if __name__ == "__main__":
+    test_catalog_avoids_spawning()
+    test_catalog_entry_needs_the_same_launch()
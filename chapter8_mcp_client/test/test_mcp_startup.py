@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+MCP servers start side by side, each within its own timeouts: a hung or crashed
+server is reported and left out, the tools of the others arrive as each is ready
+"""
+import sys
+import os
+import asyncio
+import json
+import tempfile
+import time
+from types import SimpleNamespace
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+# core before tools, the two packages import each other
+import core
+import tools.mcp_client.client as client_module
+from tools.mcp_client.client import MCPClient
+from tools.mcp_client.catalog import ToolCatalog
+from tools.mcp_client.connection import MCPServerConnection
+from tools.tool_manager import ToolManager
+from tools.tool_selector import ToolSelector
+
+MOCK_SERVER = os.path.join(src_path, "mcp_servers", "mock_server.py")
+SLOW_START = 2.0
+INITIALIZE_TIMEOUT = 6.0
+
+
+def catalog_path():
+    return os.path.join(tempfile.mkdtemp(), "mcp_catalog.json")
+
+
+def write_config(servers):
+    """An mcp.json with a mock server per (name, extra arguments)"""
+    config = {"mcpServers": {
+        name: {"type": "stdio", "command": sys.executable, "args": [MOCK_SERVER, "--name", name, *args]}
+        for name, args in servers.items()
+    }}
+    path = os.path.join(tempfile.mkdtemp(), "mcp.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    return path
+
+
+class SilentUIManager:
+    def __init__(self):
+        self.errors = []
+
+    def print_error(self, message, *args):
+        self.errors.append(message)
+
+
+def test_servers_start_in_parallel_within_timeouts():
+    print("🧪 Testing parallel MCP startup...")
+    path = write_config({
+        "fast": ["--tools", "2"],
+        "slow": ["--tools", "1", "--startup-delay", str(SLOW_START)],
+        "hung": ["--hang"],
+        "broken": ["--crash"],
+    })
+    ui = SilentUIManager()
+
+    async def run():
+        os.environ["MCP_INITIALIZE_TIMEOUT"] = str(INITIALIZE_TIMEOUT)
+        try:
+            client = MCPClient(path, ToolCatalog(catalog_path()))
+        finally:
+            os.environ.pop("MCP_INITIALIZE_TIMEOUT")
+        start = time.perf_counter()
+        arrivals = []
+        async for server, tools in client.ready_servers():
+            arrivals.append(([tool.name for tool in tools], time.perf_counter() - start))
+        elapsed = time.perf_counter() - start
+        result = await client.connections["fast"].call_tool("fast_0", {"text": "hi"})
+        await client.close()
+        return client, arrivals, elapsed, result
+
+    real_ui = client_module.UIManager
+    client_module.UIManager = lambda: ui
+    try:
+        client, arrivals, elapsed, result = asyncio.run(run())
+    finally:
+        client_module.UIManager = real_ui
+
+    # the fast server's tools come first, without waiting for the slow or the hung one
+    assert arrivals[0][0] == ["fast_0", "fast_1"] and arrivals[1][0] == ["slow_0"], arrivals
+    assert arrivals[0][1] < arrivals[1][1] - SLOW_START / 2, arrivals
+    # one timeout for the hung server, not one per server in turn
+    assert elapsed < INITIALIZE_TIMEOUT + 3, elapsed
+    assert result.content[0].text == "hi"
+
+    assert set(client.failed_servers) == {"hung", "broken"}
+    assert isinstance(client.failed_servers["hung"], TimeoutError)
+    assert client.connections["fast"].status == MCPServerConnection.CLOSED
+    assert len(ui.errors) == 2 and all("failed to start" in error for error in ui.errors), ui.errors
+    print(f"✅ 2 of 4 servers ready, 2 reported, in {elapsed:.2f}s")
+
+
+class FakeSession:
+    def __init__(self, names):
+        self.names = names
+
+    async def list_tools(self):
+        return SimpleNamespace(tools=[
+            SimpleNamespace(name=name, description=f"{name} tool", inputSchema={"properties": {}, "required": []})
+            for name in self.names
+        ])
+
+
+class StartingMCPClient:
+    """Servers ready after the given delays"""
+
+    def __init__(self, delays):
+        self.delays = delays
+
+    def add_tools_changed_handler(self, handler):
+        pass
+
+    async def ready_servers(self):
+        started = asyncio.get_running_loop().time()
+        for name, delay in sorted(self.delays.items(), key=lambda item: item[1]):
+            await asyncio.sleep(max(0.0, started + delay - asyncio.get_running_loop().time()))
+            session = FakeSession([f"{name}_0"])
+            yield session, (await session.list_tools()).tools
+
+
+def test_first_request_waits_only_until_the_deadline():
+    """Tools of a server ready later are added to later requests"""
+    print("🧪 Testing the startup wait of the first request...")
+
+    async def run():
+        manager = object.__new__(ToolManager)
+        manager.tools = {}
+        manager._manifest = None
+        manager._subset_manifests = {}
+        manager._selector = ToolSelector()
+        manager._mcp_client = StartingMCPClient({"fast": 0.1, "slow": 1.0})
+        manager.register_mcp_task = asyncio.create_task(manager._register_mcp_tool())
+        manager._startup_deadline = asyncio.get_running_loop().time() + 0.3
+
+        start = time.perf_counter()
+        first = await manager.get_tool_manifest()
+        waited = time.perf_counter() - start
+        await manager.register_mcp_task
+        later = await manager.get_tool_manifest()
+        return first, waited, later
+
+    first, waited, later = asyncio.run(run())
+    assert 0.25 <= waited < 0.6, waited
+    assert first.names == ("fast_0",), first.names
+    assert later.names == ("fast_0", "slow_0"), later.names
+    print(f"✅ First request sent after {waited:.2f}s, the slow server's tools joined later")
+
+
+if __name__ == "__main__":
+    test_servers_start_in_parallel_within_timeouts()
+    test_first_request_waits_only_until_the_deadline()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Supervised MCP servers: a server that dies or stops answering is started
+again, and calls cut off by the crash are sent again when that's safe
+"""
+import sys
+import os
+import asyncio
+import json
+import tempfile
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+# core before tools, the two packages import each other
+import core
+from core.retry_policy import RetryPolicy
+from tools.mcp_client.connection import MCPServerConnection
+from tools.mcp_client.server_config import MCPConfig
+from mcp.types import Tool
+from test_mcp_startup import MOCK_SERVER
+
+
+def crashing_server(**kwargs):
+    """A connection to a notes server that can be told to crash or freeze"""
+    args = [MOCK_SERVER, "--name", "notes", "--sleep-tool", "--crash-tool"]
+    config = {"mcpServers": {"notes": {"type": "stdio", "command": sys.executable, "args": args}}}
+    path = os.path.join(tempfile.mkdtemp(), "mcp.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    kwargs.setdefault("restart_policy", RetryPolicy(max_retries=3, base_delay=0.1, max_delay=0.5))
+    return MCPServerConnection(MCPConfig(path).get_server("notes"), idle_ttl=0, **kwargs)
+
+
+async def wait_until(condition, timeout=15):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    return condition()
+
+
+def test_idempotent_call_retried_after_a_crash():
+    print("🧪 Testing a crash during an idempotent call...")
+
+    async def run():
+        notes = crashing_server()
+        await notes.list_tools()
+        call = asyncio.create_task(notes.call_tool("notes_sleep", {"seconds": 2}))
+        await notes.call_tool("notes_crash", {"delay": 0.3})
+        result = await call
+        await notes.close()
+        return result, notes
+
+    result, notes = asyncio.run(run())
+    assert result.content[0].text == "slept 2s"
+    assert notes.lost == 1 and notes.restarts == 1, notes.health()
+    assert notes.stats.retries == 1 and notes.stats.outcomes["ok"] == 2
+    print(f"✅ Sent again to the restarted server: {notes.health()}")
+
+
+def test_other_calls_fail():
+    print("🧪 Testing a crash during a call that isn't idempotent...")
+
+    async def run():
+        notes = crashing_server()
+        await notes.list_tools()
+        # as a server whose sleep doesn't say it's idempotent
+        notes.tools["notes_sleep"] = Tool(name="notes_sleep", inputSchema={"type": "object"})
+        call = asyncio.create_task(notes.call_tool("notes_sleep", {"seconds": 2}))
+        await notes.call_tool("notes_crash", {"delay": 0.3})
+        try:
+            await call
+            raise AssertionError("the call should have failed")
+        except ConnectionError as e:
+            error = e
+        # the next call finds the server running again
+        result = await notes.call_tool("notes_sleep", {"seconds": 0})
+        await notes.close()
+        return error, result, notes
+
+    error, result, notes = asyncio.run(run())
+    assert "isn't idempotent" in str(error), error
+    assert result.content[0].text == "slept 0s"
+    assert notes.stats.retries == 0 and notes.restarts == 1
+    print(f"✅ Reported, not retried: {error}")
+
+
+def test_restarted_without_a_call():
+    print("🧪 Testing the supervisor after a crash...")
+
+    async def run():
+        notes = crashing_server()
+        await notes.ensure_started()
+        await notes.call_tool("notes_crash", {"delay": 0.1})
+        lost = await wait_until(lambda: notes.lost == 1)
+        restarted = await wait_until(lambda: notes.running)
+        await notes.close()
+        return lost, restarted, notes
+
+    lost, restarted, notes = asyncio.run(run())
+    assert lost and restarted, notes.health()
+    assert notes.starts == 2 and notes.restarts == 1
+    print(f"✅ Noticed the closed pipe and restarted: {notes.health()}")
+
+
+def test_unresponsive_server_restarted():
+    print("🧪 Testing the ping health check...")
+
+    async def run():
+        notes = crashing_server(ping_interval=0.5, ping_timeout=0.5)
+        await notes.ensure_started()
+        frozen = asyncio.create_task(notes.call_tool("notes_freeze", {"seconds": 30}))
+        started = time.perf_counter()
+        lost = await wait_until(lambda: notes.lost == 1)
+        detected = time.perf_counter() - started
+        restarted = await wait_until(lambda: notes.running)
+        result = await notes.call_tool("notes_sleep", {"seconds": 0})
+        (frozen_error,) = await asyncio.gather(frozen, return_exceptions=True)
+        await notes.close()
+        return lost, detected, restarted, result, frozen_error, notes
+
+    lost, detected, restarted, result, frozen_error, notes = asyncio.run(run())
+    assert lost and restarted, notes.health()
+    # the frozen call went down with the server it froze
+    assert isinstance(frozen_error, ConnectionError), frozen_error
+    assert detected < 5, detected
+    assert result.content[0].text == "slept 0s"
+    print(f"✅ No answer to the ping, noticed after {detected:.2f}s and restarted")
+
+
+if __name__ == "__main__":
+    test_idempotent_call_retried_after_a_crash()
+    test_other_calls_fail()
+    test_restarted_without_a_call()
+    test_unresponsive_server_restarted()
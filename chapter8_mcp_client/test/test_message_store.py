@@ -0,0 +1,102 @@
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.history.history_manager import HistoryManager, Role
+from core.history.message_store import FrozenDict, MessagesView, thaw, with_cache_mark
+
+
+def setup_history_manager():
+    """Setup a fresh HistoryManager instance for testing"""
+    HistoryManager._instance = None
+    HistoryManager._initialized = False
+    return HistoryManager(model_max_tokens=100, compress_threshold=0.8)
+
+
+def text_message(role: Role, text: str) -> dict:
+    return {"role": role, "content": [{"type": "text", "text": text}]}
+
+
+def test_stored_messages_are_read_only():
+    """测试存储的消息不可修改"""
+    print("测试: 存储的消息只读")
+
+    manager = setup_history_manager()
+    message = text_message(Role.USER, "Hello")
+    manager.add_message(message)
+
+    # later changes to the caller's dict don't leak into history
+    message["content"].append({"type": "text", "text": "sneaky"})
+
+    stored = manager.get_current_messages()[0]
+    assert isinstance(stored, FrozenDict)
+    assert len(stored["content"]) == 1
+
+    for mutate in (
+        lambda: stored.__setitem__("role", Role.ASSISTANT),
+        lambda: stored["content"][0].update(cache_control={"type": "ephemeral"}),
+        lambda: stored.pop("role"),
+    ):
+        try:
+            mutate()
+            assert False, "mutation should raise"
+        except (TypeError, AttributeError):
+            pass
+
+    assert thaw(stored) == {"role": Role.USER, "content": [{"type": "text", "text": "Hello"}]}
+    print("✓ 通过: 消息只读，thaw 返回可修改的副本")
+
+
+def test_view_is_stable_snapshot():
+    """测试视图是稳定快照"""
+    print("\n测试: 视图快照")
+
+    manager = setup_history_manager()
+    manager.add_message(text_message(Role.SYSTEM, "System"))
+    manager.add_message(text_message(Role.USER, "First"))
+
+    view = manager.get_current_messages()
+    manager.add_message(text_message(Role.ASSISTANT, "Answer"))
+
+    assert isinstance(view, MessagesView)
+    assert len(view) == 2
+    assert [m["role"] for m in view] == [Role.SYSTEM, Role.USER]
+    assert view[-1]["content"][0]["text"] == "First"
+    assert [m["role"] for m in view[1:]] == [Role.USER]
+    assert len(manager.get_current_messages()) == 3
+    try:
+        view[2]
+        assert False, "index beyond the snapshot should raise"
+    except IndexError:
+        pass
+    print("✓ 通过: 追加消息不影响已有视图")
+
+
+def test_cache_mark_does_not_touch_history():
+    """测试 cache mark 不修改历史"""
+    print("\n测试: cache mark 不修改历史")
+
+    manager = setup_history_manager()
+    manager.add_message(text_message(Role.SYSTEM, "System"))
+    manager.add_message(text_message(Role.USER, "Question"))
+
+    marked = with_cache_mark(manager.get_current_messages())
+    stored = manager.get_current_messages()
+
+    assert marked[-1]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in stored[-1]["content"][-1]
+    # everything except the last message is shared, not copied
+    assert marked[0] is stored[0]
+
+    assistant_only = with_cache_mark([{"role": Role.ASSISTANT, "content": "plain text"}])
+    assert assistant_only == [{"role": Role.ASSISTANT, "content": "plain text"}]
+    assert with_cache_mark([]) == []
+    print("✓ 通过: 只复制最后一条消息")
+
+
+if __name__ == "__main__":
+    test_stored_messages_are_read_only()
+    test_view_is_stable_snapshot()
+    test_cache_mark_does_not_touch_history()
@@ -0,0 +1,82 @@
+import sys
+import os
+import asyncio
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import core.conversation  # core and tools import each other, load core first like main.py
+from tools.output_spill import OutputSpillStore
+from tools.read_tool_output import ReadToolOutput
+
+
+def setup_spill_store(max_chars=1000):
+    """Setup a fresh OutputSpillStore with a small budget"""
+    OutputSpillStore._instance = None
+    OutputSpillStore._initialized = False
+    store = OutputSpillStore()
+    store.max_chars = max_chars
+    return store
+
+
+def numbered_lines(count):
+    return "\n".join(f"line {i:05d}" for i in range(1, count + 1))
+
+
+def test_small_output_is_untouched():
+    """测试小输出保持不变"""
+    print("测试: 未超过预算的输出")
+
+    store = setup_spill_store()
+    content = numbered_lines(10)
+    assert store.cap("cmd_runner", content) == content
+    print("✓ 通过: 输出未被修改")
+
+
+def test_large_output_keeps_head_and_tail():
+    """测试大输出保留头尾并写入磁盘"""
+    print("\n测试: 超过预算的输出")
+
+    store = setup_spill_store(max_chars=1000)
+    content = numbered_lines(5000)
+    capped = store.cap("cmd_runner", content)
+
+    assert len(capped) < 1400
+    assert capped.startswith("line 00001\n")
+    assert capped.endswith("line 05000")
+    assert 'spill_id "cmd_runner-1"' in capped
+    assert "5000 lines" in capped
+    # excerpts are cut at line boundaries
+    for line in capped.split("\n"):
+        assert line.startswith("line ") or line.startswith("[Output truncated")
+    print("✓ 通过: 保留头尾，完整输出已保存")
+
+
+def test_read_spilled_ranges():
+    """测试按行或按字节读取保存的输出"""
+    print("\n测试: read_tool_output 读取范围")
+
+    store = setup_spill_store(max_chars=1000)
+    content = numbered_lines(5000)
+    store.cap("cmd_runner", content)
+    tool = ReadToolOutput()
+
+    result = asyncio.run(tool.act(spill_id="cmd_runner-1", start_line=2500, end_line=2502))
+    assert result == "[lines 2500-2502 of 5000]\nline 02500\nline 02501\nline 02502"
+
+    result = asyncio.run(tool.act(spill_id="cmd_runner-1", byte_offset=11, byte_length=10))
+    assert result == "[bytes 11-21 of 54999]\nline 00002"
+
+    # a single read is bounded by the same budget
+    result = asyncio.run(tool.act(spill_id="cmd_runner-1", start_line=1, end_line=5000))
+    assert len(result) <= 1100
+    assert result.startswith("[lines 1-90 of 5000]")
+
+    assert asyncio.run(tool.act(spill_id="missing")) == "Unknown spill_id: missing"
+    print("✓ 通过: 范围读取正确")
+
+
+if __name__ == "__main__":
+    test_small_output_is_untouched()
+    test_large_output_keeps_head_and_tail()
+    test_read_spilled_ranges()
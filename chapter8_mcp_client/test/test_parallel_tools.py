@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test concurrent dispatch of independent tool calls with artificially slow tools
+"""
+import sys
+import os
+import asyncio
+import json
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+import pytest
+from openai.types.chat import ChatCompletionMessageFunctionToolCall
+from openai.types.chat.chat_completion_message_function_tool_call import Function
+
+import core.conversation as conversation_module
+from core.cassette import Cassette
+from core.conversation import Conversation
+from core.history.history_manager import HistoryManager
+from tools.output_spill import OutputSpillStore
+
+TOOL_DELAY = 0.2
+
+
+class SlowToolManager:
+    """Tool manager whose tools sleep, recording how many run at the same time"""
+
+    def __init__(self, unsafe_tools=()):
+        self.unsafe_tools = set(unsafe_tools)
+        self.running = 0
+        self.max_running = 0
+        self.events = []
+
+    async def run_tool(self, tool_name, **kwargs):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        self.events.append(("start", kwargs.get("id")))
+        await asyncio.sleep(TOOL_DELAY)
+        self.running -= 1
+        self.events.append(("end", kwargs.get("id")))
+        return f"result {kwargs.get('id')}"
+
+    def is_concurrency_safe(self, tool_name):
+        return tool_name not in self.unsafe_tools
+
+
+class FakeUIManager:
+    def __init__(self, tool_manager):
+        self.tool_manager = tool_manager
+
+    def show_preparing_tool(self, tool_name, tool_args):
+        pass
+
+    def show_tool_execution(self, tool_name, tool_args, success=True, result=""):
+        pass
+
+    def print_error(self, error_message):
+        pass
+
+    async def wait_for_user_approval(self, content, emoji="🤖"):
+        self.tool_manager.events.append(("approve", content))
+        return True, ""
+
+
+def make_tool_call(index, name="slow_tool", need_user_approve=False):
+    return ChatCompletionMessageFunctionToolCall(
+        id=f"call_{index}",
+        type="function",
+        function=Function(name=name, arguments=json.dumps({"id": index, "need_user_approve": need_user_approve})),
+    )
+
+
+def setup_conversation(monkeypatch, tool_manager, concurrency=4):
+    HistoryManager._instance = None
+    HistoryManager._initialized = False
+    monkeypatch.setattr(conversation_module, "get_reminder", lambda: "<reminder></reminder>")
+
+    conv = object.__new__(Conversation)
+    conv._initialized = True
+    conv._tool_manager = tool_manager
+    conv._ui_manager = FakeUIManager(tool_manager)
+    conv._history_manager = HistoryManager()
+    conv._tool_semaphore = asyncio.Semaphore(concurrency)
+    conv._output_spill = OutputSpillStore()
+    conv._cassette = Cassette()
+    return conv
+
+
+def tool_messages(conv):
+    return [m for m in conv.messages if m["role"] == "tool"]
+
+
+def test_independent_tools_run_concurrently(monkeypatch):
+    """Five slow tools finish in about one tool latency, results keep tool_call order"""
+    print("🧪 Testing concurrent tool dispatch...")
+    tool_manager = SlowToolManager()
+    conv = setup_conversation(monkeypatch, tool_manager, concurrency=5)
+    tool_calls = [make_tool_call(i) for i in range(5)]
+
+    start = time.perf_counter()
+    asyncio.run(conv._handle_tool_calls(tool_calls))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < TOOL_DELAY * 2, f"tools did not overlap, took {elapsed:.2f}s"
+    assert tool_manager.max_running == 5
+
+    messages = tool_messages(conv)
+    assert [m["tool_call_id"] for m in messages] == [f"call_{i}" for i in range(5)]
+    assert [m["content"][0]["text"] for m in messages] == [f"result {i}" for i in range(5)]
+    # reminder is attached to the last tool message only
+    assert [len(m["content"]) for m in messages] == [1, 1, 1, 1, 2]
+    print(f"✓ 通过: 5 slow tools took {elapsed:.2f}s")
+
+
+def test_concurrency_limit(monkeypatch):
+    """No more than the configured number of tools run at once"""
+    print("🧪 Testing tool concurrency limit...")
+    tool_manager = SlowToolManager()
+    conv = setup_conversation(monkeypatch, tool_manager, concurrency=2)
+
+    asyncio.run(conv._handle_tool_calls([make_tool_call(i) for i in range(5)]))
+
+    assert tool_manager.max_running == 2
+    assert len(tool_messages(conv)) == 5
+    print("✓ 通过: concurrency limit respected")
+
+
+def test_approval_and_unsafe_tools_are_barriers(monkeypatch):
+    """Approval prompts and unsafe tools run alone, after the calls before them finished"""
+    print("🧪 Testing approval ordering...")
+    tool_manager = SlowToolManager(unsafe_tools={"task"})
+    conv = setup_conversation(monkeypatch, tool_manager)
+    tool_calls = [
+        make_tool_call(0),
+        make_tool_call(1),
+        make_tool_call(2, need_user_approve=True),
+        make_tool_call(3),
+        make_tool_call(4, name="task"),
+        make_tool_call(5),
+    ]
+
+    asyncio.run(conv._handle_tool_calls(tool_calls))
+
+    events = tool_manager.events
+    approve_index = next(i for i, e in enumerate(events) if e[0] == "approve")
+    assert {("end", 0), ("end", 1)} <= set(events[:approve_index])
+    assert events[approve_index + 1:approve_index + 3] == [("start", 2), ("end", 2)]
+    task_start = events.index(("start", 4))
+    assert events[task_start + 1] == ("end", 4)
+    assert events.index(("end", 3)) < task_start < events.index(("start", 5))
+
+    messages = tool_messages(conv)
+    assert [m["tool_call_id"] for m in messages] == [f"call_{i}" for i in range(6)]
+    print("✓ 通过: approvals serialized and order preserved")
+
+
+if __name__ == "__main__":
+    for test in (test_independent_tools_run_concurrently, test_concurrency_limit, test_approval_and_unsafe_tools_are_barriers):
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            test(monkeypatch)
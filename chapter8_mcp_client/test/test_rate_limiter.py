@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Rate limiting of model requests: token buckets, priorities, x-ratelimit-* and
+retry-after headers, and the APIClient retrying a 429 through the scheduler
+"""
+import sys
+import os
+import asyncio
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+from core.api_client import APIClient
+from core.rate_limiter import RateLimitExceeded, RequestScheduler, parse_duration
+from mock_openai import MockOpenAIServer, ScriptedResponse
+
+
+def test_parse_duration():
+    print("🧪 Testing header durations...")
+    assert parse_duration("12") == 12
+    assert parse_duration("1.5s") == 1.5
+    assert parse_duration("20ms") == 0.02
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("1h2m") == 3720
+    assert parse_duration("soon") is None and parse_duration(None) is None
+    print("✅ Header durations parsed")
+
+
+def test_buckets_and_priorities():
+    """An empty bucket refills at the limit's rate, the main conversation goes first"""
+    print("🧪 Testing scheduling...")
+
+    async def run():
+        scheduler = RequestScheduler(requests_per_minute=600, tokens_per_minute=0)
+        scheduler.requests.level = 0
+        order = []
+
+        async def request(name, priority):
+            admission = await scheduler.acquire(100, priority)
+            order.append(name)
+            return admission
+
+        start = time.monotonic()
+        background = asyncio.create_task(request("summary", RequestScheduler.BACKGROUND))
+        await asyncio.sleep(0.01)
+        assert scheduler.queue_depth == 1
+        others = [asyncio.create_task(request("sub-agent", 1)), asyncio.create_task(request("main", RequestScheduler.MAIN))]
+        admissions = await asyncio.gather(background, *others)
+        return order, admissions, time.monotonic() - start, scheduler
+
+    order, admissions, elapsed, scheduler = asyncio.run(run())
+    # 10 requests per second
+    assert order == ["main", "sub-agent", "summary"], order
+    assert 0.25 <= elapsed < 0.6, elapsed
+    assert admissions[0].waited > admissions[2].waited
+    assert scheduler.stats.requests == 3 and scheduler.stats.max_queue_depth == 3
+    assert scheduler.queue_depth == 0
+    print("✅ Requests admitted by priority within the limit")
+
+
+def test_headers_adapt_the_limits():
+    """The provider's limits apply without configuration, an exhausted one waits for its reset"""
+    print("🧪 Testing rate limit headers...")
+
+    async def run():
+        scheduler = RequestScheduler(requests_per_minute=0, tokens_per_minute=0)
+        scheduler.observe({
+            "x-ratelimit-limit-requests": "300",
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-limit-tokens": "1000000",
+            "x-ratelimit-remaining-tokens": "999000",
+        })
+        assert scheduler.requests.capacity == 300 and scheduler.tokens.capacity == 1000000
+        # an empty bucket of 300 a minute has a request again after 0.2s
+        first = await scheduler.acquire(10)
+
+        # without a limit, an exhausted allowance waits for its reset
+        scheduler.requests = RequestScheduler(0, 0).requests
+        scheduler.observe({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "200ms"})
+        reset = await scheduler.acquire(10)
+
+        scheduler.rate_limited({"retry-after-ms": "300"})
+        second = await scheduler.acquire(10)
+        return first, reset, second, scheduler
+
+    first, reset, second, scheduler = asyncio.run(run())
+    assert 0.15 <= first.waited < 0.4, first.waited
+    assert 0.15 <= reset.waited < 0.4, reset.waited
+    assert 0.25 <= second.waited < 0.5, second.waited
+    assert scheduler.stats.rate_limited == 1
+    print("✅ Headers adapt the limits")
+
+
+def make_client(base_url):
+    APIClient._instance = None
+    APIClient._initialized = False
+    saved_env = {name: os.environ.get(name) for name in ("OPENAI_API_KEY", "OPENAI_BASE_URL", "OPENAI_MODEL")}
+    os.environ.update(OPENAI_API_KEY="mock", OPENAI_BASE_URL=base_url, OPENAI_MODEL="mock-model")
+    try:
+        return APIClient()
+    finally:
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        APIClient._instance = None
+        APIClient._initialized = False
+
+
+async def collect(client, request):
+    pieces, message = [], None
+    async for chunk in client.get_completion_stream_async(request):
+        if isinstance(chunk, str):
+            pieces.append(chunk)
+        else:
+            message = chunk
+    return "".join(pieces), message
+
+
+def test_api_client_waits_out_a_429():
+    """A 429 is retried once its retry-after has passed, a persistent one is reported as such"""
+    print("🧪 Testing 429 handling in the APIClient...")
+    responses = [
+        ScriptedResponse(status=429, headers={"retry-after-ms": "250"}),
+        ScriptedResponse(content="Hello after the limit"),
+    ]
+    with MockOpenAIServer(responses) as server:
+        client = make_client(server.base_url)
+        start = time.monotonic()
+        content, message = asyncio.run(collect(client, {"messages": [{"role": "user", "content": "Hi"}]}))
+        elapsed = time.monotonic() - start
+    assert content == "Hello after the limit" and message.content == content
+    assert elapsed >= 0.25
+    assert server.rate_limited == 1 and client.scheduler.stats.rate_limited == 1
+
+    with MockOpenAIServer([ScriptedResponse(status=429, headers={"retry-after-ms": "50"})], loop=True) as server:
+        client = make_client(server.base_url)
+        try:
+            asyncio.run(collect(client, {"messages": [{"role": "user", "content": "Hi"}]}))
+            assert False, "expected RateLimitExceeded"
+        except RateLimitExceeded:
+            pass
+    assert server.rate_limited == client.retry_policy.max_retries + 1
+    print("✅ 429 responses are waited out")
+
+
+def test_api_client_follows_server_limits():
+    """Against a limiting server, concurrent requests are paced instead of rejected"""
+    print("🧪 Testing pacing against a rate limited server...")
+
+    async def run(client):
+        request = lambda: {"messages": [{"role": "user", "content": "Hi"}]}
+        # the first response teaches the client the limit
+        await collect(client, request())
+        return await asyncio.gather(*(collect(client, request()) for _ in range(6)))
+
+    # 600 requests per minute and a burst of 2: one request every 0.1s
+    with MockOpenAIServer([ScriptedResponse(content="ok")], loop=True, requests_per_minute=600, burst=2 / 600) as server:
+        client = make_client(server.base_url)
+        start = time.monotonic()
+        results = asyncio.run(run(client))
+        elapsed = time.monotonic() - start
+    assert [content for content, _ in results] == ["ok"] * 6
+    assert server.rate_limited == 0, server.rate_limited
+    assert elapsed >= 0.4
+    assert client.scheduler.stats.delayed >= 4
+    print(f"✅ 7 requests paced in {elapsed:.2f}s without a 429")
+
+
+if __name__ == "__main__":
+    test_parse_duration()
+    test_buckets_and_priorities()
+    test_headers_adapt_the_limits()
+    test_api_client_waits_out_a_429()
+    test_api_client_follows_server_limits()
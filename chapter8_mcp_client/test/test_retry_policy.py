@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Retries of failed model requests: which errors are retried, the backoff, and a
+stream cut off midway continued from its partial answer instead of regenerated
+"""
+import sys
+import os
+import asyncio
+import tempfile
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+import httpx
+from openai import APIConnectionError, BadRequestError, InternalServerError, RateLimitError
+
+from core.cassette import Cassette
+from core.retry_policy import RetryPolicy, StreamInterrupted
+from mock_openai import MockOpenAIServer, ScriptedResponse
+from test_rate_limiter import collect, make_client
+
+ANSWER = "The storage engine keeps a write-ahead log and compacts it in the background."
+
+
+def status_error(cls, status):
+    request = httpx.Request("POST", "http://mock/v1/chat/completions")
+    return cls("error", response=httpx.Response(status, request=request), body=None)
+
+
+def continuing(body):
+    """Answer ANSWER and break off after 24 characters, continue it after an assistant prefill"""
+    last = body["messages"][-1]
+    if last["role"] == "assistant":
+        return ScriptedResponse(content=ANSWER[len(last["content"]):])
+    return ScriptedResponse(content=ANSWER, drop_after=24)
+
+
+def test_classification_and_backoff():
+    print("🧪 Testing retry classification and backoff...")
+    request = httpx.Request("POST", "http://mock/v1/chat/completions")
+    assert RetryPolicy.is_retryable(StreamInterrupted())
+    assert RetryPolicy.is_retryable(httpx.RemoteProtocolError("peer closed connection"))
+    assert RetryPolicy.is_retryable(APIConnectionError(request=request))
+    assert RetryPolicy.is_retryable(status_error(RateLimitError, 429))
+    assert RetryPolicy.is_retryable(status_error(InternalServerError, 503))
+    assert not RetryPolicy.is_retryable(status_error(BadRequestError, 400))
+    assert not RetryPolicy.is_retryable(ValueError("bad arguments"))
+
+    policy = RetryPolicy(max_retries=5, base_delay=0.5, max_delay=2)
+    for attempt, bound in ((1, 0.5), (2, 1.0), (3, 2.0), (6, 2.0)):
+        delays = [policy.backoff(attempt) for _ in range(200)]
+        assert all(0 <= delay <= bound for delay in delays), (attempt, max(delays))
+        # full jitter spreads the retries over the whole window
+        assert max(delays) > bound / 2
+    print("✅ Errors classified, backoff jittered and capped")
+
+
+def test_stream_resumed_from_partial_answer():
+    """The resumed request carries the partial answer, no content is repeated"""
+    print("🧪 Testing mid-stream resume...")
+    with MockOpenAIServer(continuing) as server:
+        client = make_client(server.base_url)
+        client.retry_policy.base_delay = 0.01
+        content, message = asyncio.run(collect(client, {"messages": [{"role": "user", "content": "How does it work?"}]}))
+
+    assert content == ANSWER and message.content == ANSWER, content
+    assert len(server.requests) == 2
+    prefill = server.requests[1]["messages"][-1]
+    assert prefill == {"role": "assistant", "content": ANSWER[:24]}, prefill
+    stats = client.retry_policy.stats
+    assert stats.retries == 1 and stats.interrupted_streams == 1 and stats.recovered_streams == 1
+    assert stats.salvaged_tokens > 0 and stats.wasted_tokens == 0 and stats.failed_requests == 0
+    print(f"✅ Stream resumed, {stats.salvaged_tokens} tokens kept")
+
+
+def test_stream_ended_without_finish_reason():
+    """A stream closed cleanly before its finish chunk is resumed, not taken as the whole answer"""
+    print("🧪 Testing a stream ended without a finish reason...")
+    responses = [ScriptedResponse(content=ANSWER, end_after=24), ScriptedResponse(content=ANSWER[24:])]
+    with MockOpenAIServer(responses) as server:
+        client = make_client(server.base_url)
+        client.retry_policy.base_delay = 0.01
+        content, message = asyncio.run(collect(client, {"messages": [{"role": "user", "content": "How does it work?"}]}))
+
+    assert content == ANSWER and message.content == ANSWER, content
+    assert server.requests[1]["messages"][-1] == {"role": "assistant", "content": ANSWER[:24]}
+    stats = client.retry_policy.stats
+    assert stats.interrupted_streams == 1 and stats.recovered_streams == 1
+    print("✅ Stream resumed after its early end")
+
+
+def test_every_attempt_settled():
+    """Each attempt of a resumed stream corrects its admission, the scheduler's token count doesn't drift"""
+    print("🧪 Testing the scheduler accounting of a resumed stream...")
+    with MockOpenAIServer(continuing) as server:
+        client = make_client(server.base_url)
+        client.retry_policy.base_delay = 0.01
+        settled = []
+        settle = client.scheduler.settle
+        client.scheduler.settle = lambda admission, used: (settled.append((admission.tokens, used)), settle(admission, used))
+        _, message = asyncio.run(collect(client, {"messages": [{"role": "user", "content": "How does it work?"}]}))
+
+    assert len(settled) == 2, settled
+    # the cut off attempt: its prompt and the 24 characters it streamed
+    (estimated, used), (_, reported) = settled
+    assert used > estimated, settled
+    assert reported == message.usage.total_tokens
+    print(f"✅ Both attempts settled: {settled}")
+
+
+def test_partial_tool_call_dropped():
+    """A tool call cut off midway is regenerated whole, its partial arguments counted as wasted"""
+    print("🧪 Testing resume during a tool call...")
+    tool_call = {"id": "call_1", "name": "read_file", "arguments": {"path": "/var/lib/engine/wal.log"}}
+    responses = [
+        ScriptedResponse(content="Reading.", tool_calls=[tool_call], drop_after=20),
+        ScriptedResponse(tool_calls=[tool_call]),
+    ]
+    with MockOpenAIServer(responses) as server:
+        client = make_client(server.base_url)
+        client.retry_policy.base_delay = 0.01
+        content, message = asyncio.run(collect(client, {"messages": [{"role": "user", "content": "Check the log"}]}))
+
+    assert content == "Reading." and len(message.tool_calls) == 1
+    assert message.tool_calls[0].function.arguments == '{"path": "/var/lib/engine/wal.log"}'
+    assert server.requests[1]["messages"][-1] == {"role": "assistant", "content": "Reading."}
+    assert client.retry_policy.stats.wasted_tokens > 0
+    print("✅ Partial tool call regenerated")
+
+
+def test_fatal_error_not_retried():
+    print("🧪 Testing fatal errors...")
+    with MockOpenAIServer([ScriptedResponse(status=400)], loop=True) as server:
+        client = make_client(server.base_url)
+        try:
+            asyncio.run(collect(client, {"messages": [{"role": "user", "content": "Hi"}]}))
+            assert False, "expected the 400 to be raised"
+        except Exception as e:
+            assert "400" in str(e), e
+    assert len(server.requests) == 1
+    assert client.retry_policy.stats.retries == 0 and client.retry_policy.stats.failed_requests == 1
+    print("✅ A 400 is raised without retrying")
+
+
+def test_interrupted_stream_replayed():
+    """A recorded interruption is replayed, and resumed the same way"""
+    print("🧪 Testing record and replay of an interrupted stream...")
+    request = {"messages": [{"role": "user", "content": "How does it work?"}]}
+    path = os.path.join(tempfile.mkdtemp(), "session.jsonl")
+
+    def run(mode, base_url):
+        Cassette._instance = None
+        Cassette._initialized = False
+        saved_env = {name: os.environ.get(name) for name in ("CASSETTE_MODE", "CASSETTE_PATH", "CASSETTE_TIMING")}
+        os.environ.update(CASSETTE_MODE=mode, CASSETTE_PATH=path, CASSETTE_TIMING="zero")
+        try:
+            client = make_client(base_url)
+            client.retry_policy.base_delay = 0.01
+            return asyncio.run(collect(client, dict(request))), client
+        finally:
+            for name, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            Cassette._instance = None
+            Cassette._initialized = False
+
+    responses = [ScriptedResponse(content=ANSWER, drop_after=24), ScriptedResponse(content=ANSWER[24:])]
+    with MockOpenAIServer(responses) as server:
+        (recorded, _), _ = run("record", server.base_url)
+    (replayed, _), client = run("replay", "http://127.0.0.1:9/v1")
+
+    assert recorded == replayed == ANSWER
+    assert client.retry_policy.stats.interrupted_streams == 1 and client.retry_policy.stats.recovered_streams == 1
+    print("✅ Interrupted stream replayed and resumed")
+
+
+if __name__ == "__main__":
+    test_classification_and_backoff()
+    test_stream_resumed_from_partial_answer()
+    test_stream_ended_without_finish_reason()
+    test_every_attempt_settled()
+    test_partial_tool_call_dropped()
+    test_fatal_error_not_retried()
+    test_interrupted_stream_replayed()
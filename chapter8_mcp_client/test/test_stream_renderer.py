@@ -0,0 +1,122 @@
+import sys
+import os
+import io
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from rich.console import Console
+from rich.markdown import Markdown
+from ui.display_manager import DisplayManager
+from ui.stream_renderer import MarkdownBlockSplitter
+
+
+def feed_all(splitter, text, chunk_size):
+    blocks = []
+    for i in range(0, len(text), chunk_size):
+        blocks.extend(splitter.feed(text[i:i + chunk_size]))
+    return blocks
+
+
+def test_paragraphs_finish_on_blank_line():
+    """测试空行结束段落"""
+    print("测试: 段落在空行处结束")
+
+    splitter = MarkdownBlockSplitter()
+    assert splitter.feed("# Title\nfirst para") == []
+    assert splitter.tail == "# Title\nfirst para"
+
+    assert splitter.feed("graph\n\nsecond") == ["# Title\nfirst paragraph"]
+    assert splitter.tail == "second"
+    print("✓ 通过: 段落正确冻结")
+
+
+def test_fenced_code_is_one_block():
+    """测试代码块内的空行不会拆分代码块"""
+    print("\n测试: 代码块")
+
+    text = "Intro\n```python\ndef a():\n\n    return 1\n```\nAfter\n\nEnd"
+    for chunk_size in (1, 3, 7, len(text)):
+        splitter = MarkdownBlockSplitter()
+        blocks = feed_all(splitter, text, chunk_size)
+        assert blocks == ["Intro", "```python\ndef a():\n\n    return 1\n```", "After"], blocks
+        assert splitter.tail == "End"
+
+    splitter = MarkdownBlockSplitter()
+    splitter.feed("````\n```\nstill code\n")
+    assert "still code" in splitter.tail
+    assert splitter.feed("````\n") == ["````\n```\nstill code\n````"]
+    print("✓ 通过: 代码块作为整体冻结")
+
+
+def test_loose_list_is_one_block():
+    """测试松散列表和列表项的续段不会在空行处拆开"""
+    print("\n测试: 松散列表")
+
+    text = "1. first step\n\n2. second step\n\n   details of step two\n\n3. third\n\nDone.\n"
+    for chunk_size in (1, 4, len(text)):
+        splitter = MarkdownBlockSplitter()
+        blocks = feed_all(splitter, text, chunk_size)
+        assert blocks == ["1. first step\n\n2. second step\n\n   details of step two\n\n3. third"], blocks
+        assert splitter.tail == "Done."
+    print("✓ 通过: 列表作为整体冻结")
+
+
+def render_streamed(text, chunk_size):
+    output = io.StringIO()
+    display = DisplayManager(Console(file=output, width=60, force_terminal=False))
+    display.start_stream_display()
+    for i in range(0, len(text), chunk_size):
+        display.print_streaming_content(text[i:i + chunk_size])
+    display.stop_stream_display()
+    return output.getvalue()
+
+
+def render_full(text):
+    output = io.StringIO()
+    Console(file=output, width=60, force_terminal=False).print(Markdown(text))
+    return output.getvalue()
+
+
+def test_streamed_render_matches_full_render():
+    """测试逐块渲染的输出与一次性渲染全文相同"""
+    print("\n测试: 流式渲染与整体渲染一致")
+
+    texts = [
+        "# Plan\n\n- alpha\n- beta\n\nThat is all.",
+        "1. first step\n\n2. second step\n\n   details of step two\n\n3. third\n\nDone.",
+        "Intro\n\n```python\ndef a():\n\n    return 1\n```\n\nAfter the code\n",
+        "- item\n\n  ```\n  code in the item\n  ```\n\n- next item\n\nEnd",
+    ]
+    for text in texts:
+        for chunk_size in (1, 5, len(text)):
+            # the live area ends without the final newline of a print
+            assert render_streamed(text, chunk_size) == render_full(text).rstrip("\n"), (text, chunk_size)
+    print("✓ 通过: 输出一致")
+
+
+def test_display_manager_prints_each_block_once():
+    """测试 DisplayManager 只渲染一次已完成的块"""
+    print("\n测试: DisplayManager 流式渲染")
+
+    output = io.StringIO()
+    display = DisplayManager(Console(file=output, width=80, force_terminal=False))
+    display.start_stream_display()
+    for word in "Alpha paragraph\n\nBeta paragraph\n\nGamma".split(" "):
+        display.print_streaming_content(word + " ")
+    display.stop_stream_display()
+
+    rendered = output.getvalue()
+    assert rendered.count("Alpha paragraph") == 1
+    assert rendered.count("Beta paragraph") == 1
+    assert "Gamma" in rendered
+    assert display.get_stream_buffer() == "Alpha paragraph\n\nBeta paragraph\n\nGamma "
+    print("✓ 通过: 每个块只输出一次")
+
+
+if __name__ == "__main__":
+    test_paragraphs_finish_on_blank_line()
+    test_fenced_code_is_one_block()
+    test_loose_list_is_one_block()
+    test_streamed_render_matches_full_render()
+    test_display_manager_prints_each_block_once()
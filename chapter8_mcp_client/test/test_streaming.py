@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """
-Simple test script to verify streaming functionality
+Simple test script to verify streaming functionality, against the bundled
+mock OpenAI server so no network or API key is needed
 """
 import sys
 import os
@@ -10,14 +11,23 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 src_path = os.path.join(current_dir, '../src')
 sys.path.insert(0, src_path)
 
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("OPENAI_BASE_URL", "http://127.0.0.1:1/v1")
+os.environ.setdefault("OPENAI_MODEL", "test-model")
+
+from openai import OpenAI
 from core.api_client import APIClient
+from mock_openai import MockOpenAIServer, ScriptedResponse
 
 def test_streaming():
     """Test the streaming API functionality"""
     print("🧪 Testing streaming functionality...")
     
+    server = MockOpenAIServer([ScriptedResponse(content="Hello there, friend!", tokens_per_second=200)]).start()
+    client = APIClient()
+    original_client = client.client
+    client.client = OpenAI(api_key="mock", base_url=server.base_url)
     try:
-        client = APIClient()
         
         # Verify the method exists
         if not hasattr(client, 'get_completion_stream'):
@@ -70,6 +80,9 @@ def test_streaming():
         import traceback
         traceback.print_exc()
         return False
+    finally:
+        client.client = original_client
+        server.stop()
 
 if __name__ == "__main__":
     success = test_streaming()
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """
-Test streaming functionality with tool calls
+Test streaming functionality with tool calls, against the bundled mock OpenAI
+server so no network or API key is needed
 """
 import sys
 import os
@@ -10,16 +11,27 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 src_path = os.path.join(current_dir, '../src')
 sys.path.insert(0, src_path)
 
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("OPENAI_BASE_URL", "http://127.0.0.1:1/v1")
+os.environ.setdefault("OPENAI_MODEL", "test-model")
+
+from openai import OpenAI
 from core.api_client import APIClient
-from tools.tool_manager import ToolManager
+from mock_openai import MockOpenAIServer, ScriptedResponse
+from tools.cmd_runner import CmdRunner
 
 def test_streaming_with_tools():
     """Test streaming with tool calls"""
     print("🧪 Testing streaming functionality with tools...")
     
+    server = MockOpenAIServer([ScriptedResponse(
+        content="Let me list them.",
+        tool_calls=[{"name": "cmd_runner", "arguments": {"command": "ls", "need_user_approve": False}}],
+    )]).start()
+    client = APIClient()
+    original_client = client.client
+    client.client = OpenAI(api_key="mock", base_url=server.base_url)
     try:
-        client = APIClient()
-        tool_manager = ToolManager()
         
         # Test request that should trigger a tool call
         request_params = {
@@ -27,7 +39,7 @@ def test_streaming_with_tools():
                 {"role": "system", "content": "You are a helpful assistant."},
                 {"role": "user", "content": "Please list the files in the current directory"}
             ],
-            "tools": tool_manager.get_tools_description()
+            "tools": [CmdRunner().json_schema()]
         }
         
         print("📡 Making streaming request with tools...")
@@ -57,6 +69,9 @@ def test_streaming_with_tools():
         print(f"   Streamed content: '{full_content.strip()}'")
         print(f"   Tool calls detected: {message_obj and hasattr(message_obj, 'tool_calls') and message_obj.tool_calls is not None}")
         
+        if not (message_obj and message_obj.tool_calls and message_obj.tool_calls[0].function.name == "cmd_runner"):
+            print("❌ Tool call missing")
+            return False
         print("🎉 Tool streaming test completed successfully!")
         return True
         
@@ -65,6 +80,9 @@ def test_streaming_with_tools():
         import traceback
         traceback.print_exc()
         return False
+    finally:
+        client.client = original_client
+        server.stop()
 
 if __name__ == "__main__":
     success = test_streaming_with_tools()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test the per-turn latency instrumentation with a fake stream (no network needed)
+"""
+import sys
+import os
+import asyncio
+import json
+import tempfile
+import time
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("OPENAI_BASE_URL", "http://127.0.0.1:1/v1")
+os.environ.setdefault("OPENAI_MODEL", "test-model")
+
+import pytest
+from openai.types.chat import ChatCompletionChunk
+from core.api_client import APIClient
+from core.telemetry import StreamTimings, Telemetry, TurnMetrics, percentile
+
+
+def make_chunk(delta=None, usage=None, finish_reason=None):
+    return ChatCompletionChunk.model_validate({
+        "id": "test",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "test-model",
+        "choices": [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        "usage": usage,
+    })
+
+
+class SlowAsyncStream:
+    def __init__(self, chunks, delay):
+        self._chunks = chunks
+        self._delay = delay
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self._chunks:
+            await asyncio.sleep(self._delay)
+            yield chunk
+
+
+def test_stream_timings_from_api_client():
+    """Time to first token and inter-chunk gaps are recorded while streaming"""
+    print("🧪 Testing stream timings...")
+    client = APIClient()
+    chunks = [make_chunk({"role": "assistant", "content": "a"})]
+    chunks += [make_chunk({"content": "b"}) for _ in range(4)]
+    chunks.append(make_chunk({}, finish_reason="stop"))
+    chunks.append(make_chunk(usage={"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}))
+
+    async def create(**kwargs):
+        return SlowAsyncStream(chunks, 0.01)
+
+    client.async_client.chat.completions.create = create
+    timings = StreamTimings()
+
+    async def consume():
+        async for _ in client.get_completion_stream_async({"messages": []}, timings=timings):
+            pass
+
+    asyncio.run(consume())
+
+    assert timings.ttft >= 0.009
+    # the usage chunk carries no token, so only the 4 gaps between content chunks count
+    assert len(timings.gaps) == 4
+    assert all(gap >= 0.009 for gap in timings.gaps)
+    assert timings.finished is not None
+    print("✅ Stream timings test passed")
+
+
+def test_turn_event_and_jsonl_log():
+    """A finished turn is written as one JSON line with all timings"""
+    print("🧪 Testing turn events...")
+    with tempfile.TemporaryDirectory() as tmp:
+        Telemetry._instance = None
+        Telemetry._initialized = False
+        telemetry = Telemetry()
+        telemetry.log_path = os.path.join(tmp, "telemetry.jsonl")
+
+        turn = telemetry.start_turn(depth=1)
+        with turn.measure("request_build"):
+            turn.record_request({"messages": [{"role": "user", "content": "hi"}], "tools": []})
+        turn.stream.start()
+        for _ in range(3):
+            time.sleep(0.005)
+            turn.stream.on_chunk(True)
+        turn.record_usage(type("Usage", (), {"completion_tokens": 20})())
+        turn.tool_calls = 2
+        with turn.measure("tool_wall"):
+            time.sleep(0.01)
+        telemetry.finish_turn(turn)
+
+        with open(telemetry.log_path, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f]
+
+    Telemetry._instance = None
+    Telemetry._initialized = False
+
+    assert len(events) == 1
+    event = events[0]
+    assert event["event"] == "turn" and event["depth"] == 1
+    assert event["messages"] == 1
+    assert event["request_bytes"] > 0
+    assert event["ttft_ms"] >= 4
+    assert event["gap_p50_ms"] >= 4
+    assert event["tokens_per_s"] > 0
+    assert event["tool_calls"] == 2 and event["tool_wall_ms"] >= 9
+    assert event["total_ms"] >= event["tool_wall_ms"]
+    assert "ttft" in turn.summary() and "tools" in turn.summary()
+    print("✅ Turn event test passed")
+
+
+def test_failed_turn_reported(monkeypatch):
+    """A turn whose request fails is written too, with its status and error"""
+    print("🧪 Testing the event of a failed turn...")
+    from test_agent_loop_soak import SoakAPIClient, setup_conversation
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Telemetry._instance = None
+        Telemetry._initialized = False
+        # one turn calling a tool, then the request of the next one fails
+        conv = setup_conversation(monkeypatch, SoakAPIClient(turns=1))
+        conv._telemetry.log_path = os.path.join(tmp, "telemetry.jsonl")
+        asyncio.run(conv._run_agent_loop())
+
+        with open(conv._telemetry.log_path, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f]
+
+    Telemetry._instance = None
+    Telemetry._initialized = False
+
+    assert [event["status"] for event in events] == ["ok", "error"], events
+    assert events[0]["tool_calls"] == 1 and events[0]["error"] is None
+    assert "soak finished" in events[1]["error"] and events[1]["total_ms"] >= 0
+    print(f"✅ Failed turn reported: {events[1]['error']}")
+
+
+def test_request_size_skipped_when_disabled():
+    """Serialization size is only measured when the telemetry goes somewhere"""
+    turn = TurnMetrics(depth=0, measure_size=False)
+    turn.record_request({"messages": [{"role": "user", "content": "hi"}]})
+    assert turn.request_bytes is None
+    assert percentile([], 0.5) is None
+    assert percentile([3, 1, 2], 0.5) == 2
+
+
+if __name__ == "__main__":
+    test_stream_timings_from_api_client()
+    test_turn_event_and_jsonl_log()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_failed_turn_reported(monkeypatch)
+    test_request_size_skipped_when_disabled()
@@ -0,0 +1,122 @@
+import json
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.history.history_manager import HistoryManager, Role, Crop_Direction
+from core.history.token_estimator import TokenEstimator
+
+
+class MockTokenUsage:
+    def __init__(self, prompt, completion, total):
+        self.prompt_tokens = prompt
+        self.completion_tokens = completion
+        self.total_tokens = total
+
+
+def setup_history_manager(model_max_tokens=100):
+    """Setup a fresh HistoryManager instance for testing"""
+    HistoryManager._instance = None
+    HistoryManager._initialized = False
+    return HistoryManager(model_max_tokens=model_max_tokens, compress_threshold=0.8)
+
+
+def text_message(role: Role, text: str) -> dict:
+    return {"role": role, "content": [{"type": "text", "text": text}]}
+
+
+def test_estimator_heuristic():
+    """测试字符数估算"""
+    print("测试: 字符数估算")
+
+    estimator = TokenEstimator()
+    assert estimator.count_text("") == 0
+    assert estimator.count_text("a" * 400) == 100
+    # non-ASCII characters count as one token each
+    assert estimator.count_text("你好" + "a" * 8) == 4
+
+    message = {
+        "role": "assistant",
+        "content": "a" * 40,
+        "tool_calls": [{"function": {"name": "read_file", "arguments": '{"path": "x"}'}}],
+    }
+    expected = TokenEstimator.MESSAGE_OVERHEAD + 10 + len("read_file") / 4 + len('{"path": "x"}') / 4
+    assert estimator.count_message(message) == expected
+    print("✓ 通过: 估算结果符合预期")
+
+
+def test_new_messages_count_before_next_request():
+    """测试新增消息在下一次请求前就被计入"""
+    print("\n测试: 新增消息在请求前计入")
+
+    manager = setup_history_manager(model_max_tokens=10)
+    manager.add_message(text_message(Role.SYSTEM, "You are a helpful assistant"))
+    manager.add_message(text_message(Role.USER, "List the files"))
+    manager.update_token_usage(MockTokenUsage(1000, 20, 1020))
+    assert manager.current_context_tokens == 1000
+    assert not manager._requires_compression()
+
+    # a large tool output pushes the estimate past the threshold without any API call
+    manager.add_message(text_message(Role.TOOL, "x" * 40000))
+    assert manager.current_context_tokens > 0.8 * 10 * 1024
+    assert manager._requires_compression()
+    assert float(manager.current_context_window) > 80
+    print("✓ 通过: 压缩判断不再等待 API")
+
+
+def test_crop_reduces_estimate():
+    """测试裁剪后重新估算"""
+    print("\n测试: 裁剪后重新估算")
+
+    manager = setup_history_manager()
+    manager.add_message(text_message(Role.SYSTEM, "System"))
+    manager.add_message(text_message(Role.USER, "Question"))
+    manager.add_message(text_message(Role.ASSISTANT, "y" * 4000))
+    manager.add_message(text_message(Role.TOOL, "z" * 4000))
+    before = manager.current_context_tokens
+
+    assert manager.crop_message(Crop_Direction.BOTTOM, 2) == "Crop message successful"
+    assert manager.current_context_tokens < before - 1500
+    print("✓ 通过: 估算随裁剪减少")
+
+
+def test_calibration_against_reported_usage(tmp_path=None):
+    """测试根据 API 返回的 prompt_tokens 校准"""
+    print("\n测试: 根据 prompt_tokens 校准")
+
+    log_path = os.path.join(str(tmp_path) if tmp_path else ".", "calibration.jsonl")
+    os.environ["TOKEN_CALIBRATION_LOG"] = log_path
+    try:
+        manager = setup_history_manager()
+    finally:
+        del os.environ["TOKEN_CALIBRATION_LOG"]
+
+    manager.add_message(text_message(Role.USER, "Question"))
+    prompt_tokens = 500
+    manager.update_token_usage(MockTokenUsage(prompt_tokens, 10, prompt_tokens + 10))
+    # the real tokenizer counts twice as many tokens as the raw estimate
+    for _ in range(10):
+        raw = manager._token_estimator.count_message(text_message(Role.TOOL, "w" * 4000))
+        manager.add_message(text_message(Role.TOOL, "w" * 4000))
+        prompt_tokens += round(2 * raw)
+        manager.update_token_usage(MockTokenUsage(prompt_tokens, 10, prompt_tokens + 10))
+
+    assert abs(manager._token_estimator.scale - 2) < 0.05
+
+    with open(log_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    os.remove(log_path)
+    assert len(records) == 11
+    assert not records[0]["anchored"] and all(r["anchored"] for r in records[1:])
+    last_error = abs(records[-1]["estimated"] - records[-1]["actual"]) / records[-1]["actual"]
+    assert last_error < 0.01
+    print("✓ 通过: 校准收敛")
+
+
+if __name__ == "__main__":
+    test_estimator_heuristic()
+    test_new_messages_count_before_next_request()
+    test_crop_reduces_estimate()
+    test_calibration_against_reported_usage()
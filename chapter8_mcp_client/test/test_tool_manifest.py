@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tool manifest: schemas are compiled once and rebuilt only when tools change
+"""
+import sys
+import os
+import asyncio
+import json
+from types import SimpleNamespace
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+from core.history.message_store import FrozenDict
+from tools.cmd_runner import CmdRunner
+from tools.mcp_tool import McpTool
+from tools.tool_manager import ToolManager
+from tools.tool_manifest import ToolManifest
+from tools.tool_selector import ToolSelector
+
+
+class CountingTool(CmdRunner):
+    """cmd_runner's schema, counting how often it is built"""
+    builds = 0
+
+    def json_schema(self):
+        CountingTool.builds += 1
+        return super().json_schema()
+
+
+class FakeSession:
+    def __init__(self, names):
+        self.names = names
+
+    async def list_tools(self):
+        return SimpleNamespace(tools=[
+            SimpleNamespace(name=name, description=f"{name} tool", inputSchema={"properties": {}, "required": []})
+            for name in self.names
+        ])
+
+
+def make_tool_manager():
+    """A ToolManager without MCP servers"""
+    async def registered():
+        pass
+
+    manager = object.__new__(ToolManager)
+    manager.tools = {}
+    manager._manifest = None
+    manager._subset_manifests = {}
+    manager._selector = ToolSelector()
+    manager.register_mcp_task = asyncio.ensure_future(registered())
+    return manager
+
+
+def test_manifest_is_compiled_once():
+    """The schemas are built on the first request only, and can't be changed by a request"""
+    print("🧪 Testing the tool manifest cache...")
+
+    async def run():
+        manager = make_tool_manager()
+        manager._register_tool("cmd_runner", CountingTool())
+        first = await manager.get_tool_manifest()
+        for _ in range(10):
+            assert await manager.get_tool_manifest() is first
+            await manager.get_tools_description()
+        assert CountingTool.builds == 1
+
+        assert first.names == ("cmd_runner",)
+        assert json.loads(first.serialized) == [CountingTool().json_schema()]
+        assert isinstance(first.schemas[0], FrozenDict)
+        try:
+            first.schemas[0]["function"]["name"] = "renamed"
+            assert False, "schemas must be read-only"
+        except TypeError:
+            pass
+
+    asyncio.run(run())
+    print("✅ Manifest compiled once")
+
+
+def test_manifest_changes_with_tools():
+    """Registering or removing tools rebuilds the manifest, with a new hash"""
+    print("🧪 Testing manifest invalidation...")
+
+    async def run():
+        manager = make_tool_manager()
+        manager._register_tool("cmd_runner", CmdRunner())
+        before = await manager.get_tool_manifest()
+        assert ToolManifest.compile(manager.tools).hash == before.hash
+
+        session = FakeSession(["search"])
+        await manager._list_mcp_tools(session)
+        with_mcp = await manager.get_tool_manifest()
+        assert with_mcp.names == ("cmd_runner", "search")
+        assert with_mcp.hash != before.hash
+        assert isinstance(manager.tools["search"], McpTool)
+
+        # the server announced tools/list_changed
+        session.names = ["search_v2"]
+        await manager._refresh_mcp_tools(session)
+        refreshed = await manager.get_tool_manifest()
+        assert refreshed.names == ("cmd_runner", "search_v2")
+        assert refreshed.hash not in (before.hash, with_mcp.hash)
+
+        manager._unregister_tool("search_v2")
+        assert (await manager.get_tool_manifest()).hash == before.hash
+
+    asyncio.run(run())
+    print("✅ Manifest follows the registered tools")
+
+
+if __name__ == "__main__":
+    test_manifest_is_compiled_once()
+    test_manifest_changes_with_tools()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Tool subsetting: with many MCP tools, a request carries the built-in tools, the
+tools relevant to the user input, the tools used so far and those loaded
+through tool_search
+"""
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+# Add src directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, '../src')
+sys.path.insert(0, src_path)
+
+import core.conversation as conversation_module
+from core.conversation import Conversation
+from core.history.message_store import freeze
+from tools.cmd_runner import CmdRunner
+from tools.tool_manager import ToolManager
+from tools.tool_search import ToolSearch
+from tools.tool_selector import LexicalIndex, ToolSelector, tokenize
+
+SERVICES = {
+    "github": ["create_issue", "list_pull_requests", "merge_pull_request", "get_file_contents"],
+    "postgres": ["run_query", "list_tables", "describe_table"],
+    "browser": ["navigate", "click", "screenshot", "fill_form"],
+    "slack": ["send_message", "list_channels", "read_thread"],
+    "jira": ["create_ticket", "transition_ticket", "search_tickets"],
+}
+
+
+class FakeSession:
+    async def list_tools(self):
+        tools = []
+        for service, actions in SERVICES.items():
+            for action in actions:
+                words = action.replace("_", " ")
+                tools.append(SimpleNamespace(
+                    name=f"{service}_{action}",
+                    description=f"{words.capitalize()} in {service.capitalize()}. " + "Returns the result as JSON. " * 5,
+                    inputSchema={"properties": {"input": {"type": "string"}}, "required": ["input"]},
+                ))
+        return SimpleNamespace(tools=tools)
+
+
+def make_tool_manager(mode="auto", top_k=4):
+    """A ToolManager with cmd_runner, tool_search and 17 MCP tools"""
+    async def registered():
+        pass
+
+    manager = object.__new__(ToolManager)
+    manager.tools = {}
+    manager._manifest = None
+    manager._subset_manifests = {}
+    manager._selector = ToolSelector(top_k=top_k, mode=mode)
+    manager.register_mcp_task = asyncio.ensure_future(registered())
+    manager._register_tool(ToolSearch.get_tool_name(), ToolSearch())
+    manager._register_tool(CmdRunner.get_tool_name(), CmdRunner())
+    return manager
+
+
+def session(user_input, called=()):
+    messages = [
+        {"role": "system", "content": [{"type": "text", "text": "System"}]},
+        {"role": "user", "content": [{"type": "text", "text": user_input}]},
+    ]
+    if called:
+        messages.append({"role": "assistant", "content": "", "tool_calls": [
+            {"id": f"call_{i}", "type": "function", "function": {"name": name, "arguments": "{}"}}
+            for i, name in enumerate(called)
+        ]})
+    return [freeze(message) for message in messages]
+
+
+def make_conversation():
+    conv = object.__new__(Conversation)
+    conv._initialized = True
+    conv.todos = []
+    conv.loaded_tools = set()
+    return conv
+
+
+async def search_from(conversation, manager, query):
+    """tool_search, called from the agent loop of the conversation"""
+    async def call():
+        conversation_module._current_conversation.set(conversation)
+        return await manager.tools["tool_search"].act(query=query)
+
+    ToolManager._instance, ToolManager._initialized = manager, True
+    try:
+        return await asyncio.create_task(call())
+    finally:
+        ToolManager._instance, ToolManager._initialized = None, False
+
+
+def test_lexical_index():
+    """BM25 ranks the tools whose names and descriptions share the query's words"""
+    print("🧪 Testing the lexical tool index...")
+    assert tokenize("list_pullRequests HTTPServer") == ["list", "pull", "request", "http", "server"]
+    index = LexicalIndex({
+        "github_create_issue": "Create an issue in a GitHub repository",
+        "jira_create_ticket": "Create a ticket in Jira",
+        "postgres_run_query": "Run a SQL query",
+    })
+    assert index.search("open a github issue about the crash", 2) == ["github_create_issue"]
+    assert index.search("run this sql", 5) == ["postgres_run_query"]
+    assert index.search("nothing relevant", 5) == []
+    print("✅ Lexical index ranks tools")
+
+
+def test_subset_follows_the_session():
+    """Built-in tools always, relevant and used MCP tools, and what tool_search loads"""
+    print("🧪 Testing tool subsetting...")
+
+    async def run():
+        manager = make_tool_manager()
+        await manager._list_mcp_tools(FakeSession())
+
+        manifest = await manager.get_tool_manifest(session("Please create a GitHub issue for the login bug"))
+        assert {"cmd_runner", "tool_search", "github_create_issue"} <= set(manifest.names)
+        assert len(manifest) <= 2 + 4
+        assert manifest.tokens < manager.full_manifest.tokens
+        assert "tool_search" not in manager.full_manifest.names
+
+        # the same input gives the same manifest, so the prompt cache prefix holds
+        assert await manager.get_tool_manifest(session("Please create a GitHub issue for the login bug")) is manifest
+
+        # a tool called earlier in the session stays, whatever the input
+        manifest = await manager.get_tool_manifest(session("now a screenshot", called=["slack_send_message"]))
+        assert {"slack_send_message", "browser_screenshot"} <= set(manifest.names)
+
+        # tool_search loads tools for the rest of the session
+        conv = make_conversation()
+        result = await search_from(conv, manager, "postgres tables")
+        assert "postgres_list_tables" in result
+        manifest = await manager.get_tool_manifest(session("now a screenshot"), conv.loaded_tools)
+        assert "postgres_list_tables" in manifest.names
+
+        # order follows registration, independent of relevance
+        assert list(manifest.names) == [name for name in manager.tools if name in manifest.names]
+
+    asyncio.run(run())
+    print("✅ Subsets follow the session")
+
+
+def test_few_tools_are_all_sent():
+    """Below the threshold, or with TOOL_SUBSET=off, every tool is sent"""
+    print("🧪 Testing the subset threshold...")
+
+    async def run():
+        manager = make_tool_manager(top_k=50)
+        await manager._list_mcp_tools(FakeSession())
+        assert await manager.get_tool_manifest(session("create an issue")) is manager.full_manifest
+
+        manager = make_tool_manager(mode="off")
+        await manager._list_mcp_tools(FakeSession())
+        assert await manager.get_tool_manifest(session("create an issue")) is manager.full_manifest
+
+    asyncio.run(run())
+    print("✅ Small tool sets are sent in full")
+
+
+def test_sub_agent_loads_its_own_tools():
+    """Tools a sub-agent loads through tool_search stay out of its parent's subset"""
+    print("🧪 Testing tool_search in a sub-agent...")
+
+    async def run():
+        manager = make_tool_manager()
+        await manager._list_mcp_tools(FakeSession())
+        parent = make_conversation()
+        parent._tool_manager = manager
+        task = parent._new_task_conversation("query the database")
+
+        before = await manager.get_tool_manifest(session("now a screenshot"), parent.loaded_tools)
+        await search_from(task, manager, "postgres tables")
+        after = await manager.get_tool_manifest(session("now a screenshot"), parent.loaded_tools)
+        in_task = await manager.get_tool_manifest(session("now a screenshot"), task.loaded_tools)
+        return parent, task, before, after, in_task
+
+    parent, task, before, after, in_task = asyncio.run(run())
+    assert "postgres_list_tables" in task.loaded_tools and not parent.loaded_tools
+    assert after is before and "postgres_list_tables" not in after.names
+    assert "postgres_list_tables" in in_task.names
+    print("✅ The sub-agent's loads stayed its own")
+
+
+if __name__ == "__main__":
+    test_lexical_index()
+    test_subset_follows_the_session()
+    test_sub_agent_loads_its_own_tools()
+    test_few_tools_are_all_sent()